@@ -0,0 +1,406 @@
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, stream_with_context
+import maps_scraper
+from company_store import CompanyStore
+from driver_pool import DriverPool
+from get_company_list import read_company_codes
+from google_maps_scraper import get_places, PLACES_BASE_URL
+from idx_http import create_session, scrape_companies_http, IDX_BASE_URL
+from metrics import METRICS
+from place_cache import PlaceCache
+from scrapping import create_browser_pool, scrape_companies_browser
+
+JOB_TYPES = ['idx', 'maps', 'places']
+PLACES_API_KEY_ENV = 'GOOGLE_PLACES_API_KEY'
+
+# Detik tanpa data sebelum stream SSE mengirim keepalive
+HEARTBEAT_SECONDS = 15
+
+class Job:
+    """
+    One submitted scrape, also used as the sink its scraper writes to
+
+    Records are kept in memory in the order they arrive; follow()
+    yields them to any number of readers while the job is running.
+    """
+
+    def __init__(self, kind, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'
+        self.total = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._records = []
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def write(self, record):
+        with self._cond:
+            self._records.append(record)
+            self._cond.notify_all()
+
+    def records(self, start=0):
+        with self._cond:
+            return self._records[start:]
+
+    def start(self):
+        with self._cond:
+            if self.status != 'queued':
+                return False
+            self.status = 'running'
+            self.started_at = time.time()
+            return True
+
+    def cancel(self):
+        """Mark a queued job cancelled, False when it already started"""
+        with self._cond:
+            if self.status != 'queued':
+                return False
+            self.status = 'cancelled'
+            self.finished_at = time.time()
+            self._cond.notify_all()
+            return True
+
+    def finish(self, status, error=None):
+        with self._cond:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def follow(self, start=0, timeout=HEARTBEAT_SECONDS):
+        """
+        Yield (index, record) from start until the job is finished
+
+        Yields None when nothing arrived for timeout seconds, so a
+        stream can send a keepalive.
+        """
+        index = start
+        while True:
+            with self._cond:
+                if index >= len(self._records) and not self.finished:
+                    self._cond.wait(timeout)
+                records = self._records[index:]
+                finished = self.finished
+            for record in records:
+                yield index, record
+                index += 1
+            if finished:
+                return
+            if not records:
+                yield None
+
+    def progress(self):
+        with self._cond:
+            done = len(self._records)
+            end = self.finished_at or time.time()
+            return {
+                'id': self.id,
+                'type': self.kind,
+                # API key tidak ikut ditampilkan di status job
+                'params': {key: value for key, value in self.params.items() if key != 'api_key'},
+                'status': self.status,
+                'done': done,
+                'total': self.total,
+                'percent': round(done / self.total * 100, 1) if self.total else None,
+                'error': self.error,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.created_at)),
+                'elapsed_s': round(end - self.started_at, 1) if self.started_at else 0.0
+            }
+
+class ScrapeService:
+    """
+    Job queue in front of the scrapers
+
+    submit() only validates and queues, jobs run on a small thread pool.
+    All jobs share one HTTP session per API, one IDX browser pool and
+    one Maps browser pool (drivers stay warm between jobs), the company
+    store and the Places details cache.
+    """
+
+    def __init__(self, workers=2, http_workers=8, browser_workers=1, max_jobs=200, api_key=None,
+                 idx_base_url=IDX_BASE_URL, places_base_url=PLACES_BASE_URL, store=None, place_cache=None):
+        self.http_workers = http_workers
+        self.max_jobs = max_jobs
+        self.api_key = api_key or os.environ.get(PLACES_API_KEY_ENV)
+        self.idx_base_url = idx_base_url
+        self.places_base_url = places_base_url
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self.idx_session = create_session(pool_size=http_workers * workers)
+        self.places_session = create_session(pool_size=http_workers * workers, headers={})
+        self.idx_pool = create_browser_pool(browser_workers, reuse=True)
+        self.maps_pool = DriverPool(maps_scraper.setup_driver, workers=1, reuse=True)
+        self.store = store or CompanyStore()
+        self.place_cache = place_cache or PlaceCache()
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def validate(self, kind, params):
+        """Normalized job parameters, ValueError for a bad request"""
+        if kind not in JOB_TYPES:
+            raise ValueError(f"type must be one of {', '.join(JOB_TYPES)}")
+
+        if kind == 'idx':
+            codes = params.get('codes')
+            if codes:
+                if isinstance(codes, str):
+                    codes = codes.split(',')
+                codes = list(dict.fromkeys(str(code).strip().upper() for code in codes if str(code).strip()))
+            else:
+                start = int(params.get('start', 0))
+                limit = int(params.get('limit', 10))
+                codes = read_company_codes()[start:start + limit]
+            if not codes:
+                raise ValueError("no company codes to scrape")
+            browser = str(params.get('browser', True)).lower() not in ('0', 'false', 'no')
+            return {'codes': codes, 'browser': browser}
+
+        query = str(params.get('query', '')).strip()
+        if not query:
+            raise ValueError("query is required")
+        if kind == 'maps':
+            limit = params.get('limit')
+            return {'query': query, 'limit': int(limit) if limit else None}
+
+        if not (params.get('api_key') or self.api_key):
+            raise ValueError(f"api_key is required (or set {PLACES_API_KEY_ENV})")
+        return {
+            'query': query,
+            'location': str(params.get('location', '-6.9990899,107.6311617')),
+            'radius': int(params.get('radius', 5000)),
+            'api_key': params.get('api_key')
+        }
+
+    def submit(self, kind, params):
+        """Queue a job and return it right away"""
+        job = Job(kind, self.validate(kind, params))
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict()
+        job.future = self.executor.submit(self._run, job)
+        METRICS.count(f'jobs.{kind}')
+        return job
+
+    def _evict(self):
+        # Job lama yang sudah selesai dibuang supaya memori tidak terus bertambah
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [job.progress() for job in jobs]
+
+    def cancel(self, job_id):
+        """Cancel a queued job, False when it already started"""
+        job = self.get(job_id)
+        if job is None or not job.cancel():
+            return False
+        # Future bisa belum di-set kalau submit() belum selesai, _run tetap melewati job ini
+        if job.future is not None:
+            job.future.cancel()
+        return True
+
+    def _run(self, job):
+        if not job.start():
+            return
+        try:
+            with METRICS.span(f'job.{job.kind}'):
+                getattr(self, '_run_' + job.kind)(job)
+            job.finish('done')
+        except Exception as e:
+            print(f"Job {job.id} failed: {str(e)}")
+            job.finish('failed', str(e))
+
+    def _run_idx(self, job):
+        codes = job.params['codes']
+        job.total = len(codes)
+        fallback = None
+        if job.params['browser']:
+            fallback = lambda missing: scrape_companies_browser(missing, pool=self.idx_pool)
+        results = scrape_companies_http(
+            codes,
+            workers=self.http_workers,
+            base_url=self.idx_base_url,
+            browser_fallback=fallback,
+            sink=job,
+            store=self.store,
+            session=self.idx_session
+        )
+        # Profil yang tidak berubah tidak ditulis ke sink, kirim dari store
+        written = {record.get('Kode') for record in job.records()}
+        for info in results:
+            if info.get('Kode') not in written:
+                job.write(info)
+
+    def _run_maps(self, job):
+        job.total = job.params['limit']
+        results = self.maps_pool.map(
+            lambda driver, query: maps_scraper.search_places(driver, query, job.params['limit'], sink=job),
+            [job.params['query']],
+            desc=f"Maps job {job.id}"
+        )
+        if results[0] is None:
+            raise RuntimeError("browser could not finish the search")
+
+    def _run_places(self, job):
+        get_places(
+            job.params['api_key'] or self.api_key,
+            job.params['query'],
+            location=job.params['location'],
+            radius=job.params['radius'],
+            sink=job,
+            workers=self.http_workers,
+            base_url=self.places_base_url,
+            cache=self.place_cache,
+            session=self.places_session
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.idx_pool.close()
+        self.maps_pool.close()
+        self.idx_session.close()
+        self.places_session.close()
+        self.place_cache.close()
+        self.store.close()
+
+def to_json(record):
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+def ndjson_stream(job, start=0):
+    for item in job.follow(start):
+        if item is not None:
+            yield to_json(item[1]) + '\n'
+
+def sse_stream(job, start=0):
+    for item in job.follow(start):
+        if item is None:
+            yield ': keepalive\n\n'
+        else:
+            yield f"id: {item[0]}\nevent: record\ndata: {to_json(item[1])}\n\n"
+    yield f"event: end\ndata: {to_json(job.progress())}\n\n"
+
+def create_app(service=None):
+    """Flask app over a ScrapeService; no route waits for a scrape to finish"""
+    app = Flask(__name__)
+    service = service or ScrapeService()
+    app.config['SERVICE'] = service
+
+    def not_found(job_id):
+        return jsonify({'error': f"job {job_id} not found"}), 404
+
+    @app.get('/health')
+    def health():
+        return jsonify({'status': 'ok', 'jobs': len(service.jobs)})
+
+    @app.get('/metrics')
+    def metrics():
+        return Response(METRICS.prometheus(), mimetype='text/plain')
+
+    @app.post('/jobs')
+    def submit_job():
+        params = request.get_json(silent=True) or request.form.to_dict()
+        try:
+            job = service.submit(params.get('type', ''), params)
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        response = jsonify(job.progress())
+        response.status_code = 202
+        response.headers['Location'] = f"/jobs/{job.id}"
+        return response
+
+    @app.get('/jobs')
+    def list_jobs():
+        return jsonify(service.list_jobs())
+
+    @app.get('/jobs/<job_id>')
+    def job_status(job_id):
+        job = service.get(job_id)
+        return jsonify(job.progress()) if job else not_found(job_id)
+
+    @app.delete('/jobs/<job_id>')
+    def cancel_job(job_id):
+        job = service.get(job_id)
+        if job is None:
+            return not_found(job_id)
+        if not service.cancel(job_id):
+            return jsonify({'error': f"job {job_id} is {job.status}, only queued jobs can be cancelled"}), 409
+        return jsonify(job.progress())
+
+    @app.get('/jobs/<job_id>/results')
+    def job_results(job_id):
+        """
+        Results as NDJSON (default) or server-sent events
+
+        ?format=sse or Accept: text/event-stream picks SSE; ?start=N skips
+        records already received, as does Last-Event-ID on reconnect.
+        """
+        job = service.get(job_id)
+        if job is None:
+            return not_found(job_id)
+        start = request.args.get('start', 0, type=int)
+        use_sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+        if use_sse:
+            last_id = request.headers.get('Last-Event-ID', '')
+            if last_id.isdigit():
+                start = int(last_id) + 1
+            stream = sse_stream(job, start)
+            mimetype = 'text/event-stream'
+        else:
+            stream = ndjson_stream(job, start)
+            mimetype = 'application/x-ndjson'
+        response = Response(stream_with_context(stream), mimetype=mimetype)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP service that queues scraping jobs and streams their results")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=2, help="jobs running at the same time")
+    parser.add_argument('--http-workers', type=int, default=8, help="parallel requests inside one job")
+    parser.add_argument('--browser-workers', type=int, default=1, help="IDX browsers for profiles that need JavaScript")
+    parser.add_argument('--prewarm', action='store_true', help="start one IDX browser before the first job")
+    args = parser.parse_args()
+
+    service = ScrapeService(args.workers, args.http_workers, args.browser_workers)
+    if args.prewarm:
+        service.idx_pool.prewarm(1)
+    try:
+        # threaded=True: stream dan submit berjalan di thread sendiri
+        create_app(service).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import argparse
+import json
+import sqlite3
+import time
+from get_company_list import read_company_codes
+from page_cache import PageCache
+from company_store import CompanyStore
+from result_sink import export_report
+from market_data import get_market_data, join_market_data
+from scrapping import scrape_companies_http, scrape_companies_browser, create_browser_pool, save_to_excel
+from metrics import METRICS, serve_from_env
+
+CHECKPOINT_FILE = 'checkpoint.db'
+
+class Checkpoint:
+    """SQLite checkpoint with the status of every ticker in a run"""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                code TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                updated_at REAL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, position)')
+        self.conn.commit()
+
+    def add_codes(self, codes):
+        """Register codes as pending, codes already in the checkpoint are kept"""
+        start = self.conn.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM jobs').fetchone()[0]
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO jobs (code, position, updated_at) VALUES (?, ?, ?)',
+                [(code, start + i, time.time()) for i, code in enumerate(codes)]
+            )
+
+    def todo(self, max_attempts=3):
+        """Codes still pending plus failed codes that can be retried, in order"""
+        rows = self.conn.execute(
+            "SELECT code FROM jobs WHERE status = 'pending' OR (status = 'failed' AND attempts < ?) ORDER BY position",
+            (max_attempts,)
+        )
+        return [row[0] for row in rows]
+
+    def mark_done(self, code, record):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'done', attempts = attempts + 1, error = NULL, result = ?, updated_at = ? WHERE code = ?",
+                (json.dumps(record, ensure_ascii=False), time.time(), code)
+            )
+
+    def mark_failed(self, code, error):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', attempts = attempts + 1, error = ?, updated_at = ? WHERE code = ?",
+                (error, time.time(), code)
+            )
+
+    def reset_failed(self):
+        """Give failed codes a new set of attempts"""
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+
+    def results(self):
+        """Records of all finished codes, in company list order"""
+        rows = self.conn.execute("SELECT result FROM jobs WHERE status = 'done' ORDER BY position")
+        return [json.loads(row[0]) for row in rows]
+
+    def summary(self):
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')
+        return dict(rows.fetchall())
+
+    def close(self):
+        self.conn.close()
+
+def run(checkpoint_file=CHECKPOINT_FILE, batch_size=50, max_attempts=3, workers=8, browser_workers=None, cache=None, by_size=False):
+    """
+    Scrape the whole company list, resuming from the checkpoint
+
+    With by_size a new checkpoint is filled largest market cap first
+    (market_data.py must have run), an existing one keeps its order.
+    """
+    checkpoint = Checkpoint(checkpoint_file)
+    store = CompanyStore()
+    offline = bool(cache and cache.offline)
+    # Browser tetap hidup antar batch, satu sudah disiapkan sebelum batch pertama
+    # Offline tidak pernah membuka browser, halaman yang tidak ada di cache dicatat gagal
+    pool = None if offline else create_browser_pool(browser_workers, reuse=True)
+    if pool:
+        pool.prewarm(1)
+    try:
+        codes = read_company_codes()
+        if by_size:
+            ranked = store.stale(max_age_days=0, by_size=True)
+            ranked_codes = set(ranked)
+            codes = ranked + [code for code in codes if code not in ranked_codes]
+        checkpoint.add_codes(codes)
+        todo = checkpoint.todo(max_attempts)
+        print(f"Status: {checkpoint.summary()}, {len(todo)} companies to scrape")
+
+        for i in range(0, len(todo), batch_size):
+            batch = todo[i:i+batch_size]
+            try:
+                records = scrape_companies_http(
+                    batch,
+                    workers=workers,
+                    browser_fallback=(lambda codes: scrape_companies_browser(codes, pool=pool)) if pool else None,
+                    cache=cache,
+                    store=store
+                )
+            except Exception as e:
+                print(f"Error processing batch starting at {batch[0]}: {str(e)}")
+                METRICS.error('batch', e)
+                for code in batch:
+                    checkpoint.mark_failed(code, str(e))
+                continue
+
+            # Each batch is committed right away so a crash only loses the current batch
+            for code, record in zip(batch, records):
+                if record.get('Nama Perusahaan'):
+                    checkpoint.mark_done(code, record)
+                else:
+                    checkpoint.mark_failed(code, 'not in page cache' if offline else 'no profile data')
+
+            print(f"Batch {i // batch_size + 1}: {checkpoint.summary()}")
+
+        return checkpoint.results()
+    finally:
+        if pool:
+            pool.close()
+        store.close()
+        checkpoint.close()
+
+def refresh(limit=100, workers=8, browser_workers=None, cache=None, sector=None):
+    """
+    Re-check the most urgent tickers from the refresh queue
+
+    Profiles whose fingerprint did not change are not parsed or
+    written, so this is cheap enough to run over and over.
+    """
+    store = CompanyStore()
+    try:
+        codes = store.refresh_queue(limit=limit, sector=sector)
+        print(f"Refreshing {len(codes)} companies")
+        if not codes:
+            return []
+        return scrape_companies_http(
+            codes,
+            workers=workers,
+            browser_fallback=None if cache and cache.offline else lambda missing: scrape_companies_browser(missing, browser_workers),
+            cache=cache,
+            store=store
+        )
+    finally:
+        store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable scraping of all IDX companies")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--retry-failed', action='store_true', help="retry failed codes that used all attempts")
+    parser.add_argument('--offline', action='store_true', help="only use pages from the page cache")
+    parser.add_argument('--refresh', type=int, metavar='N', help="re-check the N most urgent companies instead of the full run")
+    parser.add_argument('--sector', help="with --refresh, only companies in this sector")
+    parser.add_argument('--metrics', default='batch_metrics.json', help="per-stage timings and error counts of the run")
+    parser.add_argument('--report', metavar='FILE', help="only export the company store to FILE (.xlsx, .parquet or .csv)")
+    parser.add_argument('--by-sector', action='store_true', help="with --report, one Excel sheet per sector")
+    parser.add_argument('--by-size', action='store_true', help="scrape the largest companies first (run market_data.py before)")
+    args = parser.parse_args()
+    serve_from_env()
+
+    if args.report:
+        # Dibaca per chunk dari store, jadi ukuran store tidak dibatasi RAM
+        with CompanyStore() as store:
+            export_report(store.iter_chunks(), args.report, sheet_by='Sektor' if args.by_sector else None)
+        return
+
+    if args.refresh:
+        refresh(args.refresh, args.workers, cache=PageCache(offline=args.offline), sector=args.sector)
+        METRICS.write_summary(args.metrics)
+        return
+
+    if args.retry_failed:
+        checkpoint = Checkpoint(args.checkpoint)
+        checkpoint.reset_failed()
+        checkpoint.close()
+
+    print("Starting company data scraping...")
+    cache = PageCache(offline=args.offline)
+    companies_data = run(args.checkpoint, args.batch_size, args.max_attempts, args.workers, cache=cache, by_size=args.by_size)
+    print(f"\nTotal companies done: {len(companies_data)}")
+    # Harga, kapitalisasi pasar dan sektor Yahoo dari cache market_data.py, tanpa request baru
+    join_market_data(companies_data, get_market_data([record['Kode'] for record in companies_data], cache_only=True))
+    with METRICS.span('export.xlsx'):
+        save_to_excel(companies_data)
+    METRICS.write_summary(args.metrics)
+
+if __name__ == "__main__":
+    main()
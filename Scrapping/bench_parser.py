@@ -0,0 +1,73 @@
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from profile_parser import empty_info, apply_profile_label, parse_profile, lxml
+
+FIXTURE_DIR = os.path.join('fixtures', 'idx_profile')
+
+SOCIAL_DOMAINS = ['facebook.com', 'twitter.com', 'linkedin.com', 'instagram.com']
+
+def parse_full_soup(html, company_code):
+    """Old way: full BeautifulSoup tree of the whole page (as in scrapping.py before)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    info = empty_info(company_code)
+    table = soup.find('table')
+    if table:
+        for row in table.find_all('tr'):
+            cols = row.find_all('td')
+            if len(cols) >= 3:
+                apply_profile_label(info, cols[0].text, cols[2].text)
+    social_links = [link['href'].lower() for link in soup.find_all('a', href=True)
+                    if any(platform in link['href'].lower() for platform in SOCIAL_DOMAINS)]
+    if social_links:
+        info['Social Media'] = social_links
+    return info
+
+def load_fixtures(fixture_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    return pages
+
+def bench(name, parse_fn, pages, repeat):
+    """Time parse_fn over all pages and measure its peak memory"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for code, html in pages:
+            parse_fn(html, code)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for code, html in pages:
+        parse_fn(html, code)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    per_page = elapsed / (repeat * len(pages)) * 1000
+    print(f"{name:<12} {per_page:8.3f} ms/page   peak {peak / 1024:8.1f} KiB")
+    return per_page
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark IDX profile parsing over saved pages")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        print(f"No fixture pages found in {args.fixtures}")
+        return
+
+    print(f"{len(pages)} pages, {args.repeat} rounds\n")
+    baseline = bench('full-soup', parse_full_soup, pages, args.repeat)
+    backends = ['soup'] + (['lxml'] if lxml else [])
+    for backend in backends:
+        per_page = bench(backend, lambda html, code: parse_profile(html, code, backend), pages, args.repeat)
+        print(f"{'':<12} {baseline / per_page:8.1f}x faster than full-soup")
+
+if __name__ == "__main__":
+    main()
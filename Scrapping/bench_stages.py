@@ -0,0 +1,173 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+import google_maps_scraper
+from bench_parser import load_fixtures
+from get_company_list import read_company_codes
+from idx_http import scrape_companies_http
+from maps_scraper import empty_place, parse_card_texts
+from metrics import METRICS
+from profile_parser import parse_profile, lxml
+from rate_limiter import LIMITER, host_key
+from replay_server import ReplayServer, FIXTURE_DIR
+from result_sink import ResultSink, export_excel, export_csv
+from site_crawler import enrich_with_websites, extract_contacts
+from social_links import extract_social_links
+
+STAGES = ['parse', 'social', 'maps-cards', 'export', 'fetch', 'places', 'e2e']
+
+def timed(name, items, fn, repeat=1):
+    """Run fn repeat times, returns the stage result with items per second"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    seconds = time.perf_counter() - start
+    result = {
+        'stage': name,
+        'items': items * repeat,
+        'seconds': round(seconds, 4),
+        'per_second': round(items * repeat / seconds, 1) if seconds else 0.0
+    }
+    print(f"{name:<12} {result['items']:>7} items {result['seconds']:>9.3f} s {result['per_second']:>11.1f} /s")
+    return result
+
+def load_feed_cards(fixture_dir):
+    """Card name and text lines from the Maps feed fixture, as CARDS_SCRIPT returns them"""
+    pages = load_fixtures(os.path.join(fixture_dir, 'maps_feed'))
+    if not pages or lxml is None:
+        return []
+    tree = lxml.html.fromstring(pages[0][1])
+    cards = []
+    for link in tree.xpath('//*[@role="feed"]//a[contains(@class, "hfpxzc")]'):
+        card = link.getparent()
+        texts = [el.text_content() for el in card.xpath('.//*[contains(@class, "fontBodyMedium")]')]
+        cards.append({'nama': link.get('aria-label', ''), 'maps_url': link.get('href', ''), 'texts': texts})
+    return cards
+
+def bench_parse(args):
+    pages = load_fixtures(os.path.join(args.fixtures, 'idx_profile'))
+    return timed('parse', len(pages), lambda: [parse_profile(html, code) for code, html in pages], args.repeat)
+
+def bench_social(args):
+    pages = load_fixtures(os.path.join(args.fixtures, 'idx_profile'))
+    for site_dir in sorted(glob.glob(os.path.join(args.fixtures, 'company_site', '*'))):
+        pages += load_fixtures(site_dir)
+
+    def run():
+        for _, html in pages:
+            extract_social_links(html)
+            extract_contacts(html)
+    return timed('social', len(pages), run, args.repeat)
+
+def bench_maps_cards(args):
+    cards = load_feed_cards(args.fixtures)
+    if not cards:
+        print("maps-cards   skipped (no feed fixture or lxml)")
+        return None
+
+    def run():
+        for card in cards:
+            info = empty_place()
+            info['nama'] = card['nama']
+            parse_card_texts(info, card['texts'])
+    return timed('maps-cards', len(cards), run, args.repeat)
+
+def bench_export(args):
+    with open(glob.glob(os.path.join(args.fixtures, 'idx_profile_json', '*.json'))[0], encoding='utf-8') as f:
+        profile = json.load(f)['Profiles'][0]
+    record = {'Kode': profile['KodeEmiten'], 'Nama Perusahaan': profile['NamaEmiten'], 'Sektor': profile['Sektor'],
+              'Website': profile['Website'], 'Email': profile['Email'], 'Telepon': profile['Telepon'],
+              'Alamat': profile['Alamat'], 'Social Media': ['https://instagram.com/a', 'https://x.com/a']}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        sink_file = os.path.join(tmp, 'records.jsonl')
+        results.append(timed('sink', args.rows, lambda: _write_records(sink_file, record, args.rows)))
+        results.append(timed('export-xlsx', args.rows, lambda: export_excel(sink_file, os.path.join(tmp, 'out.xlsx'))))
+        results.append(timed('export-csv', args.rows, lambda: export_csv(sink_file, os.path.join(tmp, 'out.csv'))))
+    return results
+
+def _write_records(path, record, rows):
+    with ResultSink(path, append=False) as sink:
+        for i in range(rows):
+            sink.write(dict(record, Kode=f"{record['Kode'][:2]}{i:04d}"))
+
+def bench_fetch(args, server):
+    codes = args.codes
+    return timed('fetch', len(codes), lambda: scrape_companies_http(codes, workers=args.workers, base_url=server.url))
+
+def bench_places(args, server):
+    # Jeda next_page_token adalah batas dari Google, bukan kode kita
+    google_maps_scraper.PAGE_TOKEN_DELAYS = [args.token_delay] * len(google_maps_scraper.PAGE_TOKEN_DELAYS)
+    places = []
+    result = timed('places', 60, lambda: places.extend(google_maps_scraper.get_places(
+        'bench', 'restoran', workers=args.workers, base_url=server.url + '/maps/api/place')))
+    result['items'] = len(places)
+    return result
+
+def bench_e2e(args, server):
+    codes = args.codes
+
+    def run():
+        records = scrape_companies_http(codes, workers=args.workers, base_url=server.url)
+        # Semua situs ada di host replay yang sama, jadi batas per host dinaikkan
+        enrich_with_websites(records, concurrency=args.workers * 2, per_host=args.workers * 2)
+    return timed('e2e', len(codes), run)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of every scraping stage over the fixture corpus")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"comma separated, from {', '.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=20, help="rounds for the CPU-only stages")
+    parser.add_argument('--companies', type=int, default=50, help="tickers for fetch and e2e")
+    parser.add_argument('--rows', type=int, default=5000, help="records for the export stage")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.05, help="replay server seconds per response")
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-json', action='store_true', help="IDX JSON endpoint answers 403, profiles come from HTML")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="wait before using a Places next_page_token")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip() in STAGES]
+    codes = read_company_codes() if os.path.exists('daftar_perusahaan_idx.csv') else []
+    args.codes = (codes or [f"T{i:03d}" for i in range(args.companies)])[:args.companies]
+
+    results = []
+    server = ReplayServer(args.fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          seed=args.seed, json_profiles=not args.no_json)
+    with server:
+        # Replay lokal tidak perlu dijaga rate limiter
+        LIMITER.rates[host_key(server.url)] = 10000.0
+        print(f"Replay server {server.url}, latency {args.latency}s, error rate {args.error_rate}\n")
+        for stage in stages:
+            if stage in ('fetch', 'places', 'e2e'):
+                result = globals()['bench_' + stage](args, server)
+            else:
+                result = globals()['bench_' + stage.replace('-', '_')](args)
+            if isinstance(result, list):
+                results += result
+            elif result:
+                results.append(result)
+        print(f"\nServer: {server.stats()}")
+
+    if args.output:
+        report = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('codes', 'output')},
+            'results': results,
+            'metrics': METRICS.summary()
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
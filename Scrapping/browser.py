@@ -0,0 +1,254 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from metrics import METRICS
+
+try:
+    import chromedriver_autoinstaller
+except ImportError:
+    chromedriver_autoinstaller = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+DRIVER_CACHE_FILE = '.chromedriver.json'
+PROFILE_DIR = '.chrome_profiles'
+
+# Gambar, font dan media tidak dibutuhkan untuk membaca teks halaman
+BLOCKED_EXTENSIONS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg', '*.m4a',
+]
+
+# Analytics dan iklan
+BLOCKED_HOSTS = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*googleadservices.com*', '*adservice.google.*',
+    '*connect.facebook.net*', '*hotjar.com*', '*clarity.ms*', '*tiktok.com/i18n/pixel*',
+]
+
+BLOCKED_URLS = BLOCKED_EXTENSIONS + BLOCKED_HOSTS
+
+# Transfer size and timings of the current page, in one script call
+PAGE_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const r of resources) bytes += r.transferSize || 0;
+return {
+    url: location.href,
+    requests: resources.length + 1,
+    bytes: bytes,
+    dom_ready_ms: nav ? Math.round(nav.domContentLoadedEventEnd) : 0,
+    load_ms: nav ? Math.round(nav.loadEventEnd) : 0
+};
+"""
+
+_driver_path = None
+_driver_lock = threading.Lock()
+
+def resolve_driver_path(cache_file=DRIVER_CACHE_FILE):
+    """
+    Path of a chromedriver matching the installed Chrome, resolved once
+
+    The path and the Chrome major version are kept in cache_file, so
+    later runs skip the install check until Chrome is updated. Returns
+    None without chromedriver_autoinstaller, Selenium then finds a
+    driver itself.
+    """
+    global _driver_path
+    with _driver_lock:
+        if _driver_path or chromedriver_autoinstaller is None:
+            return _driver_path
+        version = chromedriver_autoinstaller.get_chrome_version()
+        major = version.split('.')[0] if version else None
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+
+        if major and cached.get('chrome_major') == major and os.path.exists(cached.get('path') or ''):
+            _driver_path = cached['path']
+        else:
+            # Chrome baru di-update atau belum pernah install
+            _driver_path = chromedriver_autoinstaller.install()
+            if _driver_path:
+                with open(cache_file, 'w') as f:
+                    json.dump({'chrome_major': major, 'path': _driver_path}, f)
+        return _driver_path
+
+def lock_file(path):
+    """Open path with an exclusive non-blocking OS lock, None if another process holds it"""
+    f = open(path, 'a+')
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+class ProfileSlots:
+    """
+    Persistent Chrome profiles, one per running browser
+
+    Chrome locks a profile while it runs, so every driver gets its own
+    directory; a released directory is handed to the next driver with
+    its HTTP cache and cookies (e.g. the Maps consent screen) intact.
+    A slot is held with an OS file lock next to its directory, so
+    processes on one host (shard_runner workers, app.py next to
+    batch_runner) never share one; the lock goes away with the process.
+    When all max_slots are taken the driver gets a temporary profile.
+    """
+
+    def __init__(self, base_dir=PROFILE_DIR, max_slots=16):
+        self.base_dir = base_dir
+        self.max_slots = max_slots
+        self._held = {}  # slot -> open lock file
+        self._lock = threading.Lock()
+
+    def claim(self):
+        """(slot, profile directory); slot is None for a temporary profile"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        with self._lock:
+            for slot in range(self.max_slots):
+                if slot in self._held:
+                    continue
+                f = lock_file(os.path.join(self.base_dir, f'worker-{slot}.lock'))
+                if f:
+                    self._held[slot] = f
+                    return slot, os.path.abspath(os.path.join(self.base_dir, f'worker-{slot}'))
+        print(f"All {self.max_slots} Chrome profiles are in use, starting with a temporary profile")
+        return None, tempfile.mkdtemp(prefix='chrome-profile-')
+
+    def release(self, slot, profile_dir=None):
+        """Give the slot back, or remove the temporary profile_dir of slot None"""
+        if slot is None:
+            if profile_dir:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            return
+        with self._lock:
+            f = self._held.pop(slot, None)
+        if f:
+            f.close()
+
+PROFILES = ProfileSlots()
+
+class LeanChrome(webdriver.Chrome):
+    """Chrome driver that gives its profile slot back on quit"""
+    profile_slot = None
+    profile_dir = None
+
+    def quit(self):
+        try:
+            super().quit()
+        finally:
+            if self.profile_dir is not None:
+                PROFILES.release(self.profile_slot, self.profile_dir)
+                self.profile_slot = self.profile_dir = None
+
+def create_driver(headless=True, block=True, blocked_urls=None, page_load_strategy='eager', window_size=(1366, 900), warm_profile=False, extra_args=()):
+    """
+    Create a lean Chrome driver shared by all scrapers
+
+    - headless: run without a window
+    - block: block images, fonts, media, analytics and ads through CDP
+    - blocked_urls: URL patterns to block instead of BLOCKED_URLS
+    - page_load_strategy: 'eager' returns from get() once the DOM is
+      ready instead of waiting for every subresource
+    - warm_profile: reuse a persistent profile from PROFILES instead
+      of starting with an empty one
+    """
+    options = webdriver.ChromeOptions()
+    options.page_load_strategy = page_load_strategy
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument(f'--window-size={window_size[0]},{window_size[1]}')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--disable-background-networking')
+    options.add_argument('--mute-audio')
+    options.add_argument('--no-first-run')
+    if block:
+        # Gambar juga dimatikan lewat setting, untuk URL tanpa ekstensi
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    for arg in extra_args:
+        options.add_argument(arg)
+
+    slot = profile_dir = None
+    if warm_profile:
+        slot, profile_dir = PROFILES.claim()
+        options.add_argument(f'--user-data-dir={profile_dir}')
+
+    try:
+        driver = LeanChrome(service=Service(executable_path=resolve_driver_path()), options=options)
+    except Exception:
+        if profile_dir is not None:
+            PROFILES.release(slot, profile_dir)
+        raise
+    driver.profile_slot = slot
+    driver.profile_dir = profile_dir
+    if block:
+        block_urls(driver, BLOCKED_URLS if blocked_urls is None else blocked_urls)
+    return driver
+
+def block_urls(driver, patterns):
+    """Block requests matching the URL patterns (wildcards allowed) through CDP"""
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(patterns)})
+
+def page_stats(driver):
+    """Bytes transferred, request count and load timings of the current page"""
+    try:
+        return driver.execute_script(PAGE_STATS_SCRIPT)
+    except Exception:
+        return None
+
+class PageCounter:
+    """Running totals of page_stats over all drivers"""
+
+    def __init__(self):
+        self.pages = 0
+        self.bytes = 0
+        self.requests = 0
+        self.dom_ready_ms = 0
+        self._lock = threading.Lock()
+
+    def record(self, driver):
+        stats = page_stats(driver)
+        if stats:
+            METRICS.page(stats['bytes'])
+            with self._lock:
+                self.pages += 1
+                self.bytes += stats['bytes']
+                self.requests += stats['requests']
+                self.dom_ready_ms += stats['dom_ready_ms']
+        return stats
+
+    def summary(self):
+        with self._lock:
+            return {
+                'pages': self.pages,
+                'bytes': self.bytes,
+                'bytes_per_page': self.bytes // self.pages if self.pages else 0,
+                'requests_per_page': round(self.requests / self.pages, 1) if self.pages else 0,
+                'avg_dom_ready_ms': self.dom_ready_ms // self.pages if self.pages else 0
+            }
+
+# Counter bersama untuk semua driver dalam satu proses
+PAGE_COUNTER = PageCounter()
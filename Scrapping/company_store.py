@@ -0,0 +1,426 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from result_sink import read_records
+
+COMPANY_STORE_FILE = 'companies.db'
+
+# Kolom hasil scraper -> kolom tabel (scrapping.py dan idx_scraper.py memakai nama berbeda)
+FIELD_COLUMNS = {
+    'Nama Perusahaan': 'name',
+    'Sektor': 'sector',
+    'Sektor Bisnis': 'sector',
+    'Tanggal Pencatatan': 'listing_date',
+    'Website': 'website',
+    'Email': 'email',
+    'Telepon': 'phone',
+    'Kontak': 'phone',
+    'Alamat': 'address'
+}
+
+# Kolom tabel -> kolom DataFrame/Excel
+EXPORT_NAMES = {
+    'code': 'Kode',
+    'name': 'Nama Perusahaan',
+    'sector': 'Sektor',
+    'listing_date': 'Tanggal Pencatatan',
+    'website': 'Website',
+    'email': 'Email',
+    'phone': 'Telepon',
+    'address': 'Alamat',
+    'social_media': 'Social Media',
+    'listed': 'Tercatat',
+    'price': 'Harga',
+    'market_cap': 'Kapitalisasi Pasar',
+    'last_scraped': 'Terakhir Diambil'
+}
+
+TEXT_COLUMNS = ['name', 'sector', 'listing_date', 'website', 'email', 'phone', 'address']
+
+# Sidik konten per tahap scraping
+FINGERPRINT_COLUMNS = {
+    'profile': 'fingerprint',
+    'website': 'website_fingerprint'
+}
+
+# Kolom yang ditambahkan setelah tabel pertama kali dibuat
+ADDED_COLUMNS = {
+    'fingerprint': "TEXT NOT NULL DEFAULT ''",
+    'website_fingerprint': "TEXT NOT NULL DEFAULT ''",
+    'checks': 'INTEGER NOT NULL DEFAULT 0',
+    'changes': 'INTEGER NOT NULL DEFAULT 0',
+    'last_checked': 'REAL',
+    'last_changed': 'REAL',
+    'price': 'REAL',
+    'market_cap': 'REAL',
+    'market_updated': 'REAL'
+}
+
+def _clean(value):
+    """Empty string for missing values, '-' and NaN from spreadsheets"""
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+        return ''
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%d')
+    value = str(value).strip()
+    return '' if value in ('-', 'nan', 'NaT') else value
+
+def _filled(value):
+    """False for empty fields, also empty lists like a Social Media without links"""
+    if isinstance(value, (list, dict)):
+        return bool(value)
+    return _clean(value) != ''
+
+class CompanyStore:
+    """
+    One SQLite table with a row per ticker
+
+    Scrapes upsert their row in place; columns that come back empty keep
+    the value from the last good scrape. Indexed on sector and
+    last_scraped so stale() is a single indexed query. Has the same
+    write()/close() interface as ResultSink, so it can be used as a sink.
+
+    Every stage also stores a content fingerprint per ticker, see
+    record_check() and refresh_queue().
+    """
+
+    def __init__(self, path=COMPANY_STORE_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS companies (
+                code TEXT PRIMARY KEY,
+                name TEXT NOT NULL DEFAULT '',
+                sector TEXT NOT NULL DEFAULT '',
+                listing_date TEXT NOT NULL DEFAULT '',
+                website TEXT NOT NULL DEFAULT '',
+                email TEXT NOT NULL DEFAULT '',
+                phone TEXT NOT NULL DEFAULT '',
+                address TEXT NOT NULL DEFAULT '',
+                social_media TEXT NOT NULL DEFAULT '[]',
+                data TEXT,
+                listed INTEGER NOT NULL DEFAULT 1,
+                last_scraped REAL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(companies)')}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f'ALTER TABLE companies ADD COLUMN {column} {definition}')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_companies_sector ON companies (sector, last_scraped)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_companies_last_scraped ON companies (last_scraped)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_companies_last_checked ON companies (last_checked)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_companies_market_cap ON companies (market_cap)')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _row(self, record, scraped):
+        values = {column: '' for column in TEXT_COLUMNS}
+        for field, column in FIELD_COLUMNS.items():
+            if field in record and _clean(record[field]):
+                values[column] = _clean(record[field])
+        social = record.get('Social Media') or []
+        if isinstance(social, str):
+            social = [link for link in social.splitlines() if link.strip()]
+        now = time.time()
+        return (
+            _clean(record.get('Kode')).upper(),
+            *[values[column] for column in TEXT_COLUMNS],
+            json.dumps(social, ensure_ascii=False),
+            # Field kosong tidak ikut di-patch, jadi tidak menimpa nilai dari scrape yang berhasil
+            json.dumps({field: value for field, value in record.items() if _filled(value)}, ensure_ascii=False, default=str) if scraped else None,
+            now if scraped else None,
+            now
+        )
+
+    def upsert_many(self, records, scraped=True):
+        """
+        Insert or update rows by ticker
+
+        The stored record is merged with the new one, so fields from
+        another stage (e.g. website contacts) are kept; empty fields of
+        the new record never blank a stored value. scraped=False is
+        for list data (name, listing date) and leaves last_scraped and
+        the stored record untouched.
+        """
+        rows = [self._row(record, scraped) for record in records if _clean(record.get('Kode'))]
+        updates = ', '.join(
+            f"{column} = CASE WHEN excluded.{column} != '' THEN excluded.{column} ELSE companies.{column} END"
+            for column in TEXT_COLUMNS
+        )
+        with self._lock, self.conn:
+            self.conn.executemany(f'''
+                INSERT INTO companies (code, {', '.join(TEXT_COLUMNS)}, social_media, data, last_scraped, updated_at)
+                VALUES ({', '.join('?' * (len(TEXT_COLUMNS) + 5))})
+                ON CONFLICT (code) DO UPDATE SET
+                    {updates},
+                    social_media = CASE WHEN excluded.social_media != '[]' THEN excluded.social_media ELSE companies.social_media END,
+                    data = CASE
+                        WHEN companies.data IS NULL THEN excluded.data
+                        WHEN excluded.data IS NULL THEN companies.data
+                        ELSE json_patch(companies.data, excluded.data)
+                    END,
+                    last_scraped = COALESCE(excluded.last_scraped, companies.last_scraped),
+                    updated_at = excluded.updated_at
+            ''', rows)
+        return len(rows)
+
+    def upsert(self, record, scraped=True):
+        return self.upsert_many([record], scraped)
+
+    def write(self, record):
+        """ResultSink interface: store one scraped record"""
+        self.upsert(record)
+
+    def sync_company_list(self, companies, changed=()):
+        """
+        Apply the company list (DataFrame from get_company_list)
+
+        Tickers no longer on the list are kept but marked as not listed.
+        changed (get_company_list.changed_codes) are queued for a full
+        re-scrape with mark_changed().
+        """
+        records = companies.to_dict('records')
+        self.upsert_many(records, scraped=False)
+        self.mark_changed(changed)
+        codes = [record['Kode'] for record in records]
+        with self._lock, self.conn:
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS listed_codes (code TEXT PRIMARY KEY)')
+            self.conn.execute('DELETE FROM listed_codes')
+            self.conn.executemany('INSERT OR IGNORE INTO listed_codes VALUES (?)', [(code,) for code in codes])
+            self.conn.execute('UPDATE companies SET listed = 1 WHERE listed = 0 AND code IN (SELECT code FROM listed_codes)')
+            delisted = self.conn.execute(
+                'UPDATE companies SET listed = 0, updated_at = ? WHERE listed = 1 AND code NOT IN (SELECT code FROM listed_codes)',
+                (time.time(),)
+            ).rowcount
+        return delisted
+
+    def mark_changed(self, codes):
+        """
+        Queue tickers for a full re-scrape, returns rows updated
+
+        Clears last_scraped, last_checked and both fingerprints, so the
+        tickers come first in stale() and refresh_queue() and their pages
+        are parsed again even when the page itself did not change (a
+        rename on the company list).
+        """
+        with self._lock, self.conn:
+            cursor = self.conn.executemany(
+                "UPDATE companies SET last_scraped = NULL, last_checked = NULL, fingerprint = '', website_fingerprint = '' WHERE code = ?",
+                [(code,) for code in codes]
+            )
+            return cursor.rowcount
+
+    def stale(self, sector=None, max_age_days=30, limit=None, by_size=False):
+        """
+        Listed tickers not scraped in max_age_days (never scraped first), optionally in one sector
+
+        With by_size the largest market cap comes first instead (see
+        update_market_data), tickers without market data last.
+        """
+        query = 'SELECT code FROM companies WHERE listed = 1 AND (last_scraped IS NULL OR last_scraped < ?)'
+        params = [time.time() - max_age_days * 24 * 3600]
+        if sector:
+            query += ' AND sector = ?'
+            params.append(sector)
+        if by_size:
+            query += ' ORDER BY market_cap IS NULL, market_cap DESC, code'
+        else:
+            query += ' ORDER BY last_scraped IS NOT NULL, last_scraped, code'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def update_market_data(self, market):
+        """Store price and market cap from market_data.get_market_data, returns rows updated"""
+        now = time.time()
+        rows = [(values.get('price'), values.get('market_cap'), now, code) for code, values in market.items()]
+        with self._lock, self.conn:
+            cursor = self.conn.executemany(
+                'UPDATE companies SET price = ?, market_cap = ?, market_updated = ? WHERE code = ?',
+                rows
+            )
+            return cursor.rowcount
+
+    def fingerprints(self, codes, kind='profile'):
+        """Stored fingerprints {code: fingerprint} of a stage for the given tickers"""
+        column = FINGERPRINT_COLUMNS[kind]
+        codes = list(codes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(codes), 500):
+                chunk = codes[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT code, {column} FROM companies WHERE {column} != '' AND code IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                found.update(rows.fetchall())
+        return found
+
+    def record_check(self, code, fingerprint, kind='profile', record=None):
+        """
+        Store the fingerprint of a fetched page, returns True if it changed
+
+        record is upserted when given (the page was parsed). Profile
+        checks count towards checks/changes, the change frequency used
+        by refresh_queue(); a changed website also counts as a change.
+        """
+        column = FINGERPRINT_COLUMNS[kind]
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(f'SELECT {column} FROM companies WHERE code = ?', (code,)).fetchone()
+            changed = not row or row[0] != fingerprint
+            if record is not None:
+                self.upsert(record)
+            with self.conn:
+                self.conn.execute(f'''
+                    UPDATE companies SET
+                        {column} = ?,
+                        checks = checks + ?,
+                        changes = changes + ?,
+                        last_checked = CASE WHEN ? THEN ? ELSE last_checked END,
+                        last_changed = CASE WHEN ? THEN ? ELSE last_changed END,
+                        last_scraped = ?
+                    WHERE code = ?
+                ''', (
+                    fingerprint,
+                    1 if kind == 'profile' else 0,
+                    1 if changed and row and row[0] else 0,
+                    kind == 'profile', now,
+                    changed, now,
+                    now,
+                    code
+                ))
+        return changed
+
+    def refresh_queue(self, limit=None, sector=None, min_age_hours=12):
+        """
+        Tickers to re-check, most urgent first
+
+        Never-checked tickers come first, then the rest by hours since
+        the last check times the observed change rate, smoothed as
+        (changes + 1) / (checks + 2) so rarely seen tickers are not
+        starved. Tickers checked in the last min_age_hours are skipped.
+        """
+        now = time.time()
+        query = 'SELECT code FROM companies WHERE listed = 1 AND (last_checked IS NULL OR last_checked < ?)'
+        params = [now - min_age_hours * 3600]
+        if sector:
+            query += ' AND sector = ?'
+            params.append(sector)
+        query += ' ORDER BY last_checked IS NOT NULL, (? - last_checked) * (changes + 1.0) / (checks + 2.0) DESC, code'
+        params.append(now)
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def codes(self, listed_only=True):
+        """Tickers in company list order (alphabetical)"""
+        query = 'SELECT code FROM companies' + (' WHERE listed = 1' if listed_only else '') + ' ORDER BY code'
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query)]
+
+    def get(self, code):
+        """Stored scrape record of a ticker (empty fields left out), None if it was never scraped"""
+        with self._lock:
+            row = self.conn.execute('SELECT data FROM companies WHERE code = ?', (code.upper(),)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def _select(self, sector=None, listed_only=True, after=None, limit=None):
+        query = f"SELECT {', '.join(EXPORT_NAMES)} FROM companies WHERE 1 = 1"
+        params = []
+        if listed_only:
+            query += ' AND listed = 1'
+        if sector:
+            query += ' AND sector = ?'
+            params.append(sector)
+        if after is not None:
+            query += ' AND code > ?'
+            params.append(after)
+        query += ' ORDER BY code'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            df = pd.read_sql_query(query, self.conn, params=params)
+        df['social_media'] = df['social_media'].map(json.loads)
+        df['last_scraped'] = pd.to_datetime(df['last_scraped'], unit='s')
+        df['listed'] = df['listed'].astype(bool)
+        return df.rename(columns=EXPORT_NAMES)
+
+    def to_dataframe(self, sector=None, listed_only=True):
+        """All rows with the repo's column names, Social Media as a list"""
+        return self._select(sector, listed_only)
+
+    def iter_chunks(self, chunk_size=5000, sector=None, listed_only=True):
+        """Same rows as to_dataframe() in DataFrames of chunk_size, for result_sink.export_report"""
+        after = None
+        while True:
+            # Keyset pagination: lock hanya dipegang selama satu query
+            df = self._select(sector, listed_only, after, chunk_size)
+            if df.empty:
+                return
+            yield df
+            after = df['Kode'].iloc[-1]
+
+    def summary(self):
+        with self._lock:
+            total, listed, scraped = self.conn.execute(
+                'SELECT COUNT(*), SUM(listed), COUNT(last_scraped) FROM companies'
+            ).fetchone()
+        return {'companies': total, 'listed': listed or 0, 'scraped': scraped}
+
+    def close(self):
+        self.conn.close()
+
+def load_result_file(path):
+    """Records from an old result file (.xlsx, .csv, .jsonl or sink .db)"""
+    if path.lower().endswith('.xlsx'):
+        df = pd.read_excel(path, dtype=str)
+        return df.to_dict('records')
+    return list(read_records(path))
+
+def import_result_files(store, paths):
+    """Upsert rows of old result files that have a real ticker in 'Kode'"""
+    total = 0
+    for path in paths:
+        try:
+            records = load_result_file(path)
+        except Exception as e:
+            print(f"Error reading {path}: {str(e)}")
+            continue
+        # Backup lama berisi nomor urut di kolom Kode, bukan ticker
+        records = [record for record in records if _clean(record.get('Kode')).isalpha()]
+        # Baris tanpa data apa pun tidak dihitung sebagai hasil scrape
+        records = [record for record in records if any(_clean(record.get(field)) for field in FIELD_COLUMNS)]
+        total += store.upsert_many(records)
+        print(f"{path}: {len(records)} rows imported")
+    return total
+
+def main():
+    from get_company_list import load_company_list
+
+    with CompanyStore() as store:
+        store.sync_company_list(load_company_list())
+        paths = sorted(set(glob.glob('company_data*.xlsx') + glob.glob('idx_company_data_*.xlsx') + glob.glob('company_data*.jsonl')))
+        import_result_files(store, [path for path in paths if os.path.getsize(path) > 0])
+        print(f"Store: {store.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import os
+import queue
+import threading
+from urllib.parse import urlparse
+from selenium.common.exceptions import WebDriverException
+from tqdm import tqdm
+from metrics import METRICS
+
+def default_workers():
+    """Number of drivers to run, one per core but not more than 4"""
+    return max(1, min(os.cpu_count() or 1, 4))
+
+def host_of(url):
+    """Get host name of a URL, used as key for the per-host limit"""
+    return urlparse(url).netloc.lower()
+
+class DriverPool:
+    """
+    Pool of WebDriver workers fed from a shared queue
+
+    - setup_fn: function that creates a new driver
+    - workers: number of drivers running at the same time
+    - max_per_host: max jobs running at the same time for one host
+    - host_fn: function item -> host, needed for max_per_host
+    - page_timeout: page load timeout in seconds, a driver that hangs
+      longer than this is treated as wedged and restarted
+    - retries: how many times an item is retried on a fresh driver
+      after a WebDriverException; any other error of an item is
+      printed and counted, its result stays None and the worker goes on
+    - reuse: keep drivers running between map() calls instead of
+      quitting them, call close() when done
+    """
+
+    def __init__(self, setup_fn, workers=None, max_per_host=None, host_fn=None, page_timeout=30, retries=1, reuse=False):
+        self.setup_fn = setup_fn
+        self.workers = workers or default_workers()
+        self.max_per_host = max_per_host
+        self.host_fn = host_fn
+        self.page_timeout = page_timeout
+        self.retries = retries
+        self.reuse = reuse
+        self._idle = queue.Queue()
+        self._warming = 0
+        self._host_locks = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _host_semaphore(self, item):
+        if not self.max_per_host or not self.host_fn:
+            return None
+        host = self.host_fn(item)
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_locks[host]
+
+    def _start_driver(self):
+        driver = self.setup_fn()
+        driver.set_page_load_timeout(self.page_timeout)
+        driver.set_script_timeout(self.page_timeout)
+        return driver
+
+    def prewarm(self, count=1):
+        """Start count drivers in the background so the first jobs get a ready browser"""
+        with self._lock:
+            self._warming += count
+        for _ in range(count):
+            threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _warm_one(self):
+        try:
+            self._idle.put(self._start_driver())
+        except Exception as e:
+            print(f"Error starting driver: {str(e)}")
+            self._idle.put(None)
+
+    def _take_driver(self):
+        """An idle or pre-warmed driver if there is one, otherwise a new one"""
+        while True:
+            with self._lock:
+                warming = self._warming > 0
+                if warming:
+                    self._warming -= 1
+            try:
+                # Driver yang sedang di-warm biasanya lebih cepat siap daripada start baru
+                driver = self._idle.get(timeout=self.page_timeout) if warming else self._idle.get_nowait()
+            except queue.Empty:
+                return self._start_driver()
+            if driver is not None and self._is_alive(driver):
+                return driver
+            if driver is not None:
+                self._stop_driver(driver)
+
+    def close(self):
+        """Quit idle drivers kept by reuse or prewarm"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if driver is not None:
+                self._stop_driver(driver)
+
+    def _stop_driver(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _is_alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _run_job(self, job_fn, driver, item):
+        semaphore = self._host_semaphore(item)
+        if semaphore:
+            with semaphore:
+                return job_fn(driver, item)
+        return job_fn(driver, item)
+
+    def _worker(self, job_fn, tasks, results, progress, on_result):
+        driver = None
+        try:
+            while True:
+                try:
+                    index, item = tasks.get_nowait()
+                except queue.Empty:
+                    return
+
+                for attempt in range(self.retries + 1):
+                    if driver is None:
+                        try:
+                            driver = self._take_driver()
+                        except Exception as e:
+                            print(f"Error starting driver: {str(e)}")
+                            continue
+
+                    try:
+                        results[index] = self._run_job(job_fn, driver, item)
+                        failed = False
+                    except WebDriverException as e:
+                        print(f"Driver error on {item}: {str(e).splitlines()[0] if str(e) else e}")
+                        METRICS.error('driver', e)
+                        failed = True
+                    except Exception as e:
+                        # Error di job sendiri, bukan di driver: tidak diulang, worker lanjut ke item berikutnya
+                        print(f"Error on {item}: {str(e)}")
+                        METRICS.error('pool', e)
+                        failed = False
+
+                    # Restart crashed or wedged drivers before the next item
+                    if failed or not self._is_alive(driver):
+                        self._stop_driver(driver)
+                        driver = None
+                    if not failed:
+                        break
+
+                if on_result and results[index] is not None:
+                    try:
+                        on_result(index, results[index])
+                    except Exception as e:
+                        print(f"Error handling result of {item}: {str(e)}")
+                        METRICS.error('pool', e)
+                progress.update(1)
+        finally:
+            if driver is not None and self.reuse:
+                self._idle.put(driver)
+            elif driver is not None:
+                self._stop_driver(driver)
+
+    def map(self, job_fn, items, desc="Processing", on_result=None):
+        """
+        Run job_fn(driver, item) for every item, results keep input order
+
+        The result of an item that failed on every attempt is None.
+
+        on_result(index, result) is called from the worker thread as soon
+        as an item finishes, e.g. to stream it to a ResultSink.
+        """
+        items = list(items)
+        tasks = queue.Queue()
+        for index, item in enumerate(items):
+            tasks.put((index, item))
+
+        results = [None] * len(items)
+        threads = []
+        with tqdm(total=len(items), desc=desc) as progress:
+            for _ in range(min(self.workers, len(items))):
+                thread = threading.Thread(target=self._worker, args=(job_fn, tasks, results, progress, on_result), daemon=True)
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+
+        return results
@@ -1,65 +1,246 @@
+import json
+import os
+import re
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
-import time
+from rate_limiter import RateLimitedSession
 
-def get_idx_companies():
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+WIKI_API_URL = "https://id.wikipedia.org/w/api.php"
+WIKI_TITLE = "Daftar perusahaan yang tercatat di Bursa Efek Indonesia"
+# URL Wikipedia untuk daftar perusahaan Indonesia
+WIKI_URL = "https://id.wikipedia.org/wiki/" + WIKI_TITLE.replace(' ', '_')
+
+COMPANY_LIST_FILE = 'daftar_perusahaan_idx.csv'
+# Revisi Wikipedia terakhir yang sudah disimpan ke COMPANY_LIST_FILE
+LIST_STATE_FILE = 'daftar_perusahaan_idx.json'
+
+LIST_COLUMNS = ['Kode', 'Nama Perusahaan', 'Sektor Bisnis', 'Tanggal Pencatatan']
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Judul kolom di tabel Wikipedia -> kolom hasil
+HEADER_COLUMNS = [
+    ('kode', 'Kode'),
+    ('nama', 'Nama Perusahaan'),
+    ('sektor', 'Sektor Bisnis'),
+    ('industri', 'Sektor Bisnis'),
+    ('tanggal', 'Tanggal Pencatatan'),
+    ('pencatatan', 'Tanggal Pencatatan')
+]
+
+# Kode saham ditulis "BEI: AALI" di Wikipedia
+CODE_PATTERN = re.compile(r'(?:(?:BEI|IDX)\s*:\s*)?([A-Z]{4})')
+
+MONTHS = {
+    'januari': 1, 'februari': 2, 'maret': 3, 'april': 4, 'mei': 5, 'juni': 6,
+    'juli': 7, 'agustus': 8, 'september': 9, 'oktober': 10, 'november': 11, 'desember': 12
+}
+
+def parse_code(text):
+    """Ticker from 'BEI: AALI' or 'AALI', None for anything else"""
+    match = CODE_PATTERN.fullmatch(text.strip())
+    return match.group(1) if match else None
+
+def parse_listing_date(text):
+    """Indonesian date like '6 Desember 1997' as a Timestamp, NaT if it does not parse"""
+    match = re.search(r'(\d{1,2})\s+([A-Za-z]+)\s+(\d{4})', text or '')
+    if match and match.group(2).lower() in MONTHS:
+        return pd.Timestamp(int(match.group(3)), MONTHS[match.group(2).lower()], int(match.group(1)))
+    return pd.to_datetime(text, errors='coerce', dayfirst=True) if text else pd.NaT
+
+def _table_rows(html):
+    """Yield (is_header, [cell texts]) for every row of every wikitable"""
+    if lxml is not None:
+        tree = lxml.html.fromstring(html)
+        for table in tree.xpath('//table[contains(concat(" ", @class, " "), " wikitable ")]'):
+            for row in table.iter('tr'):
+                cells = [cell for cell in row if cell.tag in ('td', 'th')]
+                yield all(cell.tag == 'th' for cell in cells), [' '.join(cell.text_content().split()) for cell in cells]
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+        for table in soup.find_all('table', {'class': 'wikitable'}):
+            for row in table.find_all('tr'):
+                cells = row.find_all(['td', 'th'], recursive=False)
+                yield all(cell.name == 'th' for cell in cells), [cell.get_text(' ', strip=True) for cell in cells]
+
+def parse_company_tables(html):
+    """
+    Parse the company tables of the Wikipedia page into a typed DataFrame
+
+    Columns are found from each table's header row; the ticker cell is
+    recognized by its 'BEI: XXXX' format when there is no 'Kode' header.
+    """
+    companies = {}
+    columns = {}
+    for is_header, cells in _table_rows(html):
+        if is_header:
+            columns = {}
+            for i, text in enumerate(cells):
+                for keyword, column in HEADER_COLUMNS:
+                    if keyword in text.lower() and column not in columns:
+                        columns[column] = i
+                        break
+            continue
+
+        code_index = columns.get('Kode')
+        if code_index is None or code_index >= len(cells) or not parse_code(cells[code_index]):
+            code_index = next((i for i, text in enumerate(cells) if parse_code(text)), None)
+        if code_index is None:
+            continue
+
+        def cell(column, default_index=None):
+            index = columns.get(column, default_index)
+            return cells[index] if index is not None and index < len(cells) else ''
+
+        code = parse_code(cells[code_index])
+        name = cell('Nama Perusahaan', code_index + 1)
+        if code and name and code not in companies:
+            companies[code] = {
+                'Kode': code,
+                'Nama Perusahaan': name,
+                'Sektor Bisnis': cell('Sektor Bisnis'),
+                'Tanggal Pencatatan': parse_listing_date(cell('Tanggal Pencatatan'))
+            }
+    return typed_company_list(pd.DataFrame(list(companies.values()), columns=LIST_COLUMNS))
+
+def typed_company_list(df):
+    """Company list with LIST_COLUMNS as string/datetime columns, one row per ticker"""
+    df = df.reindex(columns=LIST_COLUMNS)
+    for column in ['Kode', 'Nama Perusahaan', 'Sektor Bisnis']:
+        df[column] = df[column].fillna('').astype('string')
+    df['Tanggal Pencatatan'] = pd.to_datetime(df['Tanggal Pencatatan'], errors='coerce')
+    return df.drop_duplicates('Kode').reset_index(drop=True)
+
+def load_company_list(filename=COMPANY_LIST_FILE):
+    """
+    Read the stored company list
+
+    Files written by the old parser have the ticker as 'BEI: AALI' in
+    'Nama Perusahaan' and the name in 'Sektor Bisnis'; they are read
+    into the correct columns.
+    """
+    if not os.path.exists(filename):
+        return typed_company_list(pd.DataFrame(columns=LIST_COLUMNS))
+    df = pd.read_csv(filename, dtype=str, keep_default_na=False)
+    if 'Nama Perusahaan' in df.columns and df['Nama Perusahaan'].str.startswith('BEI:').any():
+        df = df[df['Nama Perusahaan'].str.startswith('BEI:')]
+        df = pd.DataFrame({
+            'Kode': df['Nama Perusahaan'].map(parse_code),
+            'Nama Perusahaan': df['Sektor Bisnis'],
+            'Sektor Bisnis': '',
+            'Tanggal Pencatatan': pd.NaT
+        }).dropna(subset=['Kode'])
+    return typed_company_list(df)
+
+def save_company_list(df, filename=COMPANY_LIST_FILE):
+    df.to_csv(filename, index=False, date_format='%Y-%m-%d')
+    print(f"Successfully saved {len(df)} companies to {filename}")
+
+def diff_company_lists(old, new):
+    """New, delisted and renamed tickers between two company lists"""
+    old_names = dict(zip(old['Kode'], old['Nama Perusahaan']))
+    new_names = dict(zip(new['Kode'], new['Nama Perusahaan']))
+    return {
+        'new': [code for code in new_names if code not in old_names],
+        'delisted': [code for code in old_names if code not in new_names],
+        'renamed': [
+            {'Kode': code, 'old': old_names[code], 'new': name}
+            for code, name in new_names.items()
+            if code in old_names and old_names[code] != name
+        ]
+    }
+
+def changed_codes(diff):
+    """Tickers that need to be scraped again after a refresh"""
+    return diff['new'] + [item['Kode'] for item in diff['renamed']]
+
+def get_revision(session):
+    """Current revision id of the Wikipedia page, from the small MediaWiki query API"""
+    params = {'action': 'query', 'prop': 'revisions', 'titles': WIKI_TITLE, 'rvprop': 'ids|timestamp', 'format': 'json', 'formatversion': '2'}
+    response = session.get(WIKI_API_URL, params=params, headers=HEADERS, timeout=15)
+    response.raise_for_status()
+    return response.json()['query']['pages'][0]['revisions'][0]['revid']
+
+def get_revision_html(session, revid):
+    """Rendered HTML of one revision of the page"""
+    params = {'action': 'parse', 'oldid': revid, 'prop': 'text', 'format': 'json', 'formatversion': '2'}
+    response = session.get(WIKI_API_URL, params=params, headers=HEADERS, timeout=30)
+    response.raise_for_status()
+    return response.json()['parse']['text']
+
+def load_list_state(state_file=LIST_STATE_FILE):
+    try:
+        with open(state_file) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def refresh_company_list(filename=COMPANY_LIST_FILE, state_file=LIST_STATE_FILE, session=None, force=False):
+    """
+    Update the company list only when the Wikipedia page has a new revision
+
+    Returns the diff against the stored list (see diff_company_lists),
+    with empty lists when the revision did not change.
+    """
+    session = session or RateLimitedSession(requests.Session())
+    state = load_list_state(state_file)
+    revid = get_revision(session)
+    if not force and state.get('revid') == revid and os.path.exists(filename):
+        print(f"Company list is up to date (revision {revid})")
+        return {'new': [], 'delisted': [], 'renamed': []}
+
+    new = parse_company_tables(get_revision_html(session, revid))
+    if new.empty:
+        print("No companies found!")
+        return None
+
+    diff = diff_company_lists(load_company_list(filename), new)
+    save_company_list(new, filename)
+    with open(state_file, 'w') as f:
+        json.dump({'revid': revid}, f)
+    print(f"Revision {revid}: {len(diff['new'])} new, {len(diff['delisted'])} delisted, {len(diff['renamed'])} renamed")
+    return diff
+
+def get_idx_companies(cache=None):
+    """Download the company list from Wikipedia, through the page cache if given"""
     try:
-        # URL Wikipedia untuk daftar perusahaan Indonesia
-        url = "https://id.wikipedia.org/wiki/Daftar_perusahaan_yang_tercatat_di_Bursa_Efek_Indonesia"
-        
-        # Headers untuk request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         # Get halaman web
-        response = requests.get(url, headers=headers)
+        if cache:
+            response = cache.get(requests.Session(), WIKI_URL, headers=HEADERS)
+        else:
+            response = requests.get(WIKI_URL, headers=HEADERS)
         response.raise_for_status()
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Cari tabel perusahaan
-        tables = soup.find_all('table', {'class': 'wikitable'})
-        
-        companies = []
-        for table in tables:
-            rows = table.find_all('tr')[1:]  # Skip header row
-            for row in rows:
-                try:
-                    cols = row.find_all(['td', 'th'])
-                    if len(cols) >= 3:  # Pastikan ada minimal 3 kolom (Kode, Nama, Sektor)
-                        kode = cols[0].text.strip()
-                        nama = cols[1].text.strip()
-                        sektor = cols[2].text.strip() if len(cols) > 2 else ''
-                        
-                        if kode and nama:  # Only add if both code and name are not empty
-                            company = {
-                                'Kode': kode,
-                                'Nama Perusahaan': nama,
-                                'Sektor Bisnis': sektor,
-                                'Website': '',  # Akan diisi nanti
-                                'Social Media': [],  # Akan diisi nanti
-                                'Kontak': ''  # Akan diisi nanti
-                            }
-                            companies.append(company)
-                            print(f"Added: {nama} ({kode})")
-                            
-                except Exception as e:
-                    print(f"Error processing row: {str(e)}")
-                    continue
-        
-        # Create DataFrame and save to CSV
-        if companies:
-            df = pd.DataFrame(companies)
-            df.to_csv('daftar_perusahaan_idx.csv', index=False)
-            print(f"Successfully saved {len(companies)} companies to daftar_perusahaan_idx.csv")
+
+        companies = parse_company_tables(response.text)
+        if not companies.empty:
+            save_company_list(companies)
         else:
             print("No companies found!")
-            
+        return companies
+
     except Exception as e:
         print(f"Error: {str(e)}")
 
+def read_company_codes(filename=COMPANY_LIST_FILE):
+    """Read all company codes from the company list CSV, in file order"""
+    return load_company_list(filename)['Kode'].tolist()
+
 if __name__ == "__main__":
-    get_idx_companies() 
\ No newline at end of file
+    from company_store import CompanyStore
+
+    changes = refresh_company_list()
+    if changes:
+        for key in ['new', 'delisted', 'renamed']:
+            if changes[key]:
+                print(f"{key}: {changes[key]}")
+        with CompanyStore() as store:
+            # Ticker baru dan yang ganti nama diambil ulang lebih dulu oleh batch_runner.py --refresh
+            store.sync_company_list(load_company_list(), changed=changed_codes(changes))
@@ -1,9 +1,50 @@
 import requests
-import pandas as pd
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
+from idx_http import create_session
+from rate_limiter import LIMITER
+from place_cache import PlaceCache
+from result_sink import ResultSink, export_excel, export_report
+from metrics import METRICS, serve_from_env
 
-def get_places(api_key, query, location="-6.9990899,107.6311617", radius=5000):
+# Urutan kolom di file Excel
+EXPORT_COLUMNS = [
+    "nama",
+    "kategori",
+    "alamat",
+    "website",
+    "telepon",
+    "maps_url",
+    "rating",
+    "total_review"
+]
+
+PLACES_BASE_URL = "https://maps.googleapis.com/maps/api/place"
+
+# Field Places Details -> kolom hasil
+DETAIL_FIELDS = {
+    "website": "website",
+    "formatted_phone_number": "telepon",
+    "url": "maps_url"
+}
+
+# Jeda sebelum mencoba next_page_token (total sekitar 2 detik yang diminta API)
+PAGE_TOKEN_DELAYS = [1.0, 0.5, 0.5, 1.0, 2.0]
+
+def is_quota_error(response, result):
+    """True when the Places API says we are over the rate limit"""
+    return response.status_code in (429, 503) or result.get("status") == "OVER_QUERY_LIMIT"
+
+def response_json(response):
+    """JSON body of an API response, {} when it is not JSON (e.g. an HTML 503 page)"""
+    try:
+        return response.json()
+    except ValueError:
+        return {}
+
+def get_places(api_key, query, location="-6.9990899,107.6311617", radius=5000, sink=None,
+               workers=8, base_url=PLACES_BASE_URL, limiter=None, cache=None, session=None, retries=2):
     """
     Fetch places data using Google Places API
     
@@ -12,9 +53,24 @@ def get_places(api_key, query, location="-6.9990899,107.6311617", radius=5000):
     - query: Search query (e.g., "restaurant", "cafe", etc.)
     - location: Latitude,Longitude string
     - radius: Search radius in meters
+    - sink: optional ResultSink, each place is written as soon as it is fetched
+    - workers: number of detail lookups running at the same time
+    - base_url: Places API base URL (a local mock server for testing)
+    - limiter: HostRateLimiter, the shared LIMITER by default
+    - cache: optional PlaceCache, details are only requested for places
+      that are not in it or whose fields are stale
+    - session: optional shared requests session, left open afterwards
+    - retries: how many times a search page is retried after a quota
+      error, each time after the limiter's backoff
+    
+    Details of page N are fetched in the background while we wait for
+    the next_page_token of page N+1. Results keep the API order.
     """
     
-    base_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+    search_url = base_url + "/textsearch/json"
+    limiter = limiter or LIMITER
+    own_session = session is None
+    session = session or create_session(pool_size=workers, headers={})
     places_data = []
     
     params = {
@@ -24,76 +80,148 @@ def get_places(api_key, query, location="-6.9990899,107.6311617", radius=5000):
         "key": api_key
     }
     
-    while True:
-        try:
-            response = requests.get(base_url, params=params)
-            result = response.json()
-            
-            if response.status_code != 200:
-                print("Error:", result.get("error_message", "Unknown error"))
-                break
+    def finish_page(page):
+        # Collect details in the original order once they are done
+        for place_data, place_id, future in page:
+            if future:
+                details = future.result()
+                if details is not None and cache:
+                    cache.put(place_id, details)
+                place_data.update(details or {})
+            for column in DETAIL_FIELDS.values():
+                place_data.setdefault(column, "")
+            places_data.append(place_data)
+            if sink:
+                sink.write(place_data)
+    
+    previous_page = []
+    token_attempts = 0
+    quota_attempts = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            try:
+                limiter.wait(search_url)
+                with METRICS.span('places.search'):
+                    response = session.get(search_url, params=params, timeout=10)
+                    result = response_json(response)
+                METRICS.page(len(response.content))
                 
-            for place in result.get("results", []):
-                # Get basic place information
-                place_data = {
-                    "nama": place.get("name", ""),
-                    "alamat": place.get("formatted_address", ""),
-                    "kategori": ", ".join(place.get("types", [])),
-                    "rating": place.get("rating", ""),
-                    "total_review": place.get("user_ratings_total", ""),
-                }
+                # Status dilaporkan sebelum isi dicek, 503 tanpa JSON juga memperlambat host
+                if limiter.report(search_url, blocked=is_quota_error(response, result)) and quota_attempts < retries:
+                    quota_attempts += 1
+                    METRICS.error('places.search', 'quota')
+                    continue
+                quota_attempts = 0
                 
-                # Get additional details
-                if place.get("place_id"):
-                    details = get_place_details(api_key, place["place_id"])
-                    place_data.update(details)
+                if response.status_code != 200:
+                    print("Error:", result.get("error_message", "Unknown error"))
+                    METRICS.error('places.search', f"HTTP {response.status_code}")
+                    break
                 
-                places_data.append(place_data)
-                time.sleep(0.2)  # Delay to respect API limits
-            
-            # Check if there are more results
-            if "next_page_token" not in result:
-                break
+                # next_page_token baru valid beberapa detik setelah dibuat, coba lagi sampai bisa
+                if result.get("status") == "INVALID_REQUEST" and "pagetoken" in params and token_attempts < len(PAGE_TOKEN_DELAYS) - 1:
+                    token_attempts += 1
+                    time.sleep(PAGE_TOKEN_DELAYS[token_attempts])
+                    continue
+                token_attempts = 0
                 
-            # Wait before requesting next page (required by API)
-            params["pagetoken"] = result["next_page_token"]
-            time.sleep(2)
-            
-        except Exception as e:
-            print(f"Error fetching data: {str(e)}")
-            break
+                # Satu lookup cache untuk seluruh halaman sebelum request details
+                results = result.get("results", [])
+                columns = list(DETAIL_FIELDS.values())
+                place_ids = [place["place_id"] for place in results if place.get("place_id")]
+                cached = cache.lookup(place_ids, columns) if cache else {}
+                
+                page = []
+                for place in results:
+                    # Get basic place information
+                    place_data = {
+                        "nama": place.get("name", ""),
+                        "alamat": place.get("formatted_address", ""),
+                        "kategori": ", ".join(place.get("types", [])),
+                        "rating": place.get("rating", ""),
+                        "total_review": place.get("user_ratings_total", ""),
+                        "place_id": place.get("place_id", ""),
+                        "lat": place.get("geometry", {}).get("location", {}).get("lat", ""),
+                        "lng": place.get("geometry", {}).get("location", {}).get("lng", ""),
+                    }
+                    
+                    # Get additional details in the background, only what the cache lacks
+                    place_id = place.get("place_id")
+                    future = None
+                    if place_id:
+                        fresh, stale = cached.get(place_id, ({}, columns))
+                        place_data.update(fresh)
+                        if stale:
+                            future = executor.submit(
+                                fetch_place_details, api_key, place_id, session, base_url, limiter, 2, stale
+                            )
+                    page.append((place_data, place_id, future))
+                
+                # Previous page had the whole token wait to finish its details
+                finish_page(previous_page)
+                previous_page = page
+                
+                # Check if there are more results
+                if "next_page_token" not in result:
+                    break
+                
+                # Request next page right away, an early token is retried above
+                params["pagetoken"] = result["next_page_token"]
+                time.sleep(PAGE_TOKEN_DELAYS[0])
+                
+            except Exception as e:
+                print(f"Error fetching data: {str(e)}")
+                METRICS.error('places.search', e)
+                break
+        
+        finish_page(previous_page)
     
+    if own_session:
+        session.close()
     return places_data
 
-def get_place_details(api_key, place_id):
-    """Get additional place details like website, phone, etc."""
-    details_url = "https://maps.googleapis.com/maps/api/place/details/json"
+def fetch_place_details(api_key, place_id, session=None, base_url=PLACES_BASE_URL, limiter=None, retries=2, columns=None):
+    """Request place details from the API, None when the request failed"""
+    details_url = base_url + "/details/json"
+    session = session or requests
+    limiter = limiter or LIMITER
     
+    # Hanya minta field yang dibutuhkan (yang belum ada di cache)
+    api_fields = [field for field, column in DETAIL_FIELDS.items() if not columns or column in columns]
     params = {
         "place_id": place_id,
-        "fields": "website,formatted_phone_number,url",
+        "fields": ",".join(api_fields),
         "key": api_key
     }
     
-    try:
-        response = requests.get(details_url, params=params)
-        result = response.json()
-        
-        if response.status_code == 200 and "result" in result:
-            details = result["result"]
-            return {
-                "website": details.get("website", ""),
-                "telepon": details.get("formatted_phone_number", ""),
-                "maps_url": details.get("url", "")
-            }
-    except Exception as e:
-        print(f"Error getting details for {place_id}: {str(e)}")
+    for _ in range(retries + 1):
+        try:
+            limiter.wait(details_url)
+            with METRICS.span('places.details'):
+                response = session.get(details_url, params=params, timeout=10)
+                result = response_json(response)
+            METRICS.page(len(response.content))
+            
+            # Kena kuota: limiter memperlambat host ini, lalu coba lagi
+            if limiter.report(details_url, blocked=is_quota_error(response, result)):
+                METRICS.error('places.details', 'quota')
+                continue
+            
+            if response.status_code == 200 and "result" in result:
+                details = result["result"]
+                return {DETAIL_FIELDS[field]: details.get(field, "") for field in api_fields}
+            break
+        except Exception as e:
+            print(f"Error getting details for {place_id}: {str(e)}")
+            METRICS.error('places.details', e)
+            break
     
-    return {
-        "website": "",
-        "telepon": "",
-        "maps_url": ""
-    }
+    return None
+
+def get_place_details(api_key, place_id, session=None, base_url=PLACES_BASE_URL, limiter=None, retries=2):
+    """Get additional place details like website, phone, etc."""
+    details = fetch_place_details(api_key, place_id, session, base_url, limiter, retries)
+    return details or {column: "" for column in DETAIL_FIELDS.values()}
 
 def save_to_excel(data, filename=None):
     """Save data to Excel file"""
@@ -101,26 +229,8 @@ def save_to_excel(data, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"data_tempat_{timestamp}.xlsx"
     
-    df = pd.DataFrame(data)
-    
-    # Reorder columns
-    columns = [
-        "nama",
-        "kategori",
-        "alamat",
-        "website",
-        "telepon",
-        "maps_url",
-        "rating",
-        "total_review"
-    ]
-    
-    df = df.reindex(columns=columns)
-    
-    # Save to Excel
-    df.to_excel(filename, index=False, engine='openpyxl')
-    print(f"Data saved to {filename}")
-    return filename
+    # Save to Excel with the columns in EXPORT_COLUMNS order
+    return export_report(data, filename, columns=EXPORT_COLUMNS)
 
 def main():
     # Replace with your API key
@@ -129,15 +239,25 @@ def main():
     # Search parameters
     SEARCH_QUERY = input("Masukkan kata kunci pencarian (contoh: restoran bandung): ")
     
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sink_file = f"data_tempat_{timestamp}.jsonl"  # Data ditulis per tempat selama proses berjalan
+    
     print("\nMengambil data dari Google Maps...")
-    places = get_places(API_KEY, SEARCH_QUERY)
+    serve_from_env()
+    cache = PlaceCache()
+    with ResultSink(sink_file, append=False) as sink:
+        places = get_places(API_KEY, SEARCH_QUERY, sink=sink, cache=cache)
+    print(f"Cache details: {cache.stats()}")
+    cache.close()
     
     if places:
         print(f"\nBerhasil mengumpulkan data {len(places)} tempat")
-        filename = save_to_excel(places)
+        with METRICS.span('export.xlsx'):
+            filename = export_excel(sink_file, f"data_tempat_{timestamp}.xlsx", columns=EXPORT_COLUMNS)
         print(f"\nData telah disimpan ke file {filename}")
     else:
         print("Tidak ada data yang ditemukan atau terjadi error")
+    METRICS.write_summary(f"data_tempat_{timestamp}_metrics.json")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -0,0 +1,188 @@
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from rate_limiter import RateLimitedSession
+from metrics import METRICS
+from profile_parser import empty_info, apply_profile_label, parse_profile, find_table_html, content_fingerprint
+
+IDX_BASE_URL = "https://www.idx.co.id"
+
+# Endpoint JSON yang dipakai halaman profil IDX untuk mengisi tabelnya
+PROFILE_JSON_PATH = "/primary/ListedCompany/GetCompanyProfilesDetail"
+PROFILE_PAGE_PATH = "/id/perusahaan-tercatat/profil-perusahaan/{code}/"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json, text/html;q=0.9, */*;q=0.8',
+    'Referer': IDX_BASE_URL + '/'
+}
+
+# Field JSON IDX -> label tabel, supaya lewat mapping yang sama
+PROFILE_JSON_FIELDS = {
+    'NamaEmiten': 'nama',
+    'Sektor': 'sektor',
+    'Website': 'situs',
+    'Email': 'email',
+    'Telepon': 'telepon',
+    'Alamat': 'alamat'
+}
+
+def parse_profile_json(data, company_code):
+    """Parse the IDX profile JSON response, None if there is no profile"""
+    profiles = data.get('Profiles') if isinstance(data, dict) else None
+    if not profiles:
+        return None
+
+    profile = profiles[0]
+    info = empty_info(company_code)
+    for field, label in PROFILE_JSON_FIELDS.items():
+        value = profile.get(field)
+        if value:
+            apply_profile_label(info, label, str(value))
+    return info
+
+def create_session(pool_size=16, headers=None):
+    """Create a requests session with a connection pool sized for the workers"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS if headers is None else headers)
+    return session
+
+def http_get(session, url, params=None, timeout=10, cache=None, variant=''):
+    """GET through the page cache when one is given, paced by the host rate limiter"""
+    # Cache hits never reach the limiter, only real requests wait for a token
+    session = RateLimitedSession(session)
+    with METRICS.span('http.fetch'):
+        if cache:
+            response = cache.get(session, url, params=params, variant=variant, timeout=timeout)
+        else:
+            response = session.get(url, params=params, timeout=timeout)
+    if getattr(response, 'from_cache', False):
+        METRICS.count('http.cache_hit')
+    else:
+        METRICS.page(len(response.content))
+    if response.status_code >= 400:
+        METRICS.error('http.fetch', f"HTTP {response.status_code}")
+    return response
+
+def fetch_company_info(session, company_code, base_url=IDX_BASE_URL, timeout=10, cache=None):
+    """
+    Get company information over plain HTTP
+
+    Tries the JSON endpoint first, then the server-rendered HTML page.
+    Returns None when neither has the data (page needs JavaScript).
+    """
+    return fetch_profile(session, company_code, base_url, timeout, cache)[0]
+
+def fetch_profile(session, company_code, base_url=IDX_BASE_URL, timeout=10, cache=None, known_fingerprint=None):
+    """
+    fetch_company_info() that also returns a content fingerprint
+
+    Returns (info, fingerprint). The fingerprint is a hash of the JSON
+    response or of the profile table; when it equals known_fingerprint
+    the page is not parsed and (None, fingerprint) is returned.
+    (None, None) means no data over HTTP.
+    """
+    try:
+        response = http_get(
+            session,
+            base_url + PROFILE_JSON_PATH,
+            params={'KodeEmiten': company_code, 'language': 'id-id'},
+            timeout=timeout,
+            cache=cache,
+            variant='json'
+        )
+        if response.status_code == 200 and 'json' in response.headers.get('Content-Type', ''):
+            fingerprint = content_fingerprint(response.text)
+            if fingerprint == known_fingerprint:
+                return None, fingerprint
+            with METRICS.span('http.parse'):
+                info = parse_profile_json(response.json(), company_code)
+            if info:
+                return info, fingerprint
+    except (requests.RequestException, ValueError) as e:
+        print(f"JSON profile failed for {company_code}: {str(e)}")
+        METRICS.error('http', e)
+
+    try:
+        response = http_get(session, base_url + PROFILE_PAGE_PATH.format(code=company_code), timeout=timeout, cache=cache)
+        table_html = find_table_html(response.text) if response.status_code == 200 else None
+        if table_html:
+            fingerprint = content_fingerprint(table_html)
+            if fingerprint == known_fingerprint:
+                return None, fingerprint
+            with METRICS.span('http.parse'):
+                info = parse_profile(response.text, company_code, table_html=table_html)
+            if info:
+                return info, fingerprint
+    except requests.RequestException as e:
+        print(f"HTML profile failed for {company_code}: {str(e)}")
+        METRICS.error('http', e)
+
+    return None, None
+
+def scrape_companies_http(company_codes, workers=8, base_url=IDX_BASE_URL, browser_fallback=None, sink=None, cache=None, store=None, session=None):
+    """
+    Scrape companies over HTTP with a thread pool, in input order
+
+    browser_fallback(codes) is called once with the codes that need
+    JavaScript and must return their records in the same order. It is
+    not called with an offline PageCache: codes missing from the cache
+    get an empty record, nothing goes to the live site.
+    Every record is also written to sink as soon as it is available.
+    With a PageCache, profile pages are served from disk while fresh.
+    With a CompanyStore, pages whose fingerprint did not change are
+    neither parsed nor written; their stored record is returned.
+    A session passed in is shared with other callers and left open.
+    """
+    own_session = session is None
+    session = session or create_session(pool_size=workers)
+    known = store.fingerprints(company_codes) if store else {}
+    results = []
+    unchanged = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            fetched = executor.map(
+                lambda code: fetch_profile(session, code, base_url, cache=cache, known_fingerprint=known.get(code)),
+                company_codes
+            )
+            for code, (info, fingerprint) in zip(company_codes, tqdm(fetched, total=len(company_codes), desc="Fetching profiles")):
+                if info is None and fingerprint:
+                    # Halaman tidak berubah sejak scrape terakhir
+                    METRICS.count('http.unchanged')
+                    store.record_check(code, fingerprint)
+                    info = dict(empty_info(code), **(store.get(code) or {}))
+                    unchanged += 1
+                elif info is not None:
+                    if store:
+                        store.record_check(code, fingerprint, record=info)
+                    if sink:
+                        sink.write(info)
+                results.append(info)
+    finally:
+        if own_session:
+            session.close()
+
+    if store:
+        print(f"{unchanged} of {len(company_codes)} profiles unchanged")
+
+    missing = [code for code, info in zip(company_codes, results) if info is None]
+    if missing and cache and cache.offline:
+        print(f"\n{len(missing)} companies not in the page cache (offline mode)")
+        fallback = {code: empty_info(code) for code in missing}
+    elif missing and browser_fallback:
+        print(f"\n{len(missing)} companies need a browser, falling back to Selenium...")
+        fallback = dict(zip(missing, browser_fallback(missing)))
+    else:
+        fallback = {code: empty_info(code) for code in missing}
+
+    if sink:
+        for code in missing:
+            sink.write(fallback[code])
+    if store:
+        store.upsert_many([fallback[code] for code in missing if fallback[code].get('Nama Perusahaan')])
+
+    return [info if info is not None else fallback[code] for code, info in zip(company_codes, results)]
@@ -1,23 +1,75 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import pandas as pd
-import time
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 from datetime import datetime
+from driver_pool import DriverPool
+from result_sink import ResultSink, export_report
+from social_links import extract_social_links, add_social_fields
+from site_crawler import enrich_with_websites
+from rate_limiter import LIMITER
+from idx_http import create_session, fetch_company_info
+from get_company_list import read_company_codes
+from company_store import CompanyStore
+from metrics import METRICS, serve_from_env
+from browser import create_driver, PAGE_COUNTER
 
 def setup_driver():
     """Setup Chrome driver with necessary options"""
-    options = webdriver.ChromeOptions()
-    options.add_argument('--start-maximized')
-    # Uncomment baris di bawah jika ingin browser berjalan di background
-    # options.add_argument('--headless')
-    return webdriver.Chrome(options=options)
+    # Pool menjalankan beberapa browser sekaligus, jadi jalan di background
+    return create_driver(warm_profile=True)
 
-def get_company_info(driver, company_code):
-    """Get company information from IDX website"""
-    info = {
+def get_profile_browser(driver, company_code, info):
+    """Fill profile fields from the IDX page rendered in the browser"""
+    # Open company profile page
+    url = f"https://www.idx.co.id/id/perusahaan-tercatat/profil-perusahaan-tercatat/{company_code}/"
+    LIMITER.wait(url)
+    with METRICS.span('idx.fetch'):
+        driver.get(url)
+    
+    # Wait for content to load
+    try:
+        with METRICS.span('idx.wait'):
+            wait = WebDriverWait(driver, 10)
+            wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'company-profile')))
+    except TimeoutException as e:
+        print(f"Timeout waiting for {company_code} profile to load")
+        METRICS.error('idx', e)
+        return
+    LIMITER.report_driver(driver, url)
+    PAGE_COUNTER.record(driver)
+    
+    with METRICS.span('idx.extract'):
+        extract_profile_elements(driver, company_code, info)
+
+def extract_profile_elements(driver, company_code, info):
+    """Read name and detail rows from the rendered profile page"""
+    # Get company name
+    try:
+        name_elem = driver.find_element(By.CLASS_NAME, 'company-name')
+        info['Nama Perusahaan'] = name_elem.text.strip()
+    except NoSuchElementException:
+        print(f"Could not find company name for {company_code}")
+    
+    # Get company details
+    try:
+        details = driver.find_elements(By.CLASS_NAME, 'company-detail')
+        for detail in details:
+            label = detail.find_element(By.CLASS_NAME, 'label').text.strip().lower()
+            value = detail.find_element(By.CLASS_NAME, 'value').text.strip()
+            
+            if 'sektor' in label:
+                info['Sektor Bisnis'] = value
+            elif 'website' in label:
+                info['Website'] = value if value != '-' else ''
+            elif 'telepon' in label or 'phone' in label:
+                info['Kontak'] = value if value != '-' else ''
+    except NoSuchElementException:
+        print(f"Could not find company details for {company_code}")
+
+def empty_company_info(company_code):
+    """Create an empty company record"""
+    return {
         'Kode': company_code,
         'Nama Perusahaan': '',
         'Sektor Bisnis': '',
@@ -25,104 +77,89 @@ def get_company_info(driver, company_code):
         'Social Media': [],
         'Kontak': ''
     }
+
+def get_company_info(driver, company_code, session=None, visit_website=True):
+    """Get company information from IDX website, driver errors on the profile page are raised for DriverPool"""
+    info = empty_company_info(company_code)
     
     try:
-        # Open company profile page
-        url = f"https://www.idx.co.id/id/perusahaan-tercatat/profil-perusahaan-tercatat/{company_code}/"
-        driver.get(url)
-        
-        # Wait for content to load
-        wait = WebDriverWait(driver, 10)
-        content = wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'company-profile')))
-        
-        # Get company name
-        try:
-            name_elem = driver.find_element(By.CLASS_NAME, 'company-name')
-            info['Nama Perusahaan'] = name_elem.text.strip()
-        except NoSuchElementException:
-            print(f"Could not find company name for {company_code}")
-        
-        # Get company details
-        try:
-            details = driver.find_elements(By.CLASS_NAME, 'company-detail')
-            for detail in details:
-                label = detail.find_element(By.CLASS_NAME, 'label').text.strip().lower()
-                value = detail.find_element(By.CLASS_NAME, 'value').text.strip()
-                
-                if 'sektor' in label:
-                    info['Sektor Bisnis'] = value
-                elif 'website' in label:
-                    info['Website'] = value if value != '-' else ''
-                elif 'telepon' in label or 'phone' in label:
-                    info['Kontak'] = value if value != '-' else ''
-        except NoSuchElementException:
-            print(f"Could not find company details for {company_code}")
-        
-        # If website found, try to get social media
-        if info['Website'] and info['Website'] != '-':
-            try:
-                driver.get(info['Website'])
-                time.sleep(2)  # Wait for page to load
-                
-                social_patterns = {
-                    'facebook': ['facebook.com', 'fb.com'],
-                    'twitter': ['twitter.com', 'x.com'],
-                    'linkedin': ['linkedin.com'],
-                    'instagram': ['instagram.com'],
-                    'youtube': ['youtube.com']
-                }
-                
-                links = driver.find_elements(By.TAG_NAME, 'a')
-                for link in links:
-                    href = link.get_attribute('href')
-                    if href:
-                        href = href.lower()
-                        for platform, patterns in social_patterns.items():
-                            if any(pattern in href for pattern in patterns):
-                                info['Social Media'].append(href)
-                                break
-                
-                info['Social Media'] = list(set(info['Social Media']))
-            except Exception as e:
-                print(f"Error getting social media for {company_code}: {str(e)}")
-    
+        # Profile over plain HTTP first, browser only if the page needs JavaScript
+        profile = fetch_company_info(session, company_code) if session else None
+        if profile:
+            info['Nama Perusahaan'] = profile['Nama Perusahaan']
+            info['Sektor Bisnis'] = profile['Sektor']
+            info['Website'] = profile['Website'] if profile['Website'] != '-' else ''
+            info['Kontak'] = profile['Telepon'] if profile['Telepon'] != '-' else ''
+        else:
+            get_profile_browser(driver, company_code, info)
+    except WebDriverException:
+        raise
     except Exception as e:
         print(f"Error getting info for {company_code}: {str(e)}")
+        METRICS.error('idx', e)
+        return info
+    
+    # If website found, try to get social media
+    if visit_website and info['Website'] and info['Website'] != '-':
+        try:
+            LIMITER.wait(info['Website'])
+            with METRICS.span('website.fetch'):
+                driver.get(info['Website'])
+            # Wait for the DOM instead of a fixed delay, links are in the HTML already
+            with METRICS.span('website.wait'):
+                WebDriverWait(driver, 10).until(lambda d: d.execute_script('return document.readyState') != 'loading')
+            PAGE_COUNTER.record(driver)
+            
+            # One scan over the page source instead of one call per <a>
+            with METRICS.span('website.extract'):
+                add_social_fields(info, extract_social_links(driver.page_source))
+        except Exception as e:
+            print(f"Error getting social media for {company_code}: {str(e)}")
+            METRICS.error('website', e)
     
     return info
 
-def scrape_companies(start=0, limit=10):
-    """Scrape company information from IDX website"""
-    # Read the CSV file
-    df = pd.read_csv('daftar_perusahaan_idx.csv')
-    
-    # Get company codes and names
-    data = df.iloc[start:start+limit]
-    companies = []
-    
-    for _, row in data.iterrows():
-        name = row['Nama Perusahaan']
-        if isinstance(name, str) and 'BEI:' in name:
-            # Extract code from name column
-            code = name.split('BEI:')[1].strip()
-            companies.append(code)
-        else:
-            print(f"Skipping invalid entry: {name}")
+def scrape_companies(start=0, limit=10, workers=None, max_per_host=2, sink=None, crawl_websites=True, store=None):
+    """
+    Scrape company information from IDX website
+
+    Every profile goes to sink as soon as it is scraped. With
+    crawl_websites the enriched record is written again after the
+    crawl; the later record of a Kode supersedes the earlier one.
+    """
+    # Get company codes from the company list
+    companies = read_company_codes()[start:start+limit]
     
     print(f"\nScraping data for {len(companies)} companies starting from index {start}...")
     
-    # Setup browser
-    driver = setup_driver()
-    companies_data = []
+    # Setup HTTP session and browser pool
+    pool = DriverPool(setup_driver, workers=workers, max_per_host=max_per_host, host_fn=lambda code: 'www.idx.co.id')
+    session = create_session(pool_size=pool.workers)
+    
+    def process(driver, company_code):
+        return get_company_info(driver, company_code, session, visit_website=not crawl_websites)
     
     try:
-        for company_code in companies:
-            print(f"\nProcessing {company_code}...")
-            info = get_company_info(driver, company_code)
-            companies_data.append(info)
-            time.sleep(2)  # Delay between requests
+        companies_data = pool.map(
+            process,
+            companies,
+            desc="Processing companies",
+            on_result=(lambda index, info: sink.write(info)) if sink else None
+        )
     finally:
-        driver.quit()
+        session.close()
+    
+    # Companies whose driver failed on every attempt still get an empty row
+    companies_data = [info or empty_company_info(code) for code, info in zip(companies, companies_data)]
+    
+    # Company websites are crawled together over HTTP instead of in the browser
+    if crawl_websites:
+        print("\nCrawling company websites...")
+        enrich_with_websites(companies_data, store=store)
+        if sink:
+            for info in companies_data:
+                if info.get('Website'):
+                    sink.write(info)
     
     return companies_data
 
@@ -136,29 +173,29 @@ def save_to_excel(data, filename=None):
         print("No data to save")
         return
     
-    df = pd.DataFrame(data)
-    
-    # Convert social media list to string
-    if 'Social Media' in df.columns:
-        df['Social Media'] = df['Social Media'].apply(lambda x: '\n'.join(x) if x else '')
-    
     try:
-        df.to_excel(filename, index=False, engine='openpyxl')
-        print(f"\nData saved to {filename}")
+        export_report(data, filename)
     except Exception as e:
         print(f"Error saving to Excel: {str(e)}")
         # Save to CSV as backup
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         csv_file = f"idx_company_data_{timestamp}.csv"
-        df.to_csv(csv_file, index=False)
+        export_report(data, csv_file)
         print(f"Data saved to CSV file: {csv_file}")
 
 def main():
     start_index = 0  # Start from the first company
     batch_size = 10  # Process 10 companies at a time
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sink_file = f"idx_company_data_{timestamp}.jsonl"  # Records are written here as they are scraped
     
     print("Starting IDX company data scraping...")
-    companies_data = scrape_companies(start=start_index, limit=batch_size)
+    serve_from_env()
+    with ResultSink(sink_file, append=False) as sink, CompanyStore() as store:
+        # Websites that did not change since the last run are not crawled again
+        companies_data = scrape_companies(start=start_index, limit=batch_size, sink=sink, store=store)
+        # Update each company's row in the store, failed scrapes stay stale for the next run
+        store.upsert_many([info for info in companies_data if info['Nama Perusahaan']])
     
     if companies_data:
         # Print summary
@@ -175,12 +212,17 @@ def main():
         print(f"Companies with website: {with_website}")
         print(f"Companies with social media: {with_social}")
         print(f"Companies with contact info: {with_contact}")
+        if PAGE_COUNTER.pages:
+            print(f"Browser pages: {PAGE_COUNTER.summary()}")
         
-        save_to_excel(companies_data)
+        # Sink punya dua record per perusahaan yang websitenya di-crawl, export memakai hasil akhir
+        with METRICS.span('export.xlsx'):
+            save_to_excel(companies_data, f"idx_company_data_{timestamp}.xlsx")
     else:
         print("\nNo data was collected")
     
+    METRICS.write_summary(f"idx_company_data_{timestamp}_metrics.json")
     print("\nScraping completed!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
\ No newline at end of file
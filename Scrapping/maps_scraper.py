@@ -1,24 +1,69 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-import pandas as pd
-import time
 from datetime import datetime
+from rate_limiter import LIMITER
+from result_sink import ResultSink, export_excel, export_report
+from browser import create_driver, PAGE_COUNTER
+from metrics import METRICS, serve_from_env
 
-def setup_driver():
+MAPS_HOST = 'www.google.com'
+
+def setup_driver(headless=True):
     """Setup Chrome driver with necessary options"""
-    options = webdriver.ChromeOptions()
-    options.add_argument('--start-maximized')
-    # Uncomment baris di bawah jika ingin browser berjalan di background
-    # options.add_argument('--headless')
-    return webdriver.Chrome(options=options)
-
-def scrape_place_info(element):
-    """Extract information from a place element"""
-    info = {
+    # headless=False untuk melihat browser saat debugging
+    # Profil tetap menyimpan cookie consent Google Maps antar run
+    return create_driver(headless=headless, warm_profile=True)
+
+# Satu panggilan JS untuk semua kartu di feed, mulai dari indeks arguments[0]
+CARDS_SCRIPT = """
+const links = document.querySelectorAll('[role="feed"] a[class*="hfpxzc"]');
+const cards = [];
+for (let i = arguments[0]; i < links.length; i++) {
+    const link = links[i];
+    const card = link.parentElement;
+    const name = card.querySelector('[class*="fontHeadlineSmall"]');
+    cards.push({
+        nama: name ? name.innerText : (link.getAttribute('aria-label') || ''),
+        maps_url: link.href || '',
+        texts: Array.from(card.querySelectorAll('[class*="fontBodyMedium"]'), (el) => el.innerText)
+    });
+}
+return cards;
+"""
+
+# Jumlah kartu dan penanda akhir daftar ("Anda telah mencapai akhir daftar.")
+FEED_STATE_SCRIPT = """
+const feed = document.querySelector('[role="feed"]');
+if (!feed) return [0, false];
+const count = feed.querySelectorAll('a[class*="hfpxzc"]').length;
+const marker = feed.querySelector('span.HlvSq');
+const text = feed.lastElementChild ? feed.lastElementChild.innerText.toLowerCase() : '';
+return [count, !!marker || text.includes('akhir daftar') || text.includes('end of the list')];
+"""
+
+# Website, telepon dan alamat dari halaman detail satu tempat
+DETAILS_SCRIPT = """
+const out = {website: '', telepon: '', alamat: ''};
+const website = document.querySelector('a[data-item-id="authority"]');
+const phone = document.querySelector('[data-item-id^="phone:tel:"]');
+const address = document.querySelector('[data-item-id="address"]');
+if (website) out.website = website.href;
+if (phone) out.telepon = phone.getAttribute('data-item-id').replace('phone:tel:', '');
+if (address) out.alamat = address.innerText.trim();
+document.querySelectorAll('button[aria-label], a[aria-label]').forEach((el) => {
+    const label = el.getAttribute('aria-label').toLowerCase();
+    if (!out.website && label.includes('situs web')) out.website = el.innerText.trim();
+    if (!out.telepon && label.includes('telepon')) out.telepon = el.innerText.trim();
+});
+return out;
+"""
+
+def empty_place():
+    """Create an empty place record"""
+    return {
         'nama': '',
         'alamat': '',
         'rating': '',
@@ -27,63 +72,124 @@ def scrape_place_info(element):
         'website': '',
         'telepon': ''
     }
+
+def parse_card_texts(info, texts):
+    """Fill rating, reviews, address and category from the card text lines"""
+    for text in texts:
+        if text:
+            # Rating and reviews are usually in the format "4.5 (1,234)"
+            if '(' in text and ')' in text and any(c.isdigit() for c in text):
+                parts = text.split('(')
+                info['rating'] = parts[0].strip()
+                info['total_review'] = parts[1].replace(')', '').strip()
+            # Address usually doesn't contain special characters
+            elif len(text) > 10 and '·' not in text and '(' not in text:
+                info['alamat'] = text
+            # Category is usually shorter and might contain "·"
+            elif len(text) < 50:
+                info['kategori'] = text
+    return info
+
+def extract_cards(driver, start=0):
+    """Read every feed card from index start with one execute_script call"""
+    places = []
+    with METRICS.span('maps.extract'):
+        cards = driver.execute_script(CARDS_SCRIPT, start)
+    for card in cards:
+        info = empty_place()
+        info['nama'] = card['nama']
+        info['maps_url'] = card['maps_url']
+        places.append(parse_card_texts(info, card['texts']))
+    return places
+
+def fetch_details_in_tabs(driver, places, fields=('website', 'telepon'), tabs=4, timeout=10):
+    """
+    Open detail pages of places missing any of fields in parallel tabs
+
+    Tabs of a batch load at the same time; each is read with one
+    execute_script call and closed again.
+    """
+    missing = [info for info in places if info.get('maps_url') and any(not info.get(field) for field in fields)]
+    main_window = driver.current_window_handle
     
-    try:
-        # Get name
-        name_elem = element.find_element(By.CSS_SELECTOR, '[class*="fontHeadlineSmall"]')
-        info['nama'] = name_elem.text if name_elem else ''
-        
-        # Get other details that are immediately available
-        details = element.find_elements(By.CSS_SELECTOR, '[class*="fontBodyMedium"]')
-        for detail in details:
-            text = detail.text
-            if text:
-                # Rating and reviews are usually in the format "4.5 (1,234)"
-                if '(' in text and ')' in text and any(c.isdigit() for c in text):
-                    parts = text.split('(')
-                    info['rating'] = parts[0].strip()
-                    info['total_review'] = parts[1].replace(')', '').strip()
-                # Address usually doesn't contain special characters
-                elif len(text) > 10 and '·' not in text and '(' not in text:
-                    info['alamat'] = text
-                # Category is usually shorter and might contain "·"
-                elif len(text) < 50:
-                    info['kategori'] = text
-        
-        # Click to open place details
-        name_elem.click()
-        time.sleep(2)
+    for i in range(0, len(missing), tabs):
+        batch = missing[i:i+tabs]
+        opened = []
+        for info in batch:
+            LIMITER.wait(MAPS_HOST)
+            before = set(driver.window_handles)
+            driver.execute_script("window.open(arguments[0], '_blank');", info['maps_url'])
+            new_handles = set(driver.window_handles) - before
+            opened.append((info, new_handles.pop() if new_handles else None))
         
-        # Wait for details panel to load
-        wait = WebDriverWait(driver, 10)
-        details_panel = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[class*="section-layout-root"]')))
-        
-        # Get website and phone
-        buttons = details_panel.find_elements(By.CSS_SELECTOR, 'button[class*="CsEnBe"]')
-        for button in buttons:
-            aria_label = button.get_attribute('aria-label')
-            if aria_label:
-                if 'situs web' in aria_label.lower():
-                    info['website'] = button.text
-                elif 'telepon' in aria_label.lower():
-                    info['telepon'] = button.text
-        
-        # Close details panel
-        close_button = driver.find_element(By.CSS_SELECTOR, 'button[class*="VfPpkd-icon-button"]')
-        close_button.click()
-        time.sleep(1)
-        
-    except Exception as e:
-        print(f"Error extracting info: {str(e)}")
+        for info, handle in opened:
+            if handle is None:
+                continue
+            try:
+                driver.switch_to.window(handle)
+            except Exception as e:
+                # Tab tidak bisa dibuka, jangan sampai jendela utama yang ditutup
+                print(f"Error opening details tab for {info['nama']}: {str(e)}")
+                METRICS.error('maps.details', e)
+                continue
+            try:
+                try:
+                    with METRICS.span('maps.details_wait'):
+                        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return !!document.querySelector('h1')"))
+                except TimeoutException:
+                    print(f"Timeout loading details for {info['nama']}")
+                with METRICS.span('maps.details_extract'):
+                    details = driver.execute_script(DETAILS_SCRIPT)
+                PAGE_COUNTER.record(driver)
+                for key, value in details.items():
+                    if value and not info.get(key):
+                        info[key] = value
+            except Exception as e:
+                print(f"Error extracting details for {info['nama']}: {str(e)}")
+                METRICS.error('maps.details', e)
+            finally:
+                driver.close()
+                driver.switch_to.window(main_window)
     
-    return info
+    return places
+
+def feed_state(driver):
+    """Number of cards in the feed and whether the end-of-list marker is shown"""
+    return driver.execute_script(FEED_STATE_SCRIPT)
 
-def scroll_results(driver, num_scrolls=3):
-    """Scroll through results panel to load more places"""
+def harvest_cards(driver, target=None, timeout=5, idle_rounds=2):
+    """
+    Scroll the results feed and yield each batch of new cards as it loads
+
+    Only cards added since the previous round are read. Stops at the
+    end-of-list marker, after idle_rounds scrolls without new cards, or
+    once target places have been yielded.
+    """
     results_panel = driver.find_element(By.CSS_SELECTOR, '[role="feed"]')
-    for _ in range(num_scrolls):
+    seen = 0
+    idle = 0
+    while True:
+        count, at_end = feed_state(driver)
+        if count > seen:
+            batch = extract_cards(driver, seen)
+            if target:
+                batch = batch[:target - seen]
+            seen += len(batch)
+            idle = 0
+            yield batch
+        if at_end or (target and seen >= target):
+            break
+
+        LIMITER.wait(MAPS_HOST)
         driver.execute_script('arguments[0].scrollTop = arguments[0].scrollHeight', results_panel)
-        time.sleep(2)
+        # Tunggu sampai hasil baru muncul atau akhir daftar, bukan jeda tetap
+        try:
+            with METRICS.span('maps.scroll_wait'):
+                WebDriverWait(driver, timeout).until(lambda d: feed_state(d)[0] > seen or feed_state(d)[1])
+        except TimeoutException:
+            idle += 1
+            if idle >= idle_rounds:
+                break
 
 def save_to_excel(data, filename=None):
     """Save scraped data to Excel file"""
@@ -91,57 +197,76 @@ def save_to_excel(data, filename=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"data_maps_{timestamp}.xlsx"
     
-    df = pd.DataFrame(data)
-    df.to_excel(filename, index=False)
-    print(f"\nData telah disimpan ke file: {filename}")
+    export_report(data, filename)
+
+def search_places(driver, search_query, target=None, sink=None, on_batch=None):
+    """
+    Search Google Maps in driver and write every place to sink as it loads
+
+    on_batch(total) is called after each batch. Returns the number of places.
+    """
+    LIMITER.wait(MAPS_HOST)
+    with METRICS.span('maps.fetch'):
+        driver.get("https://www.google.com/maps")
+    
+    # Input search query
+    search_box = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.ID, "searchboxinput")))
+    search_box.clear()
+    search_box.send_keys(search_query)
+    search_box.send_keys(Keys.RETURN)
+    
+    # Wait for results to load
+    with METRICS.span('maps.wait'):
+        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, '[role="feed"]')))
+    LIMITER.report_driver(driver, MAPS_HOST)
+    PAGE_COUNTER.record(driver)
+    
+    # Scroll and stream new cards as they load
+    total = 0
+    for batch in harvest_cards(driver, target=target):
+        # Detail hanya dibuka untuk tempat yang belum punya website/telepon
+        fetch_details_in_tabs(driver, batch)
+        for info in batch:
+            sink.write(info)
+        total += len(batch)
+        if on_batch:
+            on_batch(total)
+    return total
 
 def main():
-    global driver
     search_query = input("Masukkan kata kunci pencarian (contoh: restoran bandung): ")
+    target = input("Jumlah tempat maksimal (kosongkan untuk semua): ").strip()
+    target = int(target) if target.isdigit() else None
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sink_file = f"data_maps_{timestamp}.jsonl"
     
+    driver = None
+    serve_from_env()
     try:
         print("\nMemulai browser...")
-        driver = setup_driver()
-        
-        # Open Google Maps
-        print("Membuka Google Maps...")
-        driver.get("https://www.google.com/maps")
-        time.sleep(2)
-        
-        # Input search query
-        search_box = driver.find_element(By.ID, "searchboxinput")
-        search_box.clear()
-        search_box.send_keys(search_query)
-        search_box.send_keys(Keys.RETURN)
-        
-        # Wait for results to load
-        print("\nMencari lokasi...")
-        time.sleep(5)
-        
-        # Scroll to load more results
-        print("Mengumpulkan data...")
-        scroll_results(driver)
-        
-        # Get all place elements
-        places = driver.find_elements(By.CSS_SELECTOR, '[class*="hfpxzc"]')
-        print(f"\nDitemukan {len(places)} tempat")
+        with METRICS.span('maps.browser_start'):
+            driver = setup_driver()
         
-        # Extract information from each place
-        all_places_info = []
-        for i, place in enumerate(places, 1):
-            print(f"Mengambil data tempat {i}/{len(places)}...")
-            info = scrape_place_info(place)
-            all_places_info.append(info)
+        # Search, scroll and stream new cards to the file as they load
+        print("Mencari lokasi dan mengumpulkan data...")
+        with ResultSink(sink_file, append=False) as sink:
+            total = search_places(driver, search_query, target, sink, on_batch=lambda total: print(f"{total} tempat terkumpul"))
+        print(f"\nDitemukan {total} tempat")
+        print(f"Browser: {PAGE_COUNTER.summary()}")
         
         # Save data
-        save_to_excel(all_places_info)
+        with METRICS.span('export.xlsx'):
+            export_excel(sink_file, f"data_maps_{timestamp}.xlsx")
         
     except Exception as e:
         print(f"Terjadi error: {str(e)}")
+        METRICS.error('maps', e)
     
     finally:
         print("\nMenutup browser...")
-        driver.quit()
+        if driver:
+            driver.quit()
+        METRICS.write_summary(f"data_maps_{timestamp}_metrics.json")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -0,0 +1,280 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from company_store import CompanyStore
+from get_company_list import read_company_codes, load_company_list
+from metrics import METRICS
+from rate_limiter import LIMITER
+
+try:
+    import yfinance
+except ImportError:
+    yfinance = None
+
+MARKET_CACHE_FILE = 'market_cache.db'
+YAHOO_HOST = 'query2.finance.yahoo.com'
+
+# Umur maksimum per field (detik); harga berubah tiap hari, profil jarang
+MARKET_TTLS = {
+    'price': 12 * 3600,
+    'currency': 12 * 3600,
+    'price_date': 12 * 3600,
+    'shares': 30 * 24 * 3600,
+    'market_cap': 30 * 24 * 3600,
+    'sector': 30 * 24 * 3600,
+    'industry': 30 * 24 * 3600,
+    'name': 30 * 24 * 3600
+}
+
+PRICE_FIELDS = ['price', 'currency', 'price_date']
+PROFILE_FIELDS = ['shares', 'market_cap', 'sector', 'industry', 'name']
+
+# Field hasil -> kolom record perusahaan
+RECORD_FIELDS = {
+    'symbol': 'Simbol',
+    'price': 'Harga',
+    'market_cap': 'Kapitalisasi Pasar',
+    'sector': 'Sektor Yahoo',
+    'industry': 'Industri Yahoo',
+    'price_date': 'Tanggal Harga'
+}
+
+def jk_symbol(code):
+    """Yahoo Finance symbol of an IDX ticker, e.g. BBCA -> BBCA.JK"""
+    return f"{code.strip().upper()}.JK"
+
+class MarketCache:
+    """
+    Local SQLite cache of market data keyed by symbol
+
+    Like PlaceCache, every field has its own fetched_at, so daily prices
+    can be refreshed while sector and share count stay cached for a month.
+    """
+
+    def __init__(self, path=MARKET_CACHE_FILE, ttls=None):
+        self.ttls = dict(MARKET_TTLS if ttls is None else ttls)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS market_data (
+                symbol TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (symbol, field)
+            )
+        ''')
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, symbols, fields):
+        """{symbol: (fresh values, stale fields)} for every symbol"""
+        symbols = list(dict.fromkeys(symbols))
+        now = time.time()
+        found = {symbol: {} for symbol in symbols}
+        with self._lock:
+            for i in range(0, len(symbols), 500):
+                chunk = symbols[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT symbol, field, value, fetched_at FROM market_data WHERE symbol IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for symbol, field, value, fetched_at in rows:
+                    if field in fields and now - fetched_at < self.ttls.get(field, 0):
+                        found[symbol][field] = json.loads(value)
+        return {symbol: (values, [field for field in fields if field not in values]) for symbol, values in found.items()}
+
+    def put_many(self, data):
+        """Store {symbol: {field: value}}; a fetched-but-missing field is stored as null"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO market_data (symbol, field, value, fetched_at) VALUES (?, ?, ?, ?)',
+                [(symbol, field, json.dumps(value), now) for symbol, values in data.items() for field, value in values.items()]
+            )
+
+    def close(self):
+        self.conn.close()
+
+class YFinanceSource:
+    """
+    Market data from Yahoo Finance through yfinance
+
+    prices() is one multi-ticker yfinance.download per batch. Share
+    count, sector and industry need Ticker.info per symbol; they change
+    rarely, so the cache asks for them about once a month.
+    """
+
+    def __init__(self, threads=8):
+        if yfinance is None:
+            raise ImportError("yfinance is needed for market data")
+        self.threads = threads
+
+    def prices(self, symbols):
+        LIMITER.wait(YAHOO_HOST)
+        with METRICS.span('market.prices'):
+            df = yfinance.download(symbols, period='5d', interval='1d', group_by='ticker', auto_adjust=False,
+                                   threads=self.threads, progress=False)
+        result = {}
+        for symbol in symbols:
+            if isinstance(df.columns, pd.MultiIndex):
+                if symbol not in df.columns.get_level_values(0):
+                    continue
+                closes = df[symbol]['Close'].dropna()
+            else:
+                closes = df['Close'].dropna()
+            if not closes.empty:
+                result[symbol] = {
+                    'price': float(closes.iloc[-1]),
+                    'currency': 'IDR',
+                    'price_date': closes.index[-1].strftime('%Y-%m-%d')
+                }
+        return result
+
+    def _profile(self, symbol):
+        LIMITER.wait(YAHOO_HOST)
+        try:
+            with METRICS.span('market.profile'):
+                info = yfinance.Ticker(symbol).info or {}
+        except Exception as e:
+            print(f"Error getting profile for {symbol}: {str(e)}")
+            METRICS.error('market.profile', e)
+            return symbol, None
+        return symbol, {
+            'shares': info.get('sharesOutstanding'),
+            'market_cap': info.get('marketCap'),
+            'sector': info.get('sector', ''),
+            'industry': info.get('industry', ''),
+            'name': info.get('longName') or info.get('shortName', '')
+        }
+
+    def profiles(self, symbols):
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            return dict(executor.map(self._profile, symbols))
+
+class StaticSource:
+    """
+    Source over fixed data {symbol: {field: value}}, for offline runs and tests
+
+    Counts the symbols asked for, so a test can check batching and caching.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.price_calls = []
+        self.profile_calls = []
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def prices(self, symbols):
+        self.price_calls.append(list(symbols))
+        return {s: {f: self.data[s].get(f) for f in PRICE_FIELDS} for s in symbols if s in self.data}
+
+    def profiles(self, symbols):
+        self.profile_calls.append(list(symbols))
+        return {s: {f: self.data[s].get(f) for f in PROFILE_FIELDS} for s in symbols if s in self.data}
+
+def _fetch_stale(fetch, fields, stale_symbols, batch_size):
+    """
+    Call fetch per batch
+
+    Symbols the source does not know get null fields, so they are not
+    asked again before the TTL; a None result (request failed) is
+    left out and retried on the next run.
+    """
+    fetched = {}
+    for i in range(0, len(stale_symbols), batch_size):
+        batch = stale_symbols[i:i+batch_size]
+        try:
+            result = fetch(batch)
+        except Exception as e:
+            print(f"Error fetching market data for {len(batch)} symbols: {str(e)}")
+            METRICS.error('market', e)
+            continue
+        for symbol in batch:
+            if symbol in result and result[symbol] is None:
+                continue
+            fetched[symbol] = {field: (result.get(symbol) or {}).get(field) for field in fields}
+    return fetched
+
+def get_market_data(codes, source=None, cache=None, batch_size=100, cache_only=False):
+    """
+    Price, market cap and sector for IDX tickers, {code: {field: value}}
+
+    Only fields missing or expired in the cache are requested, in
+    batches of batch_size symbols. Market cap is price x shares when
+    both are known, otherwise the cap reported with the profile.
+    With cache_only nothing is requested and only tickers with fresh
+    cached values are returned, e.g. to join them into a scrape export.
+    """
+    own_cache = cache is None
+    cache = cache or MarketCache()
+    try:
+        symbols = {code: jk_symbol(code) for code in codes}
+        cached = cache.lookup(symbols.values(), PRICE_FIELDS + PROFILE_FIELDS)
+
+        fetched = {}
+        if not cache_only:
+            source = source or YFinanceSource()
+            stale_prices = [symbol for symbol, (_, stale) in cached.items() if set(stale) & set(PRICE_FIELDS)]
+            stale_profiles = [symbol for symbol, (_, stale) in cached.items() if set(stale) & set(PROFILE_FIELDS)]
+            print(f"Market data: {len(cached)} symbols, {len(stale_prices)} prices and {len(stale_profiles)} profiles to fetch")
+
+            fetched = _fetch_stale(source.prices, PRICE_FIELDS, stale_prices, batch_size)
+            for symbol, values in _fetch_stale(source.profiles, PROFILE_FIELDS, stale_profiles, batch_size).items():
+                fetched.setdefault(symbol, {}).update(values)
+            cache.put_many(fetched)
+
+        result = {}
+        for code, symbol in symbols.items():
+            values = dict(cached[symbol][0], **fetched.get(symbol, {}))
+            if cache_only and not values:
+                continue
+            if values.get('price') and values.get('shares'):
+                values['market_cap'] = values['price'] * values['shares']
+            values['symbol'] = symbol
+            result[code] = values
+        return result
+    finally:
+        if own_cache:
+            cache.close()
+
+def join_market_data(records, market, code_key='Kode'):
+    """Add the RECORD_FIELDS columns to company records in place, records without market data are left as they are"""
+    for record in records:
+        values = market.get(record.get(code_key))
+        if values is None:
+            continue
+        for field, column in RECORD_FIELDS.items():
+            record[column] = values.get(field)
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description="Price, market cap and sector of every IDX ticker into the company store")
+    parser.add_argument('--source', help="JSON file {symbol: {field: value}} instead of Yahoo Finance")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--top', type=int, default=10, help="show the largest companies")
+    args = parser.parse_args()
+
+    source = StaticSource.from_file(args.source) if args.source else YFinanceSource()
+    codes = read_company_codes()
+    market = get_market_data(codes, source, batch_size=args.batch_size)
+    with CompanyStore() as store:
+        store.sync_company_list(load_company_list())
+        print(f"{store.update_market_data(market)} companies updated")
+        print(f"Scrape order by size: {store.stale(max_age_days=0, limit=args.top, by_size=True)}")
+
+if __name__ == "__main__":
+    main()
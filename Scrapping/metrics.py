@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Port untuk endpoint Prometheus, kosong = tidak dijalankan
+METRICS_PORT_ENV = 'METRICS_PORT'
+
+class Metrics:
+    """
+    Timing spans, counters and errors per stage for one run
+
+    Stage names are '<scraper>.<step>', e.g. 'idx.fetch', 'maps.wait',
+    'places.details' or 'export.xlsx'. Errors are grouped by stage and
+    exception class. summary() gives the per-run JSON, prometheus() the
+    same numbers in Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.spans = {}  # stage -> [count, total seconds, max seconds]
+            self.errors = {}  # (stage, error class) -> count
+            self.counters = {}
+            self.pages = 0
+            self.bytes = 0
+
+    @contextmanager
+    def span(self, stage):
+        """Time a block; an exception escaping it is counted as an error of the stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error(stage, e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                span = self.spans.setdefault(stage, [0, 0.0, 0.0])
+                span[0] += 1
+                span[1] += elapsed
+                span[2] = max(span[2], elapsed)
+
+    def error(self, stage, error):
+        """
+        Count an error by exception class (or a name for errors without exception)
+
+        An exception is counted once, at the innermost stage it escaped,
+        even when an outer handler reports it again.
+        """
+        if isinstance(error, str):
+            name = error
+        elif getattr(error, '_metrics_counted', False):
+            return
+        else:
+            name = type(error).__name__
+            error._metrics_counted = True
+        with self._lock:
+            self.errors[(stage, name)] = self.errors.get((stage, name), 0) + 1
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def page(self, size=0):
+        """One page or API response downloaded, size in bytes"""
+        with self._lock:
+            self.pages += 1
+            self.bytes += size or 0
+
+    def summary(self):
+        with self._lock:
+            duration = time.time() - self.started
+            spans = {
+                stage: {
+                    'count': count,
+                    'total_s': round(total, 3),
+                    'avg_ms': round(total / count * 1000, 1) if count else 0.0,
+                    'max_ms': round(longest * 1000, 1)
+                }
+                for stage, (count, total, longest) in sorted(self.spans.items())
+            }
+            errors = {}
+            for (stage, name), count in sorted(self.errors.items()):
+                errors.setdefault(stage, {})[name] = count
+            return {
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'duration_s': round(duration, 3),
+                'pages': self.pages,
+                'bytes': self.bytes,
+                'pages_per_second': round(self.pages / duration, 2) if duration else 0.0,
+                'bytes_per_second': round(self.bytes / duration, 1) if duration else 0.0,
+                'spans': spans,
+                'errors': errors,
+                'counters': dict(self.counters)
+            }
+
+    def write_summary(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        print(f"Metrics saved to {path}")
+
+    def prometheus(self):
+        """Current numbers in Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# TYPE scraper_pages_total counter',
+                f'scraper_pages_total {self.pages}',
+                '# TYPE scraper_bytes_total counter',
+                f'scraper_bytes_total {self.bytes}',
+                '# TYPE scraper_stage_seconds summary',
+            ]
+            for stage, (count, total, _) in sorted(self.spans.items()):
+                lines.append(f'scraper_stage_seconds_count{{stage="{stage}"}} {count}')
+                lines.append(f'scraper_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append('# TYPE scraper_errors_total counter')
+            for (stage, name), count in sorted(self.errors.items()):
+                lines.append(f'scraper_errors_total{{stage="{stage}",error="{name}"}} {count}')
+            lines.append('# TYPE scraper_events_total counter')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'scraper_events_total{{name="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        """Serve /metrics for Prometheus in a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+def serve_from_env():
+    """Start the Prometheus endpoint when METRICS_PORT is set"""
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port and port.isdigit():
+        return METRICS.serve(int(port))
+    return None
+
+# Metrics bersama untuk semua scraper dalam satu proses
+METRICS = Metrics()
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode, urlparse
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_DIR = '.page_cache'
+
+# TTL per sumber (detik), host lain memakai default_ttl
+DEFAULT_TTLS = {
+    'id.wikipedia.org': 7 * 24 * 3600,
+    'www.idx.co.id': 24 * 3600,
+}
+
+class OfflineCacheMiss(requests.RequestException):
+    """Raised in offline mode when a page is not in the cache"""
+
+class CachedResponse:
+    """Small stand-in for requests.Response served from the cache"""
+
+    def __init__(self, url, status_code, content, headers, from_cache):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = CaseInsensitiveDict(headers)
+        self.from_cache = from_cache
+        self.encoding = 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+def cache_key(url, params=None, variant=''):
+    """Key of a cache entry: URL with sorted query params plus variant"""
+    if params:
+        url = url + ('&' if '?' in url else '?') + urlencode(sorted(params.items()))
+    return hashlib.sha256(f"{url}\n{variant}".encode('utf-8')).hexdigest(), url
+
+class PageCache:
+    """
+    Persistent on-disk page cache
+
+    Bodies are stored content-addressed (by SHA-256 of the body) under
+    cache_dir/objects, the index lives in cache_dir/index.db. Entries
+    older than their TTL are revalidated with ETag/Last-Modified, and the
+    least recently used entries are evicted when the cache grows past
+    max_bytes. In offline mode only cached pages are served.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttls=None, default_ttl=24 * 3600, max_bytes=500 * 1024 * 1024, offline=False):
+        self.cache_dir = cache_dir
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at)')
+        self.conn.commit()
+
+    def ttl_for(self, url):
+        return self.ttls.get(urlparse(url).netloc.lower(), self.default_ttl)
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def _lookup(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT digest, headers, etag, last_modified, fetched_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+        if not row:
+            return None
+        path = self._object_path(row[0])
+        if not os.path.exists(path):
+            return None
+        return {
+            'path': path,
+            'headers': json.loads(row[1]),
+            'etag': row[2],
+            'last_modified': row[3],
+            'fetched_at': row[4]
+        }
+
+    def _serve(self, key, url, entry):
+        with self._lock, self.conn:
+            self.conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        with open(entry['path'], 'rb') as f:
+            return CachedResponse(url, 200, f.read(), entry['headers'], from_cache=True)
+
+    def _store(self, key, url, response):
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, digest, len(content), json.dumps(headers), response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), now, now)
+            )
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        with self._lock, self.conn:
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.conn.execute('SELECT key, digest, size FROM entries ORDER BY accessed_at').fetchall()
+            for key, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self.conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                total -= size
+                # Body bisa dipakai entry lain (content-addressed)
+                if not self.conn.execute('SELECT 1 FROM entries WHERE digest = ?', (digest,)).fetchone():
+                    try:
+                        os.remove(self._object_path(digest))
+                    except OSError:
+                        pass
+
+    def get(self, session, url, params=None, variant='', headers=None, timeout=10):
+        """
+        GET a page through the cache
+
+        Only 200 responses are cached. When revalidation fails because of a
+        network error the stale copy is served instead.
+        """
+        key, full_url = cache_key(url, params, variant)
+        entry = self._lookup(key)
+
+        if self.offline:
+            if entry:
+                return self._serve(key, full_url, entry)
+            raise OfflineCacheMiss(f"Not in cache (offline mode): {full_url}")
+
+        if entry and time.time() - entry['fetched_at'] < self.ttl_for(url):
+            return self._serve(key, full_url, entry)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry['etag']:
+                request_headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = session.get(url, params=params, headers=request_headers, timeout=timeout)
+        except requests.RequestException:
+            if entry:
+                return self._serve(key, full_url, entry)
+            raise
+
+        if response.status_code == 304 and entry:
+            with self._lock, self.conn:
+                self.conn.execute('UPDATE entries SET fetched_at = ? WHERE key = ?', (time.time(), key))
+            return self._serve(key, full_url, entry)
+
+        response.from_cache = False
+        if response.status_code == 200:
+            self._store(key, full_url, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            count, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'entries': count, 'bytes': size}
+
+    def close(self):
+        self.conn.close()
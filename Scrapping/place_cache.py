@@ -0,0 +1,96 @@
+import sqlite3
+import threading
+import time
+
+PLACE_CACHE_FILE = 'place_cache.db'
+
+# Umur maksimum per field (detik), field lain memakai default_ttl
+DEFAULT_FIELD_TTLS = {
+    'website': 30 * 24 * 3600,
+    'telepon': 30 * 24 * 3600,
+    'maps_url': 180 * 24 * 3600,
+}
+
+class PlaceCache:
+    """
+    Local SQLite store of Places detail results keyed by place_id
+
+    Every field has its own fetched_at, so a stale phone number can be
+    refreshed without asking again for fields that are still fresh.
+    """
+
+    def __init__(self, path=PLACE_CACHE_FILE, ttls=None, default_ttl=30 * 24 * 3600):
+        self.ttls = dict(DEFAULT_FIELD_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS place_details (
+                place_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (place_id, field)
+            )
+        ''')
+        self.conn.commit()
+
+    def _is_fresh(self, field, fetched_at, now):
+        return now - fetched_at < self.ttls.get(field, self.default_ttl)
+
+    def lookup(self, place_ids, fields):
+        """
+        Bulk lookup before any network call
+
+        Returns {place_id: (fresh_values, stale_fields)} for every id;
+        a place counts as a hit when none of its fields are stale.
+        """
+        place_ids = list(dict.fromkeys(place_ids))
+        now = time.time()
+        found = {place_id: {} for place_id in place_ids}
+        with self._lock:
+            # SQLite membatasi jumlah parameter, jadi per 500 id
+            for i in range(0, len(place_ids), 500):
+                chunk = place_ids[i:i+500]
+                rows = self.conn.execute(
+                    f"SELECT place_id, field, value, fetched_at FROM place_details WHERE place_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for place_id, field, value, fetched_at in rows:
+                    if field in fields and self._is_fresh(field, fetched_at, now):
+                        found[place_id][field] = value
+
+            result = {}
+            for place_id, values in found.items():
+                stale = [field for field in fields if field not in values]
+                if stale:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                result[place_id] = (values, stale)
+        return result
+
+    def put(self, place_id, values):
+        """Store fetched field values for a place"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO place_details (place_id, field, value, fetched_at) VALUES (?, ?, ?, ?)',
+                [(place_id, field, value, now) for field, value in values.items()]
+            )
+
+    def stats(self):
+        with self._lock:
+            places = self.conn.execute('SELECT COUNT(DISTINCT place_id) FROM place_details').fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'places': places
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,130 @@
+import hashlib
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+from social_links import extract_social_links, add_social_fields
+
+# Label di tabel profil -> kolom hasil (urutan penting: 'nama' dicek dulu)
+PROFILE_LABELS = [
+    ('nama', 'Nama Perusahaan'),
+    ('sektor', 'Sektor'),
+    ('bidang usaha', 'Sektor'),
+    ('situs', 'Website'),
+    ('email', 'Email'),
+    ('telepon', 'Telepon'),
+    ('alamat', 'Alamat')
+]
+
+HIDDEN_PATTERN = re.compile(r'<(script|style|noscript)\b.*?</\1>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def content_fingerprint(text):
+    """Hash of the visible text, so markup, whitespace and script changes don't count"""
+    text = TAG_PATTERN.sub(' ', HIDDEN_PATTERN.sub(' ', text))
+    return hashlib.sha1(' '.join(text.split()).encode('utf-8')).hexdigest()
+
+def empty_info(company_code):
+    """Create an empty company record"""
+    return {
+        'Kode': company_code,
+        'Nama Perusahaan': '',
+        'Sektor': '',
+        'Website': '',
+        'Email': '',
+        'Telepon': '',
+        'Alamat': ''
+    }
+
+def apply_profile_label(info, label, value):
+    """Store value in info according to the profile table label"""
+    label = label.strip().lower()
+    for keyword, column in PROFILE_LABELS:
+        if keyword in label:
+            info[column] = value.strip()
+            return True
+    return False
+
+def find_table_html(html):
+    """Cut the profile table out of the page so only that part is parsed"""
+    lower = html.lower()
+    # Halaman IDX lama menaruh tabel profil di dalam div.bzg_c
+    anchor = lower.find('bzg_c')
+    start = lower.find('<table', anchor if anchor != -1 else 0)
+    if start == -1 and anchor != -1:
+        start = lower.find('<table')
+    if start == -1:
+        return None
+    end = lower.find('</table>', start)
+    if end == -1:
+        return None
+    return html[start:end + len('</table>')]
+
+def _row_label_value(cells, get_class, get_text):
+    # Format td-name / td-content, atau tiga kolom "label : value"
+    label = value = None
+    for cell in cells:
+        classes = get_class(cell)
+        if 'td-name' in classes:
+            label = get_text(cell)
+        elif 'td-content' in classes:
+            value = get_text(cell)
+    if label is not None and value is not None:
+        return label, value
+    if len(cells) >= 3:
+        return get_text(cells[0]), get_text(cells[2])
+    return None
+
+def parse_table_lxml(table_html, info):
+    table = lxml.html.fragment_fromstring(table_html)
+    found = False
+    for row in table.iter('tr'):
+        pair = _row_label_value(
+            row.findall('td'),
+            lambda cell: cell.get('class', ''),
+            lambda cell: cell.text_content().strip()
+        )
+        if pair:
+            found = apply_profile_label(info, *pair) or found
+    return found
+
+def parse_table_soup(table_html, info):
+    table = BeautifulSoup(table_html, 'html.parser', parse_only=SoupStrainer('tr'))
+    found = False
+    for row in table.find_all('tr'):
+        pair = _row_label_value(
+            row.find_all('td', recursive=False),
+            lambda cell: ' '.join(cell.get('class', [])),
+            lambda cell: cell.get_text(strip=True)
+        )
+        if pair:
+            found = apply_profile_label(info, *pair) or found
+    return found
+
+def parse_profile(html, company_code, backend=None, table_html=None):
+    """
+    Parse an IDX profile page, None if the profile table is missing
+
+    Only the profile table is handed to the HTML parser (lxml when it is
+    installed, otherwise BeautifulSoup), links are found with one scan
+    of the raw HTML. table_html skips the search when the caller has
+    already cut the table out.
+    """
+    table_html = table_html or find_table_html(html)
+    if not table_html:
+        return None
+
+    backend = backend or ('lxml' if lxml else 'soup')
+    info = empty_info(company_code)
+    parse_table = parse_table_lxml if backend == 'lxml' else parse_table_soup
+    if not parse_table(table_html, info):
+        return None
+
+    social_links = extract_social_links(html)
+    if any(social_links.values()):
+        add_social_fields(info, social_links)
+
+    return info
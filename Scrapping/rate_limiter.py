@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+# Request per detik per host (batas atas), host lain memakai default_rate
+DEFAULT_RATES = {
+    'www.idx.co.id': 2.0,
+    'id.wikipedia.org': 5.0,
+    'maps.googleapis.com': 10.0,
+    'www.google.com': 1.0,
+}
+
+BLOCK_STATUSES = (429, 503)
+CAPTCHA_MARKERS = ('captcha', 'unusual traffic', '/sorry/', 'cf-challenge', 'access denied')
+
+# Penanda halaman challenge di URL atau judul halaman browser
+CHALLENGE_URL_MARKERS = ('/sorry/', 'captcha', 'cdn-cgi/challenge', '__cf_chl')
+CHALLENGE_TITLE_MARKERS = ('captcha', 'just a moment', 'attention required', 'access denied', 'unusual traffic')
+
+def host_key(host_or_url):
+    """Host name of a URL, or the value itself if it is already a host"""
+    if '//' in host_or_url:
+        return urlparse(host_or_url).netloc.lower()
+    return host_or_url.lower()
+
+def is_blocked(status=None, text=None):
+    """True when a response looks like rate limiting or a captcha page"""
+    if status in BLOCK_STATUSES:
+        return True
+    if text:
+        lower = text[:20000].lower()
+        return any(marker in lower for marker in CAPTCHA_MARKERS)
+    return False
+
+def is_challenge_page(url, title):
+    """True when a page loaded in the browser is a captcha or challenge page, judged by URL and title"""
+    url = (url or '').lower()
+    title = (title or '').lower()
+    return any(marker in url for marker in CHALLENGE_URL_MARKERS) or any(marker in title for marker in CHALLENGE_TITLE_MARKERS)
+
+class HostState:
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tat = 0  # theoretical arrival time of the next request
+        self.blocked_until = 0
+        self.failures = 0
+
+class HostRateLimiter:
+    """
+    Token bucket per host with adaptive rate
+
+    The rate of a host is halved and an exponential cooldown is started
+    when it answers 429/503 or shows a captcha, and it ramps back up
+    (+10% per success) to the configured rate once requests succeed.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0, burst=1, min_rate=0.05, base_backoff=1.0, max_backoff=120.0):
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = HostState(self.rates.get(host, self.default_rate), self.burst)
+        return self._hosts[host]
+
+    def reserve(self, host_or_url):
+        """Take a token for the host, returns how long the caller must wait first"""
+        host = host_key(host_or_url)
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            interval = 1.0 / state.rate
+            # Token bucket in GCRA form: up to `burst` requests may run ahead of the schedule
+            start = max(now, state.tat - (state.burst - 1) * interval, state.blocked_until)
+            state.tat = max(state.tat, start) + interval
+            return start - now
+
+    def wait(self, host_or_url):
+        """Block until a request to the host is allowed"""
+        delay = self.reserve(host_or_url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, host_or_url):
+        """Same as wait() for asyncio code"""
+        delay = self.reserve(host_or_url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def report(self, host_or_url, status=None, text=None, blocked=None, retry_after=None):
+        """
+        Feed the result of a request back into the limiter
+
+        blocked can be given directly, otherwise it is derived from the
+        status code and page text. retry_after (seconds) overrides the
+        computed cooldown when the server sends one.
+        """
+        host = host_key(host_or_url)
+        if blocked is None:
+            blocked = is_blocked(status, text)
+        with self._lock:
+            state = self._state(host)
+            if blocked:
+                state.failures += 1
+                state.rate = max(self.min_rate, state.rate / 2)
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (state.failures - 1))
+                if retry_after:
+                    backoff = min(self.max_backoff, float(retry_after))
+                state.blocked_until = time.monotonic() + backoff
+            else:
+                state.failures = 0
+                state.rate = min(state.max_rate, state.rate * 1.1)
+        return blocked
+
+    def report_response(self, response):
+        """report() for a requests.Response"""
+        retry_after = response.headers.get('Retry-After')
+        return self.report(
+            response.url,
+            status=response.status_code,
+            # Halaman challenge/captcha biasanya datang dengan status 403
+            text=response.text if response.status_code >= 400 else None,
+            retry_after=retry_after if retry_after and retry_after.isdigit() else None
+        )
+
+    def report_driver(self, driver, host_or_url=None):
+        """
+        report() for the page loaded in a WebDriver
+
+        Only the URL and title are checked: a normal profile page can
+        embed a reCAPTCHA script or mention "captcha" in its text.
+        """
+        url = driver.current_url
+        return self.report(host_or_url or url, blocked=is_challenge_page(url, driver.title))
+
+    def current_rate(self, host_or_url):
+        with self._lock:
+            return self._state(host_key(host_or_url)).rate
+
+class RateLimitedSession:
+    """Wraps a requests.Session so every GET waits for the limiter and reports back"""
+
+    def __init__(self, session, limiter=None):
+        self.session = session
+        self.limiter = limiter or LIMITER
+
+    def get(self, url, **kwargs):
+        self.limiter.wait(url)
+        response = self.session.get(url, **kwargs)
+        self.limiter.report_response(response)
+        return response
+
+# Limiter bersama untuk semua scraper dalam satu proses
+LIMITER = HostRateLimiter()
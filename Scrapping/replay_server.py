@@ -0,0 +1,204 @@
+import argparse
+import glob
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FIXTURE_DIR = 'fixtures'
+
+# Path yang dilayani, sama dengan idx_http dan Places API
+PROFILE_JSON_PATH = '/primary/ListedCompany/GetCompanyProfilesDetail'
+PROFILE_PAGE_PREFIX = '/id/perusahaan-tercatat/profil-perusahaan/'
+PLACES_PREFIX = '/maps/api/place'
+SITES_PREFIX = '/sites/'
+MAPS_FEED_PATH = '/maps/feed'
+
+def _read_dir(pattern):
+    """{file name without extension: bytes} for the files matching pattern"""
+    files = {}
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'rb') as f:
+            files[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return files
+
+def _pick(files, key):
+    """The fixture named key, otherwise a stable choice so every ticker gets a page"""
+    if key in files:
+        return files[key]
+    names = sorted(files)
+    return files[names[zlib.crc32(key.encode()) % len(names)]] if names else None
+
+class ReplayServer:
+    """
+    Local HTTP server that replays the fixture corpus
+
+    Serves IDX profile JSON and HTML for any ticker, company websites
+    under /sites/<name>/, the Maps feed page and Places text search /
+    details JSON. latency (seconds, +/- jitter as a fraction) and
+    error_rate (share of 503 answers) are drawn from a generator seeded
+    per path and request count, so runs are reproducible regardless of
+    thread scheduling. '{base_url}' in fixtures is replaced with the
+    server URL.
+    """
+
+    def __init__(self, fixture_dir=FIXTURE_DIR, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, json_profiles=True):
+        self.fixture_dir = fixture_dir
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.json_profiles = json_profiles
+        self.url = None
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+        join = lambda *parts: os.path.join(fixture_dir, *parts)
+        self.profile_json = _read_dir(join('idx_profile_json', '*.json'))
+        self.profile_html = _read_dir(join('idx_profile', '*.html'))
+        self.textsearch = _read_dir(join('places', 'textsearch_*.json'))
+        self.maps_feed = _read_dir(join('maps_feed', '*.html'))
+        self.sites = {}
+        for site_dir in sorted(glob.glob(join('company_site', '*'))):
+            self.sites[os.path.basename(site_dir)] = _read_dir(os.path.join(site_dir, '*.html'))
+        try:
+            with open(join('places', 'details.json'), encoding='utf-8') as f:
+                self.place_details = json.load(f)
+        except OSError:
+            self.place_details = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), ReplayHandler)
+        self._server.daemon_threads = True
+        self._server.replay = self
+        self.url = f"http://{self.host}:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _draw(self, path):
+        """Latency and error decision for the n-th request to path"""
+        with self._lock:
+            count = self._counts.get(path, 0)
+            self._counts[path] = count + 1
+        rng = random.Random(f"{self.seed}:{path}:{count}")
+        delay = self.latency * (1 + self.jitter * (2 * rng.random() - 1))
+        return max(0.0, delay), rng.random() < self.error_rate
+
+    def route(self, path, query):
+        """(status, content type, body) for a request"""
+        if path == PROFILE_JSON_PATH:
+            code = query.get('KodeEmiten', [''])[0].upper()
+            body = _pick(self.profile_json, code) if self.json_profiles else None
+            if body is None:
+                return 403, 'text/html', b'Forbidden'
+            return 200, 'application/json', body
+
+        if path.startswith(PROFILE_PAGE_PREFIX):
+            code = path[len(PROFILE_PAGE_PREFIX):].strip('/').upper()
+            body = _pick(self.profile_html, code)
+            return (200, 'text/html; charset=utf-8', body) if body else (404, 'text/html', b'Not Found')
+
+        if path.startswith(SITES_PREFIX):
+            name, _, page = path[len(SITES_PREFIX):].partition('/')
+            pages = self.sites.get(name, {})
+            page = os.path.splitext(page)[0] or 'index'
+            if page not in pages:
+                return 404, 'text/html', b'Not Found'
+            return 200, 'text/html; charset=utf-8', pages[page]
+
+        if path == MAPS_FEED_PATH:
+            body = next(iter(self.maps_feed.values()), None)
+            return (200, 'text/html; charset=utf-8', body) if body else (404, 'text/html', b'Not Found')
+
+        if path == PLACES_PREFIX + '/textsearch/json':
+            # Token "page-2" -> textsearch_2.json
+            token = query.get('pagetoken', ['page-1'])[0]
+            body = self.textsearch.get('textsearch_' + token.rsplit('-', 1)[-1])
+            if body is None:
+                body = json.dumps({'status': 'INVALID_REQUEST', 'results': []}).encode()
+            return 200, 'application/json', body
+
+        if path == PLACES_PREFIX + '/details/json':
+            result = self.place_details.get(query.get('place_id', [''])[0])
+            body = {'status': 'OK', 'result': result} if result is not None else {'status': 'NOT_FOUND'}
+            return 200, 'application/json', json.dumps(body).encode()
+
+        return 404, 'text/html', b'Not Found'
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors, 'bytes': self.bytes}
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        replay = self.server.replay
+        url = urlparse(self.path)
+        delay, failed = replay._draw(url.path + '?' + url.query)
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            status, content_type, body = 503, 'text/html', b'Service Unavailable'
+        else:
+            status, content_type, body = replay.route(url.path, parse_qs(url.query))
+            body = body.replace(b'{base_url}', replay.url.encode())
+
+        with replay._lock:
+            replay.requests += 1
+            replay.errors += status >= 500
+            replay.bytes += len(body)
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the fixture corpus over HTTP")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR)
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per response")
+    parser.add_argument('--jitter', type=float, default=0.5, help="latency varies by this fraction")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-json', action='store_true', help="answer the IDX JSON endpoint with 403")
+    args = parser.parse_args()
+
+    server = ReplayServer(args.fixtures, port=args.port, latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, seed=args.seed, json_profiles=not args.no_json)
+    print(f"Replaying {args.fixtures} on {server.start()} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
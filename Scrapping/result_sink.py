@@ -0,0 +1,544 @@
+import csv
+import itertools
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import pandas as pd
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Baris per chunk saat export, ini yang membatasi pemakaian RAM
+EXPORT_CHUNK_ROWS = 5000
+
+EXCEL_MAX_ROWS = 1048576
+
+# constant_memory: tiap baris langsung ditulis ke file sementara lalu dibuang dari memori
+XLSX_OPTIONS = {
+    'constant_memory': True,
+    'strings_to_urls': False,
+    'strings_to_numbers': False,
+    'nan_inf_to_errors': True,
+    'default_date_format': 'yyyy-mm-dd'
+}
+
+def sink_format(path):
+    """Get sink format from the file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.db', '.sqlite', '.sqlite3'):
+        return 'sqlite'
+    if ext == '.csv':
+        return 'csv'
+    return 'jsonl'
+
+def flatten_value(value):
+    """Convert list values (e.g. Social Media) to text for CSV/Excel"""
+    if isinstance(value, list):
+        return '\n'.join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+class ResultSink:
+    """
+    Append-only result file, written record by record
+
+    Records are flushed to the OS after every write so other processes
+    can read partial results, and fsynced every fsync_every records.
+    Format follows the extension: .jsonl, .csv or .db/.sqlite. A CSV
+    header grows when a record brings a new key (e.g. Website Emails
+    after the website crawl); earlier rows get the column empty.
+    """
+
+    def __init__(self, path, fsync_every=20, append=True, fieldnames=None):
+        self.path = path
+        self.format = sink_format(path)
+        self.fsync_every = fsync_every
+        self.fieldnames = fieldnames
+        self.count = 0
+        self._unsynced = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._conn = None
+
+        if self.format == 'sqlite':
+            if not append and os.path.exists(path):
+                os.remove(path)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)')
+            self._conn.commit()
+        else:
+            exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+            self._file = open(path, 'a' if append else 'w', encoding='utf-8', newline='')
+            if self.format == 'csv':
+                if exists:
+                    # Lanjutkan dengan header yang sudah ada di file
+                    with open(path, encoding='utf-8', newline='') as f:
+                        self.fieldnames = next(csv.reader(f))
+                    self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+
+    def write(self, record):
+        """Append one record, safe to call from several threads"""
+        with self._lock:
+            if self.format == 'sqlite':
+                self._conn.execute('INSERT INTO records (data) VALUES (?)', (json.dumps(record, ensure_ascii=False),))
+            elif self.format == 'csv':
+                if self._writer is None:
+                    self.fieldnames = self.fieldnames or list(record.keys())
+                    self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+                    self._writer.writeheader()
+                new = [key for key in record if key not in self.fieldnames]
+                if new:
+                    self._extend_header(new)
+                self._writer.writerow({k: flatten_value(v) for k, v in record.items()})
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            self.count += 1
+            self._unsynced += 1
+            if self.format != 'sqlite':
+                self._file.flush()
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+
+    def _extend_header(self, new):
+        """Rewrite the CSV with the new columns added to the header"""
+        # Jarang terjadi (sekali per kolom baru); file baru menggantikan yang lama secara atomik
+        self._file.close()
+        self.fieldnames = self.fieldnames + new
+        tmp_path = self.path + '.tmp'
+        with open(self.path, encoding='utf-8', newline='') as src, open(tmp_path, 'w', encoding='utf-8', newline='') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            next(reader, None)
+            writer.writerow(self.fieldnames)
+            for row in reader:
+                writer.writerow(row + [''] * (len(self.fieldnames) - len(row)))
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+
+    def _sync(self):
+        if self.format == 'sqlite':
+            self._conn.commit()
+        else:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def flush(self):
+        """Commit and fsync everything written so far"""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._conn is not None:
+                self._conn.close()
+            if self._file is not None:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_records(path):
+    """Iterate over records in a sink file, also while it is still being written"""
+    fmt = sink_format(path)
+    if fmt == 'sqlite':
+        conn = sqlite3.connect(path)
+        try:
+            for (data,) in conn.execute('SELECT data FROM records ORDER BY id'):
+                yield json.loads(data)
+        finally:
+            conn.close()
+    elif fmt == 'csv':
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                yield row
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                # Baris terakhir bisa belum lengkap kalau run masih berjalan
+                if line.endswith('\n'):
+                    yield json.loads(line)
+
+def load_dataframe(path, columns=None):
+    """Build a DataFrame view of the sink with list values joined"""
+    df = pd.DataFrame(read_records(path))
+    for column in df.columns:
+        df[column] = df[column].apply(flatten_value)
+    if columns:
+        df = df.reindex(columns=columns)
+    return df
+
+def flatten_frame(df):
+    """flatten_value over a whole chunk: list cells joined with .str.join, dict cells as JSON"""
+    for column in df.columns[df.dtypes == object]:
+        kinds = df[column].map(type)
+        lists = kinds.eq(list)
+        if lists.any():
+            df.loc[lists, column] = df.loc[lists, column].str.join('\n')
+        dicts = kinds.eq(dict)
+        if dicts.any():
+            df.loc[dicts, column] = df.loc[dicts, column].map(lambda value: json.dumps(value, ensure_ascii=False))
+    return df
+
+def frame_chunks(source, chunk_size=EXPORT_CHUNK_ROWS):
+    """
+    DataFrames of at most chunk_size rows from a sink file path, a
+    DataFrame, an iterable of DataFrames (e.g. CompanyStore.iter_chunks)
+    or an iterable of records
+    """
+    if isinstance(source, str):
+        source = read_records(source)
+    elif isinstance(source, pd.DataFrame):
+        source = [source]
+    items = iter(source)
+    first = next(items, None)
+    if first is None:
+        return
+    items = itertools.chain([first], items)
+
+    if isinstance(first, pd.DataFrame):
+        for frame in items:
+            for i in range(0, len(frame), chunk_size):
+                yield frame.iloc[i:i + chunk_size].copy()
+        return
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk)
+
+def column_kind(series):
+    """'bool', 'number', 'datetime' or 'string' for the values of a column, None when all are empty"""
+    values = series.dropna()
+    if values.empty:
+        return None
+    if pd.api.types.is_bool_dtype(values):
+        return 'bool'
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(values):
+        return 'number'
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred in ('integer', 'floating', 'mixed-integer-float', 'decimal'):
+        return 'number'
+    if inferred == 'boolean':
+        return 'bool'
+    if inferred in ('datetime', 'datetime64', 'date'):
+        return 'datetime'
+    return 'string'
+
+def merge_kind(kind, other):
+    """Kind of a column over two chunks, values of different kinds are kept as strings"""
+    if kind is None:
+        return other
+    if other is None or other == kind:
+        return kind
+    return 'string'
+
+def align_columns(df, columns):
+    """Reindex a chunk to the report columns; a column the report does not have is an error, not dropped"""
+    known = set(columns)
+    unknown = [str(column) for column in df.columns if column not in known]
+    if unknown:
+        raise ValueError(f"Columns not in the report: {', '.join(unknown)}")
+    return df.reindex(columns=columns)
+
+class ChunkScan:
+    """
+    First pass over an export source: every column and the kind of its values
+
+    Columns are collected over all chunks, in order of first appearance,
+    so keys that only show up late (e.g. website fields) are not lost.
+    With columns given, only those are kept. A sink file, list or
+    DataFrame is read again for the second pass; other iterables (e.g.
+    CompanyStore.iter_chunks) can only be read once, so their chunks are
+    spooled to a temporary directory in between.
+    """
+
+    def __init__(self, source, columns=None, chunk_size=EXPORT_CHUNK_ROWS):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.fixed = columns is not None
+        self.columns = list(columns) if columns is not None else []
+        self.kinds = {}
+        self.rows = 0
+        self._reread = isinstance(source, (str, pd.DataFrame, list, tuple))
+        self._spool = None
+        self._parts = 0
+
+    def __enter__(self):
+        if not self._reread:
+            self._spool = tempfile.mkdtemp(prefix='export_')
+        seen = set(self.columns)
+        for df in self._prepared(frame_chunks(self.source, self.chunk_size)):
+            if not self.fixed:
+                new = [column for column in df.columns if column not in seen]
+                seen.update(new)
+                self.columns += new
+            for column in df.columns:
+                self.kinds[column] = merge_kind(self.kinds.get(column), column_kind(df[column]))
+            if self._spool:
+                df.to_pickle(os.path.join(self._spool, f'{self._parts}.pkl'))
+                self._parts += 1
+            self.rows += len(df)
+        return self
+
+    def __exit__(self, *exc):
+        if self._spool:
+            shutil.rmtree(self._spool, ignore_errors=True)
+
+    def _prepared(self, chunks):
+        for df in chunks:
+            if self.fixed:
+                df = df.reindex(columns=self.columns)
+            yield flatten_frame(df)
+
+    def chunks(self):
+        """Second pass: the same rows, every chunk with all columns in order"""
+        if self._spool:
+            parts = (pd.read_pickle(os.path.join(self._spool, f'{i}.pkl')) for i in range(self._parts))
+        else:
+            source = self.source
+            if isinstance(source, str):
+                # Sink file bisa masih ditulis, ambil hanya baris yang sudah di-scan
+                source = itertools.islice(read_records(source), self.rows)
+            parts = self._prepared(frame_chunks(source, self.chunk_size))
+        for df in parts:
+            yield df.reindex(columns=self.columns)
+
+def sheet_title(name):
+    """Valid Excel sheet name: no []:*?/\\, at most 31 characters"""
+    name = re.sub(r'[\[\]:*?/\\]', ' ', str(name)).strip()
+    return name[:31] or 'Lainnya'
+
+class XlsxReport:
+    """
+    Excel report written with xlsxwriter in constant_memory mode
+
+    Rows go straight to disk, so memory stays at one chunk whatever the
+    row count. With sheet_by, every value of that column gets its own
+    sheet; a sheet that reaches Excel's row limit continues on a new one.
+    Without columns the header comes from the first chunk, and a later
+    chunk with other columns raises ValueError.
+    """
+
+    def __init__(self, filename, columns=None, sheet_by=None, sheet_name='Data', **kwargs):
+        if xlsxwriter is None:
+            raise ImportError("xlsxwriter is needed for Excel export")
+        self.filename = filename
+        self.sheet_by = sheet_by
+        self.sheet_name = sheet_name
+        self.rows = 0
+        self.columns = list(columns) if columns is not None else None
+        self.workbook = xlsxwriter.Workbook(filename, XLSX_OPTIONS)
+        self.header_format = self.workbook.add_format({'bold': True})
+        self.wrap_format = self.workbook.add_format({'text_wrap': True, 'valign': 'top'})
+        self._sheets = {}  # key -> [worksheet, next row, sheet number]
+        self._titles = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_sheet(self, key, number, sample):
+        title = sheet_title(key if number == 1 else f"{str(key)[:25]} ({number})")
+        while title in self._titles:
+            title = sheet_title(f"{title[:28]}_{len(self._titles)}")
+        self._titles.add(title)
+        worksheet = self.workbook.add_worksheet(title)
+        worksheet.freeze_panes(1, 0)
+        for col, column in enumerate(self.columns):
+            # Lebar kolom dari header dan isi chunk pertama
+            texts = sample[column].dropna().astype(str)
+            width = max(len(str(column)), int(texts.str.len().quantile(0.9)) if len(texts) else 0)
+            multiline = texts.str.contains('\n', regex=False).any()
+            worksheet.set_column(col, col, min(width + 2, 60), self.wrap_format if multiline else None)
+        worksheet.write_row(0, 0, self.columns, self.header_format)
+        return [worksheet, 1, number]
+
+    def _write_rows(self, key, part):
+        if key not in self._sheets:
+            self._sheets[key] = self._new_sheet(key, 1, part)
+        sheet = self._sheets[key]
+        values = part.astype(object).where(part.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet[1] >= EXCEL_MAX_ROWS:
+                self._finish_sheet(sheet)
+                sheet = self._sheets[key] = self._new_sheet(key, sheet[2] + 1, part)
+            sheet[0].write_row(sheet[1], 0, row)
+            sheet[1] += 1
+        self.rows += len(part)
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+        df = align_columns(df, self.columns)
+        if self.sheet_by and self.sheet_by in df.columns:
+            for key, part in df.groupby(df[self.sheet_by].fillna(''), sort=False):
+                self._write_rows(key or 'Lainnya', part)
+        else:
+            self._write_rows(self.sheet_name, df)
+
+    def _finish_sheet(self, sheet):
+        worksheet, rows, _ = sheet
+        worksheet.autofilter(0, 0, max(rows - 1, 1), len(self.columns) - 1)
+
+    def close(self):
+        if not self._titles:
+            # Workbook kosong tetap perlu satu sheet
+            self.workbook.add_worksheet(self.sheet_name)
+        for sheet in self._sheets.values():
+            self._finish_sheet(sheet)
+        self.workbook.close()
+
+class ParquetReport:
+    """
+    Parquet file written one row group per chunk
+
+    kinds ({column: kind}, see ChunkScan) fixes the type of every column:
+    numbers as float64, datetimes as timestamps, everything else as
+    strings. Without kinds they come from the first chunk. A later value
+    that does not fit its column raises ValueError instead of being
+    written as null.
+    """
+
+    def __init__(self, filename, columns=None, kinds=None, **kwargs):
+        if pyarrow is None:
+            raise ImportError("pyarrow is needed for Parquet export")
+        self.filename = filename
+        self.rows = 0
+        self.columns = list(columns) if columns is not None else None
+        self.kinds = kinds
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _convert(self, series, kind):
+        if kind == 'number':
+            return pd.to_numeric(series).astype('float64')
+        if kind == 'datetime':
+            return pd.to_datetime(series)
+        if kind == 'bool':
+            return series.astype('boolean')
+        return series.astype('string')
+
+    def write(self, df):
+        if self.writer is None:
+            if self.columns is None:
+                self.columns = list(df.columns)
+            kinds = self.kinds or {column: column_kind(df[column]) for column in self.columns}
+            # Kolom yang kosong semua di data tetap ditulis sebagai string
+            self.kinds = {column: kinds.get(column) or 'string' for column in self.columns}
+            types = {'bool': pyarrow.bool_(), 'number': pyarrow.float64(), 'datetime': pyarrow.timestamp('ns'), 'string': pyarrow.string()}
+            self.schema = pyarrow.schema([(str(column), types[self.kinds[column]]) for column in self.columns])
+            self.writer = pyarrow.parquet.ParquetWriter(self.filename, self.schema)
+        df = align_columns(df, self.columns)
+        for column, kind in self.kinds.items():
+            try:
+                df[column] = self._convert(df[column], kind)
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Column {column} does not fit type {kind}: {str(e)}") from e
+        self.writer.write_table(pyarrow.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+class CsvReport:
+    """CSV file appended chunk by chunk, header from columns or from the first chunk"""
+
+    def __init__(self, filename, columns=None, **kwargs):
+        self.filename = filename
+        self.rows = 0
+        self.columns = list(columns) if columns is not None else None
+        self._header = True
+        self._file = open(filename, 'w', encoding='utf-8', newline='')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df):
+        if self.columns is None:
+            self.columns = list(df.columns)
+        align_columns(df, self.columns).to_csv(self._file, index=False, header=self._header)
+        self._header = False
+        self.rows += len(df)
+
+    def close(self):
+        self._file.close()
+
+REPORT_WRITERS = {
+    '.xlsx': XlsxReport,
+    '.parquet': ParquetReport,
+    '.csv': CsvReport
+}
+
+def export_report(source, filename, columns=None, sheet_by=None, chunk_size=EXPORT_CHUNK_ROWS):
+    """
+    Stream source (see frame_chunks) into filename in chunks of chunk_size rows
+
+    The format follows the extension: .xlsx, .parquet or .csv. Only one
+    chunk is in memory at a time. A first pass (ChunkScan) collects the
+    columns of all chunks and their types; with columns given, only
+    those are exported. sheet_by splits an Excel report into one sheet
+    per value of that column (e.g. sector or search query).
+    Returns filename, or None when there were no rows.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in REPORT_WRITERS:
+        raise ValueError(f"Unknown report format {ext}, use one of {', '.join(REPORT_WRITERS)}")
+
+    with ChunkScan(source, columns, chunk_size) as scan:
+        if not scan.rows:
+            print("No data to save")
+            return None
+        with REPORT_WRITERS[ext](filename, columns=scan.columns, kinds=scan.kinds, sheet_by=sheet_by) as report:
+            for df in scan.chunks():
+                report.write(df)
+    print(f"\nData saved to {filename} ({report.rows} rows)")
+    return filename
+
+def export_excel(path, filename, columns=None, sheet_by=None):
+    """Write the sink contents to an Excel file"""
+    return export_report(path, filename, columns, sheet_by)
+
+def export_csv(path, filename, columns=None):
+    """Write the sink contents to a CSV file"""
+    return export_report(path, filename, columns)
+
+def export_parquet(path, filename, columns=None):
+    """Write the sink contents to a Parquet file"""
+    return export_report(path, filename, columns)
@@ -1,157 +1,143 @@
-import pandas as pd
-from bs4 import BeautifulSoup
 import time
-from tqdm import tqdm
-import random
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-import chromedriver_autoinstaller
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from driver_pool import DriverPool
+from page_cache import PageCache
+from result_sink import ResultSink, export_report
+from rate_limiter import LIMITER
+from profile_parser import empty_info, parse_profile
+from idx_http import scrape_companies_http
+from get_company_list import read_company_codes
+from company_store import CompanyStore
+from metrics import METRICS, serve_from_env
+from browser import create_driver, PAGE_COUNTER
 
 def setup_driver():
     """Setup Chrome driver with options"""
-    chromedriver_autoinstaller.install()
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')  # Run in headless mode
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    return webdriver.Chrome(options=options)
+    return create_driver(warm_profile=True)
 
 def get_company_info(company_code, driver):
-    """Get company information from IDX website"""
-    info = {
-        'Kode': company_code,
-        'Nama Perusahaan': '',
-        'Sektor': '',
-        'Website': '',
-        'Email': '',
-        'Telepon': '',
-        'Alamat': ''
-    }
+    """
+    Get company information from IDX website
+
+    Driver errors (including a page load timeout) are raised, so
+    DriverPool restarts the driver and retries the company.
+    """
+    info = empty_info(company_code)
     
     try:
         # New IDX URL format
         idx_url = f"https://www.idx.co.id/id/perusahaan-tercatat/profil-perusahaan/{company_code}/"
         
-        # Add random delay between requests
-        time.sleep(random.uniform(1, 3))
+        # Wait for the per-host rate limiter instead of a fixed delay
+        LIMITER.wait(idx_url)
         
-        driver.get(idx_url)
+        with METRICS.span('idx.fetch'):
+            driver.get(idx_url)
         
         # Wait for the content to load
-        wait = WebDriverWait(driver, 10)
-        wait.until(EC.presence_of_element_located((By.CLASS_NAME, "container")))
-        
-        # Get the page source after JavaScript renders
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        
-        # Find the company details table
-        table = soup.find('table')
-        if table:
-            rows = table.find_all('tr')
-            for row in rows:
-                cols = row.find_all('td')
-                if len(cols) >= 3:
-                    label = cols[0].text.strip().lower()
-                    value = cols[2].text.strip()
-                    
-                    if 'nama' in label:
-                        info['Nama Perusahaan'] = value
-                    elif 'sektor' in label:
-                        info['Sektor'] = value
-                    elif 'situs' in label:
-                        info['Website'] = value
-                    elif 'email' in label:
-                        info['Email'] = value
-                    elif 'telepon' in label:
-                        info['Telepon'] = value
-                    elif 'alamat' in label:
-                        info['Alamat'] = value
-
-        # Get social media links if available
-        social_links = []
-        for link in soup.find_all('a', href=True):
-            href = link['href'].lower()
-            if any(platform in href for platform in ['facebook.com', 'twitter.com', 'linkedin.com', 'instagram.com']):
-                social_links.append(href)
+        try:
+            with METRICS.span('idx.wait'):
+                wait = WebDriverWait(driver, 10)
+                wait.until(EC.presence_of_element_located((By.CLASS_NAME, "container")))
+        except TimeoutException as e:
+            # Halaman termuat tapi kontennya tidak muncul, driver sendiri masih sehat
+            print(f"Timeout waiting for {company_code} page to load")
+            METRICS.error('idx', e)
+            return info
+        page_source = driver.page_source
+        LIMITER.report_driver(driver, idx_url)
+        PAGE_COUNTER.record(driver)
         
-        if social_links:
-            info['Social Media'] = social_links
+        # Parse the company details table and social media links
+        with METRICS.span('idx.parse'):
+            parsed = parse_profile(page_source, company_code)
+        if parsed:
+            info = parsed
 
-    except TimeoutException:
-        print(f"Timeout waiting for {company_code} page to load")
+    except WebDriverException:
+        raise
     except Exception as e:
         print(f"Error processing {company_code}: {str(e)}")
+        METRICS.error('idx', e)
     
     return info
 
-def scrape_companies(start=0, limit=10):
-    """Scrape company information from IDX website"""
-    # Read the CSV file
-    df = pd.read_csv('daftar_perusahaan_idx.csv')
-    
-    # Get company codes
-    data = df.iloc[start:start+limit]
-    companies = []
-    
-    for _, row in data.iterrows():
-        name = row['Nama Perusahaan']
-        if isinstance(name, str) and 'BEI:' in name:
-            code = name.split('BEI:')[1].strip()
-            companies.append(code)
+def scrape_companies(start=0, limit=10, use_http=True, workers=8, browser_workers=None, max_per_host=2, sink=None, cache=None, store=None):
+    """Scrape company information from IDX website, unchanged profiles are skipped when a store is given"""
+    # Get company codes from the company list
+    companies = read_company_codes()[start:start+limit]
     
     print(f"\nScraping data for {len(companies)} companies starting from index {start}...")
-    companies_data = []
     
-    # Initialize the driver
-    driver = setup_driver()
-    
-    try:
-        for company_code in tqdm(companies, desc="Processing companies"):
-            info = get_company_info(company_code, driver)
-            companies_data.append(info)
-    finally:
-        driver.quit()
+    # Plain HTTP first, Selenium only for pages that need JavaScript
+    if use_http:
+        return scrape_companies_http(
+            companies,
+            workers=workers,
+            browser_fallback=lambda codes: scrape_companies_browser(codes, browser_workers, max_per_host),
+            sink=sink,
+            cache=cache,
+            store=store
+        )
     
+    companies_data = scrape_companies_browser(companies, browser_workers, max_per_host, sink)
+    if store:
+        store.upsert_many([info for info in companies_data if info['Nama Perusahaan']])
     return companies_data
 
+def create_browser_pool(workers=None, max_per_host=2, reuse=False):
+    """DriverPool for IDX profile pages"""
+    return DriverPool(setup_driver, workers=workers, max_per_host=max_per_host, host_fn=lambda code: 'www.idx.co.id', reuse=reuse)
+
+def scrape_companies_browser(companies, workers=None, max_per_host=2, sink=None, pool=None):
+    """Scrape company codes with a pool of Selenium drivers, pool can be shared between calls"""
+    pool = pool or create_browser_pool(workers, max_per_host)
+    companies_data = pool.map(
+        lambda driver, code: get_company_info(code, driver),
+        companies,
+        desc="Processing companies",
+        on_result=(lambda index, info: sink.write(info)) if sink else None
+    )
+    
+    # Codes whose driver could not be started still get an empty row
+    return [info or empty_info(code) for code, info in zip(companies, companies_data)]
+
 def save_to_excel(data, filename='company_data.xlsx'):
     """Save data to Excel file"""
     if not data:
         print("No data to save")
         return
         
-    df = pd.DataFrame(data)
-    
-    # Convert social media list to string if exists
-    if 'Social Media' in df.columns:
-        df['Social Media'] = df['Social Media'].apply(lambda x: '\n'.join(x) if isinstance(x, list) else '')
-    
+    # Rows are streamed in chunks, Social Media lists are joined per chunk
     try:
-        df.to_excel(filename, index=False, engine='openpyxl')
-        print(f"\nData saved to {filename}")
+        export_report(data, filename)
     except Exception as e:
         print(f"Error saving to Excel: {str(e)}")
         # Save to backup file
         backup_file = f'company_data_backup_{int(time.time())}.xlsx'
         try:
-            df.to_excel(backup_file, index=False, engine='openpyxl')
+            export_report(data, backup_file)
             print(f"Data saved to backup file: {backup_file}")
         except Exception as e:
             print(f"Error saving to backup file: {str(e)}")
             # Save as CSV as last resort
             csv_file = f'company_data_backup_{int(time.time())}.csv'
-            df.to_csv(csv_file, index=False)
+            export_report(data, csv_file)
             print(f"Data saved to CSV file: {csv_file}")
 
 def main():
     start_index = 0  # Start from the first company
     batch_size = 10  # Process 10 companies at a time
+    sink_file = 'company_data.jsonl'  # Records are written here as they are scraped
     
     print("Starting company data scraping...")
-    companies_data = scrape_companies(start=start_index, limit=batch_size)
+    serve_from_env()
+    # Store updates each company's row; sink only gets profiles that changed
+    with ResultSink(sink_file, append=False) as sink, CompanyStore() as store:
+        companies_data = scrape_companies(start=start_index, limit=batch_size, sink=sink, cache=PageCache(), store=store)
     
     if companies_data:
         # Print summary
@@ -168,8 +154,12 @@ def main():
         print(f"Companies with sector info: {with_sector}")
         print(f"Companies with website: {with_website}")
         print(f"Companies with contact info: {with_contact}")
+        if PAGE_COUNTER.pages:
+            print(f"Browser pages: {PAGE_COUNTER.summary()}")
         
-        save_to_excel(companies_data)
+        with METRICS.span('export.xlsx'):
+            save_to_excel(companies_data)
+        METRICS.write_summary('company_data_metrics.json')
     else:
         print("\nNo data was collected")
     
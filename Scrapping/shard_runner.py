@@ -0,0 +1,204 @@
+import argparse
+import os
+import time
+from datetime import datetime
+from company_store import CompanyStore
+from get_company_list import read_company_codes
+from google_maps_scraper import get_places, EXPORT_COLUMNS
+from metrics import METRICS, serve_from_env
+from page_cache import PageCache
+from place_cache import PlaceCache
+from result_sink import ResultSink, export_excel
+from scrapping import scrape_companies_http, scrape_companies_browser, create_browser_pool, save_to_excel
+from tile_planner import CITY_BOUNDS, SATURATION, Tile, grid_tiles, split_tile, tile_center, tile_radius, plan_summary
+from work_queue import open_queue, run_worker, SqliteQueue, QueueServer, WORK_QUEUE_FILE, LEASE_SECONDS, QUEUE_TOKEN_ENV
+
+PLACES_API_KEY_ENV = 'GOOGLE_PLACES_API_KEY'
+
+def tile_key(query, tile):
+    return f"{query}|{tile.south:.6f},{tile.west:.6f},{tile.north:.6f},{tile.east:.6f}"
+
+def enqueue_companies(queue, codes, shard_size=25):
+    """Put the company codes into the idx queue as shards of shard_size tickers"""
+    shards = [codes[i:i + shard_size] for i in range(0, len(codes), shard_size)]
+    added = queue.put('idx', [(f"{shard[0]}-{shard[-1]}", {'codes': shard}) for shard in shards])
+    print(f"{added} of {len(shards)} idx shards added")
+    return added
+
+def enqueue_tiles(queue, query, cities, tile_size=3000, max_depth=2):
+    """Put the search tiles of every city into the places queue"""
+    tiles = [tile for city in cities for tile in grid_tiles(CITY_BOUNDS[city.lower()], tile_size)]
+    print(f"Plan: {plan_summary(tiles, max_depth)}")
+    added = queue.put('places', [(tile_key(query, tile), {'query': query, 'tile': list(tile), 'max_depth': max_depth}) for tile in tiles])
+    print(f"{added} of {len(tiles)} places shards added")
+    return added
+
+def idx_handler(workers=8, cache=None, pool=None):
+    """
+    Handler for idx shards: profiles over HTTP, browser only for pages that need it
+
+    Codes that come back without a name are not stored as done: they
+    go back into the queue as a smaller shard. A shard where every code
+    failed raises, so the queue retries it and marks it failed after
+    max_attempts.
+    """
+    fallback = (lambda missing: scrape_companies_browser(missing, pool=pool)) if pool else None
+
+    def handle(task, queue):
+        records = scrape_companies_http(task.payload['codes'], workers=workers, browser_fallback=fallback, cache=cache)
+        missing = [record['Kode'] for record in records if not record.get('Nama Perusahaan')]
+        if len(missing) == len(records):
+            raise RuntimeError(f"No profile data for {', '.join(missing)}")
+        if missing:
+            print(f"{len(missing)} companies of {task.key} without profile data, put back into the queue")
+            queue.put('idx', [(f"{task.key}/{missing[0]}-{missing[-1]}", {'codes': missing})])
+        return [record for record in records if record.get('Nama Perusahaan')]
+    return handle
+
+def places_handler(api_key, workers=8, cache=None, **kwargs):
+    """
+    Handler for places shards: one tile search
+
+    A saturated tile puts its four quadrants back into the queue, so the
+    split is shared by all nodes like the grid itself.
+    """
+    def handle(task, queue):
+        tile = Tile(*task.payload['tile'])
+        query = task.payload['query']
+        lat, lng = tile_center(tile)
+        places = get_places(api_key, query, location=f"{lat:.7f},{lng:.7f}", radius=tile_radius(tile),
+                            workers=workers, cache=cache, **kwargs)
+        if len(places) >= SATURATION and tile.depth < task.payload['max_depth']:
+            children = split_tile(tile)
+            queue.put('places', [(tile_key(query, child), dict(task.payload, tile=list(child))) for child in children])
+        return places
+    return handle
+
+def dedup_places(places):
+    """Tiles overlap, keep the first record of every place_id"""
+    seen = set()
+    unique = []
+    for place in places:
+        key = place.get('place_id') or (place.get('nama'), place.get('alamat'))
+        if key not in seen:
+            seen.add(key)
+            unique.append(place)
+    return unique
+
+def work(args, queue):
+    sink = ResultSink(args.sink) if args.sink else None
+    pool = None
+    try:
+        if args.name == 'idx':
+            # Offline hanya memakai page cache, jadi tidak ada browser
+            pool = create_browser_pool(args.browser_workers, reuse=True) if args.browser_workers and not args.offline else None
+            handler = idx_handler(args.workers, PageCache(offline=args.offline), pool)
+        else:
+            api_key = os.environ.get(PLACES_API_KEY_ENV)
+            if not api_key:
+                print(f"Set {PLACES_API_KEY_ENV} first")
+                return None
+            handler = places_handler(api_key, args.workers, PlaceCache())
+        return run_worker(queue, args.name, handler, worker_id=args.worker_id, batch_size=args.batch,
+                          lease_seconds=args.lease, wait_for_others=not args.no_wait, sink=sink)
+    finally:
+        if pool:
+            pool.close()
+        if sink:
+            sink.close()
+
+def export(args, queue):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    records = queue.results(args.name)
+    if args.name == 'places':
+        records = dedup_places(records)
+        filename = args.output or f"data_tempat_{timestamp}.xlsx"
+        sink_file = os.path.splitext(filename)[0] + '.jsonl'
+        with ResultSink(sink_file, append=False) as sink:
+            for record in records:
+                sink.write(record)
+        export_excel(sink_file, filename, columns=EXPORT_COLUMNS)
+    else:
+        # Shard lama bisa berisi record kosong, jangan sampai menandai kode sebagai sudah di-scrape
+        records = [record for record in records if record.get('Nama Perusahaan')]
+        with CompanyStore() as store:
+            store.upsert_many(records)
+        save_to_excel(records, args.output or f"company_data_{timestamp}.xlsx")
+    print(f"{len(records)} records exported")
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded scraping over a shared work queue, one worker process per node")
+    parser.add_argument('--queue', default=WORK_QUEUE_FILE, help="SQLite file, or http://host:port of a queue server")
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--token', default=os.environ.get(QUEUE_TOKEN_ENV), help=f"shared queue server token (default ${QUEUE_TOKEN_ENV})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_idx = commands.add_parser('enqueue-idx', help="put company codes into the idx queue")
+    enqueue_idx.add_argument('--shard-size', type=int, default=25)
+    enqueue_idx.add_argument('--start', type=int, default=0)
+    enqueue_idx.add_argument('--limit', type=int)
+
+    enqueue_places = commands.add_parser('enqueue-places', help="put search tiles into the places queue")
+    enqueue_places.add_argument('--query', required=True)
+    enqueue_places.add_argument('--cities', required=True, help=f"comma separated, from {', '.join(CITY_BOUNDS)}")
+    enqueue_places.add_argument('--tile-size', type=int, default=3000)
+    enqueue_places.add_argument('--max-depth', type=int, default=2)
+
+    worker = commands.add_parser('work', help="claim and scrape shards until the queue is drained")
+    worker.add_argument('name', choices=['idx', 'places'])
+    worker.add_argument('--workers', type=int, default=8, help="parallel requests inside one shard")
+    worker.add_argument('--browser-workers', type=int, default=1, help="0 disables the Selenium fallback")
+    worker.add_argument('--batch', type=int, default=1, help="shards claimed at once")
+    worker.add_argument('--lease', type=float, default=LEASE_SECONDS)
+    worker.add_argument('--worker-id')
+    worker.add_argument('--sink', help="also write records to this local file")
+    worker.add_argument('--offline', action='store_true', help="only use pages from the page cache")
+    worker.add_argument('--no-wait', action='store_true', help="exit when nothing is pending, even if others hold leases")
+
+    serve = commands.add_parser('serve', help="share the SQLite queue with other nodes over HTTP")
+    serve.add_argument('--host', default='127.0.0.1', help="0.0.0.0 to reach it from other nodes, needs --token")
+    serve.add_argument('--port', type=int, default=8765)
+
+    status = commands.add_parser('status')
+    status.add_argument('--retry-failed', action='store_true')
+
+    exporter = commands.add_parser('export', help="write the results of a queue to Excel")
+    exporter.add_argument('name', choices=['idx', 'places'])
+    exporter.add_argument('--output')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        if args.host not in ('127.0.0.1', 'localhost', '::1') and not args.token:
+            print(f"Serving on {args.host} needs a shared token, set --token or {QUEUE_TOKEN_ENV}")
+            return
+        with SqliteQueue(args.queue, args.max_attempts) as backend, QueueServer(backend, args.host, args.port, args.token) as server:
+            print(f"Queue {args.queue} on {server.url} (Ctrl+C to stop)")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+        return
+
+    with open_queue(args.queue, args.max_attempts, args.token) as queue:
+        if args.command == 'enqueue-idx':
+            codes = read_company_codes()[args.start:]
+            enqueue_companies(queue, codes[:args.limit] if args.limit else codes, args.shard_size)
+        elif args.command == 'enqueue-places':
+            cities = [city.strip() for city in args.cities.split(',') if city.strip().lower() in CITY_BOUNDS]
+            enqueue_tiles(queue, args.query, cities, args.tile_size, args.max_depth)
+        elif args.command == 'work':
+            serve_from_env()
+            print(f"Finished: {work(args, queue)}")
+            METRICS.write_summary(f"shard_{args.name}_metrics.json")
+        elif args.command == 'status':
+            for name in ['idx', 'places']:
+                if args.retry_failed:
+                    queue.retry_failed(name)
+                print(f"{name}: {queue.stats(name)}")
+        elif args.command == 'export':
+            export(args, queue)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+import re
+from urllib.parse import urljoin, urlparse
+import aiohttp
+from rate_limiter import LIMITER
+from social_links import extract_social_links, add_social_fields, SOCIAL_COLUMNS
+from profile_parser import content_fingerprint
+from metrics import METRICS
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Kata kunci halaman yang biasanya berisi kontak, urutan = prioritas
+PAGE_KEYWORDS = [
+    ('kontak', 10), ('hubungi', 10), ('contact', 10),
+    ('tentang-kami', 6), ('tentang', 5), ('about', 5),
+    ('profil', 3), ('profile', 3), ('company', 2)
+]
+
+LINK_PATTERN = re.compile(r'''<a\s[^>]*?href\s*=\s*["']([^"'#]+)["'][^>]*>(.*?)</a>''', re.IGNORECASE | re.DOTALL)
+EMAIL_PATTERN = re.compile(r'[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}', re.IGNORECASE)
+PHONE_PATTERN = re.compile(r'(?:\+62|\b62|\(0|\b0)[\s.()-]*\d{2,4}[\s.)-]*\d{3,4}[\s.-]*\d{2,5}\b')
+TEL_PATTERN = re.compile(r'''href\s*=\s*["']tel:([^"']+)["']''', re.IGNORECASE)
+HIDDEN_PATTERN = re.compile(r'<(script|style|noscript)\b.*?</\1>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Field yang diisi enrich_with_websites, disalin dari store kalau situs tidak berubah
+WEBSITE_FIELDS = ['Website Emails', 'Website Phones', 'Social Media'] + list(SOCIAL_COLUMNS.values())
+
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.doc', '.docx', '.xls', '.xlsx')
+
+def normalize_website(website):
+    """Add a scheme to website values like 'www.astra-agro.co.id'"""
+    website = (website or '').strip()
+    if not website or website == '-':
+        return None
+    if not re.match(r'^https?://', website, re.IGNORECASE):
+        website = 'http://' + website
+    return website
+
+def extract_contacts(html):
+    """Emails and phone numbers in a page"""
+    text = TAG_PATTERN.sub(' ', HIDDEN_PATTERN.sub(' ', html))
+    emails = []
+    for email in EMAIL_PATTERN.findall(html):
+        email = email.lower()
+        if not email.endswith(SKIP_EXTENSIONS) and email not in emails:
+            emails.append(email)
+    phones = []
+    seen = set()
+    for phone in TEL_PATTERN.findall(html) + PHONE_PATTERN.findall(text):
+        phone = re.sub(r'\s+', ' ', phone).strip()
+        # +62 21 ... dan (021) ... dianggap nomor yang sama
+        digits = re.sub(r'^62', '0', re.sub(r'\D', '', phone))
+        if 8 <= len(digits) <= 15 and digits not in seen:
+            seen.add(digits)
+            phones.append(phone)
+    return emails, phones
+
+def rank_links(html, base_url, host):
+    """Links on the same host that look like contact/about pages, best first"""
+    scores = {}
+    for href, text in LINK_PATTERN.findall(html):
+        url = urljoin(base_url, href.strip())
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.netloc.lower() != host:
+            continue
+        if parsed.path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        haystack = (parsed.path + ' ' + TAG_PATTERN.sub(' ', text)).lower()
+        score = sum(weight for keyword, weight in PAGE_KEYWORDS if keyword in haystack)
+        if score:
+            url = url.split('#')[0]
+            scores[url] = max(score, scores.get(url, 0))
+    return sorted(scores, key=lambda url: -scores[url])
+
+class HostPoliteness:
+    """Limits parallel requests per host, spacing comes from the rate limiter"""
+
+    def __init__(self, per_host=2, limiter=None):
+        self.per_host = per_host
+        self.limiter = limiter or LIMITER
+        self._semaphores = {}
+
+    async def wait(self, host):
+        """Take a slot for host, give it back with release(host)"""
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        semaphore = self._semaphores[host]
+        await semaphore.acquire()
+        try:
+            await self.limiter.wait_async(host)
+        except BaseException:
+            # Task dibatalkan (atau limiter gagal) sebelum fetch_page masuk ke try-nya
+            semaphore.release()
+            raise
+
+    def release(self, host):
+        self._semaphores[host].release()
+
+async def fetch_page(session, url, politeness, global_limit, timeout):
+    """Fetch one HTML page, None on error or non-HTML content"""
+    host = urlparse(url).netloc.lower()
+    await politeness.wait(host)
+    try:
+        async with global_limit:
+            with METRICS.span('website.fetch'):
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout), allow_redirects=True) as response:
+                    politeness.limiter.report(host, status=response.status)
+                    if response.status != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+                        METRICS.error('website.fetch', f"HTTP {response.status}" if response.status != 200 else 'not html')
+                        return None, str(response.url)
+                    html = await response.text(errors='replace')
+                    METRICS.page(len(html))
+                    return html, str(response.url)
+    except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError, ValueError):
+        return None, url
+    finally:
+        politeness.release(host)
+
+async def crawl_site(session, website, politeness, global_limit, max_pages=4, max_depth=1, timeout=15, known_fingerprint=None):
+    """
+    Crawl a company website for contacts
+
+    Fetches the homepage and then the best ranked contact/about pages,
+    up to max_pages pages and max_depth links away from the homepage.
+    When the homepage fingerprint equals known_fingerprint the crawl
+    stops there and the result is marked unchanged.
+    """
+    result = {'website': website, 'emails': [], 'phones': [], 'social': {}, 'pages': [], 'error': '', 'fingerprint': '', 'unchanged': False}
+    start_url = normalize_website(website)
+    if not start_url:
+        result['error'] = 'no website'
+        return result
+
+    queue = [(start_url, 0)]
+    visited = set()
+    social = {}
+    host = None
+    while queue and len(result['pages']) < max_pages:
+        url, depth = queue.pop(0)
+        if url in visited:
+            continue
+        visited.add(url)
+
+        html, final_url = await fetch_page(session, url, politeness, global_limit, timeout)
+        if html is None:
+            if depth == 0:
+                result['error'] = 'homepage not reachable'
+            continue
+        result['pages'].append(final_url)
+        # Redirect ke https/www dipakai sebagai host situs
+        host = host or urlparse(final_url).netloc.lower()
+
+        if depth == 0:
+            result['fingerprint'] = content_fingerprint(html)
+            if result['fingerprint'] == known_fingerprint:
+                result['unchanged'] = True
+                return result
+
+        with METRICS.span('website.extract'):
+            emails, phones = extract_contacts(html)
+            social_links = extract_social_links(html)
+        result['emails'] += [email for email in emails if email not in result['emails']]
+        result['phones'] += [phone for phone in phones if phone not in result['phones']]
+        for platform, links in social_links.items():
+            social.setdefault(platform, [])
+            social[platform] += [link for link in links if link not in social[platform]]
+
+        if depth < max_depth:
+            queue += [(link, depth + 1) for link in rank_links(html, final_url, host) if link not in visited]
+
+    result['social'] = social
+    return result
+
+async def crawl_sites(websites, concurrency=20, per_host=2, limiter=None, max_pages=4, max_depth=1, timeout=15, fingerprints=None):
+    """Crawl many websites at once, results keep input order; fingerprints are the known homepage fingerprints"""
+    fingerprints = fingerprints or [None] * len(websites)
+    politeness = HostPoliteness(per_host, limiter)
+    global_limit = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+        tasks = [
+            crawl_site(session, website, politeness, global_limit, max_pages, max_depth, timeout, fingerprint)
+            for website, fingerprint in zip(websites, fingerprints)
+        ]
+        return await asyncio.gather(*tasks)
+
+def crawl_websites(websites, **kwargs):
+    """Blocking wrapper around crawl_sites"""
+    return asyncio.run(crawl_sites(list(websites), **kwargs))
+
+def enrich_with_websites(records, website_key='Website', store=None, **kwargs):
+    """
+    Add emails, phones and social links from each record's website
+
+    With a CompanyStore, sites whose homepage did not change since the
+    last crawl get their previous results back instead of a new crawl.
+    """
+    codes = [record.get('Kode') for record in records]
+    known = store.fingerprints(codes, 'website') if store else {}
+    results = crawl_websites(
+        [record.get(website_key, '') for record in records],
+        fingerprints=[known.get(code) for code in codes],
+        **kwargs
+    )
+    for code, record, result in zip(codes, records, results):
+        if result['error'] == 'no website':
+            continue
+        if result['unchanged']:
+            previous = store.get(code) or {}
+            record.update({field: previous[field] for field in WEBSITE_FIELDS if field in previous})
+            store.record_check(code, result['fingerprint'], 'website')
+            continue
+        existing = record.get('Social Media') or []
+        if any(result['social'].values()):
+            add_social_fields(record, result['social'])
+            record['Social Media'] = existing + [link for link in record['Social Media'] if link not in existing]
+        record['Website Emails'] = result['emails']
+        record['Website Phones'] = result['phones']
+        if store and result['fingerprint']:
+            store.record_check(code, result['fingerprint'], 'website', record=record)
+    return records
@@ -0,0 +1,83 @@
+import re
+
+# Platform -> domain, kolom hasil memakai nama di SOCIAL_COLUMNS
+SOCIAL_PLATFORMS = {
+    'facebook': ['facebook.com', 'fb.com'],
+    'instagram': ['instagram.com'],
+    'linkedin': ['linkedin.com'],
+    'x': ['twitter.com', 'x.com'],
+    'youtube': ['youtube.com', 'youtu.be'],
+    'tiktok': ['tiktok.com']
+}
+
+SOCIAL_COLUMNS = {
+    'facebook': 'Facebook',
+    'instagram': 'Instagram',
+    'linkedin': 'LinkedIn',
+    'x': 'X',
+    'youtube': 'YouTube',
+    'tiktok': 'TikTok'
+}
+
+DOMAIN_PLATFORM = {domain: platform for platform, domains in SOCIAL_PLATFORMS.items() for domain in domains}
+
+# One pattern for every platform: an absolute link whose host ends in a social domain
+SOCIAL_LINK_PATTERN = re.compile(
+    r'''//(?:[a-z0-9-]+\.)*(?P<domain>'''
+    + '|'.join(re.escape(domain) for domain in sorted(DOMAIN_PLATFORM, key=len, reverse=True))
+    + r''')(?P<path>[/?#][^\s"'<>\\]*)?(?=[\s"'<>\\]|$)''',
+    re.IGNORECASE
+)
+
+# Tombol share/like bukan akun perusahaan
+SKIP_PATHS = re.compile(
+    r'^/(?:sharer|share|intent|home\?status|dialog|plugins|tr\b|embed|watch\?|hashtag|search|login)',
+    re.IGNORECASE
+)
+
+def normalize_link(domain, path):
+    """Normalize a social link to https://<domain>/<path> without tracking parameters"""
+    domain = domain.lower()
+    if domain == 'fb.com':
+        domain = 'facebook.com'
+    elif domain == 'twitter.com':
+        domain = 'x.com'
+
+    path = (path or '').replace('&amp;', '&')
+    path, _, query = path.partition('?')
+    path = path.split('#')[0].rstrip('/')
+    # Profil Facebook lama memakai profile.php?id=..., parameter lain dibuang
+    if path.lower() == '/profile.php':
+        profile_id = re.search(r'(?:^|&)id=(\d+)', query)
+        path = f"{path}?id={profile_id.group(1)}" if profile_id else path
+    return f"https://{domain}{path}"
+
+def extract_social_links(html):
+    """
+    Find social media links in raw HTML with one scan
+
+    Returns {platform: [links]} for facebook, instagram, linkedin, x,
+    youtube and tiktok; links are normalized and deduplicated.
+    """
+    found = {platform: [] for platform in SOCIAL_PLATFORMS}
+    seen = set()
+    for match in SOCIAL_LINK_PATTERN.finditer(html):
+        domain, path = match.group('domain'), match.group('path')
+        if not path or path == '/' or SKIP_PATHS.match(path):
+            continue
+        link = normalize_link(domain, path)
+        if link.lower() not in seen:
+            seen.add(link.lower())
+            found[DOMAIN_PLATFORM[domain.lower()]].append(link)
+    return found
+
+def flatten_social_links(links):
+    """All links of an extract_social_links result as one list"""
+    return [link for platform in SOCIAL_PLATFORMS for link in links.get(platform, [])]
+
+def add_social_fields(info, links):
+    """Store the first link per platform in its own column and all links in 'Social Media'"""
+    for platform, column in SOCIAL_COLUMNS.items():
+        info[column] = links[platform][0] if links.get(platform) else ''
+    info['Social Media'] = flatten_social_links(links)
+    return info
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+SCRAPPING_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPPING_DIR)
+
+from rate_limiter import LIMITER, host_key
+from replay_server import ReplayServer
+
+FIXTURES = os.path.join(SCRAPPING_DIR, 'fixtures')
+
+@pytest.fixture
+def fixtures_dir():
+    return FIXTURES
+
+@pytest.fixture
+def replay():
+    """Start a ReplayServer over the fixture corpus, not paced by LIMITER"""
+    servers = []
+
+    def start(**kwargs):
+        server = ReplayServer(FIXTURES, **kwargs)
+        server.start()
+        LIMITER.rates[host_key(server.url)] = 10000.0
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
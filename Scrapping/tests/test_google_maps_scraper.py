@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+import google_maps_scraper
+from google_maps_scraper import DETAIL_FIELDS, get_places
+from rate_limiter import HostRateLimiter
+
+@pytest.fixture(autouse=True)
+def no_token_delay(monkeypatch):
+    monkeypatch.setattr(google_maps_scraper, 'PAGE_TOKEN_DELAYS', [0.0] * len(google_maps_scraper.PAGE_TOKEN_DELAYS))
+
+def expected_places(fixtures_dir):
+    places = []
+    for page in (1, 2, 3):
+        with open(os.path.join(fixtures_dir, 'places', f'textsearch_{page}.json'), encoding='utf-8') as f:
+            places.extend(json.load(f)['results'])
+    with open(os.path.join(fixtures_dir, 'places', 'details.json'), encoding='utf-8') as f:
+        details = json.load(f)
+    return places, details
+
+@pytest.mark.parametrize('workers', [1, 8])
+def test_places_keep_api_order(replay, fixtures_dir, workers):
+    server = replay()
+    limiter = HostRateLimiter(default_rate=10000.0, burst=100)
+    places = get_places('test-key', 'restoran', workers=workers, base_url=server.url + '/maps/api/place', limiter=limiter)
+
+    search, details = expected_places(fixtures_dir)
+    assert [place['place_id'] for place in places] == [place['place_id'] for place in search]
+    assert [place['nama'] for place in places] == [place['name'] for place in search]
+    for place in places:
+        detail = details[place['place_id']]
+        for field, column in DETAIL_FIELDS.items():
+            assert place[column] == detail.get(field, '')
+    # 3 halaman search + satu details per place
+    assert server.stats()['requests'] == 3 + len(search)
+
+def test_places_written_to_sink(replay):
+    server = replay()
+    written = []
+
+    class ListSink:
+        def write(self, record):
+            written.append(record['place_id'])
+
+    limiter = HostRateLimiter(default_rate=10000.0, burst=100)
+    places = get_places('test-key', 'restoran', sink=ListSink(), base_url=server.url + '/maps/api/place', limiter=limiter)
+    assert written == [place['place_id'] for place in places]
@@ -0,0 +1,42 @@
+from idx_http import create_session, fetch_company_info, scrape_companies_http
+
+def test_json_profile(replay):
+    server = replay()
+    session = create_session(pool_size=2)
+    info = fetch_company_info(session, 'BBCA', base_url=server.url)
+    assert info['Nama Perusahaan'] == 'Bank Central Asia Tbk.'
+    assert info['Sektor'] == 'Keuangan'
+    assert info['Email'] == 'corsec@bca.co.id'
+    # Hanya endpoint JSON yang diminta
+    assert server.stats()['requests'] == 1
+
+def test_html_fallback(replay):
+    server = replay(json_profiles=False)
+    session = create_session(pool_size=2)
+    info = fetch_company_info(session, 'AALI', base_url=server.url)
+    assert info['Nama Perusahaan'] == 'Astra Agro Lestari Tbk.'
+    assert info['Telepon'] == '(021) 461-6555'
+    assert server.stats()['requests'] == 2
+
+def test_scrape_keeps_input_order(replay):
+    server = replay()
+    codes = ['BBCA', 'AALI', 'ABBA']
+    records = scrape_companies_http(codes, workers=3, base_url=server.url)
+    assert [record['Kode'] for record in records] == codes
+    assert [record['Nama Perusahaan'] for record in records] == [
+        'Bank Central Asia Tbk.', 'Astra Agro Lestari Tbk.', 'Mahaka Media Tbk.'
+    ]
+
+def test_browser_fallback_gets_missing_codes(replay):
+    server = replay()
+    calls = []
+
+    def browser_fallback(codes):
+        calls.append(list(codes))
+        return [{'Kode': code, 'Nama Perusahaan': f'{code} (browser)'} for code in codes]
+
+    # Base URL tanpa profil: semua kode harus lewat browser
+    records = scrape_companies_http(['AALI', 'ABBA'], workers=2, base_url=server.url + '/missing',
+                                    browser_fallback=browser_fallback)
+    assert calls == [['AALI', 'ABBA']]
+    assert [record['Nama Perusahaan'] for record in records] == ['AALI (browser)', 'ABBA (browser)']
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from market_data import MarketCache, StaticSource, get_market_data, join_market_data
+
+CODES = ['AALI', 'ABBA', 'BBCA']
+
+@pytest.fixture
+def source(fixtures_dir):
+    return StaticSource.from_file(os.path.join(fixtures_dir, 'market', 'quotes.json'))
+
+@pytest.fixture
+def cache(tmp_path):
+    with MarketCache(str(tmp_path / 'market_cache.db')) as market_cache:
+        yield market_cache
+
+def test_fetches_in_batches(source, cache):
+    market = get_market_data(CODES, source=source, cache=cache, batch_size=2)
+    assert source.price_calls == [['AALI.JK', 'ABBA.JK'], ['BBCA.JK']]
+    assert source.profile_calls == [['AALI.JK', 'ABBA.JK'], ['BBCA.JK']]
+    assert market['BBCA']['symbol'] == 'BBCA.JK'
+    assert market['BBCA']['sector'] == 'Financial Services'
+    assert market['AALI']['market_cap'] == 6150.0 * 1924688333
+
+def test_second_call_served_from_cache(source, cache):
+    first = get_market_data(CODES, source=source, cache=cache, batch_size=2)
+    source.price_calls.clear()
+    source.profile_calls.clear()
+
+    second = get_market_data(CODES, source=source, cache=cache, batch_size=2)
+    assert source.price_calls == []
+    assert source.profile_calls == []
+    assert second == first
+
+def test_only_expired_fields_refetched(source, tmp_path):
+    path = str(tmp_path / 'market_cache.db')
+    with MarketCache(path) as cache:
+        get_market_data(CODES, source=source, cache=cache)
+    source.price_calls.clear()
+    source.profile_calls.clear()
+
+    # Harga kedaluwarsa, profil masih segar
+    with MarketCache(path, ttls={'shares': 3600, 'market_cap': 3600, 'sector': 3600, 'industry': 3600, 'name': 3600}) as cache:
+        get_market_data(CODES, source=source, cache=cache)
+    assert source.price_calls == [['AALI.JK', 'ABBA.JK', 'BBCA.JK']]
+    assert source.profile_calls == []
+
+def test_unknown_ticker_not_asked_again(source, cache):
+    market = get_market_data(['AALI', 'ZZZZ'], source=source, cache=cache)
+    assert market['ZZZZ']['price'] is None
+    source.price_calls.clear()
+    source.profile_calls.clear()
+
+    get_market_data(['AALI', 'ZZZZ'], source=source, cache=cache)
+    assert source.price_calls == []
+    assert source.profile_calls == []
+
+def test_cache_only(source, cache):
+    get_market_data(['AALI'], source=source, cache=cache)
+    source.price_calls.clear()
+
+    market = get_market_data(CODES, source=source, cache=cache, cache_only=True)
+    assert list(market) == ['AALI']
+    assert source.price_calls == []
+
+def test_join_market_data(source, cache):
+    market = get_market_data(['AALI'], source=source, cache=cache)
+    records = join_market_data([{'Kode': 'AALI'}, {'Kode': 'ABBA'}], market)
+    assert records[0]['Simbol'] == 'AALI.JK'
+    assert records[0]['Harga'] == 6150.0
+    assert 'Harga' not in records[1]
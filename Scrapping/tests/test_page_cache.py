@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from page_cache import OfflineCacheMiss, PageCache
+
+class EtagHandler(BaseHTTPRequestHandler):
+    """One page whose ETag changes with server.body"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.body
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        self.server.seen.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), EtagHandler)
+    httpd.body = b'<table>AALI</table>'
+    httpd.seen = []
+    httpd.url = f"http://127.0.0.1:{httpd.server_port}/profil/AALI/"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+def test_fresh_entry_served_from_disk(tmp_path, server, session):
+    cache = PageCache(str(tmp_path / 'cache'), default_ttl=60)
+    first = cache.get(session, server.url)
+    second = cache.get(session, server.url)
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.text == '<table>AALI</table>'
+    assert len(server.seen) == 1
+    assert cache.stats()['entries'] == 1
+
+def test_expired_entry_revalidated_with_etag(tmp_path, server, session):
+    cache = PageCache(str(tmp_path / 'cache'), default_ttl=0.2)
+    cache.get(session, server.url)
+    time.sleep(0.3)
+
+    # Tidak berubah: server menjawab 304, isi diambil dari cache
+    response = cache.get(session, server.url)
+    assert response.from_cache
+    assert response.text == '<table>AALI</table>'
+    assert server.seen[-1] is not None
+
+    # 304 memperbarui fetched_at, jadi entry segar lagi
+    assert cache.get(session, server.url).from_cache
+    assert len(server.seen) == 2
+
+    time.sleep(0.3)
+    server.body = b'<table>AALI baru</table>'
+    response = cache.get(session, server.url)
+    assert not response.from_cache
+    assert response.text == '<table>AALI baru</table>'
+    assert cache.get(session, server.url).text == '<table>AALI baru</table>'
+
+def test_per_host_ttl(tmp_path, server, session):
+    host = server.url.split('/')[2]
+    cache = PageCache(str(tmp_path / 'cache'), ttls={host: 0}, default_ttl=60)
+    cache.get(session, server.url)
+    cache.get(session, server.url)
+    assert len(server.seen) == 2
+
+def test_offline_mode(tmp_path, server, session):
+    PageCache(str(tmp_path / 'cache')).get(session, server.url)
+    offline = PageCache(str(tmp_path / 'cache'), offline=True)
+    assert offline.get(session, server.url).from_cache
+    with pytest.raises(OfflineCacheMiss):
+        offline.get(session, server.url.replace('AALI', 'ABBA'))
+    assert len(server.seen) == 1
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from profile_parser import content_fingerprint, find_table_html, parse_profile
+
+def read_profile(fixtures_dir, code):
+    with open(os.path.join(fixtures_dir, 'idx_profile', f'{code}.html'), encoding='utf-8') as f:
+        return f.read()
+
+@pytest.mark.parametrize('backend', ['lxml', 'soup'])
+def test_parse_aali(fixtures_dir, backend):
+    info = parse_profile(read_profile(fixtures_dir, 'AALI'), 'AALI', backend=backend)
+    assert info['Kode'] == 'AALI'
+    assert info['Nama Perusahaan'] == 'Astra Agro Lestari Tbk.'
+    assert info['Sektor'] == 'Barang Konsumen Primer'
+    assert info['Website'] == 'www.astra-agro.co.id'
+    assert info['Email'] == 'investor@astra-agro.co.id'
+    assert info['Telepon'] == '(021) 461-6555'
+    assert info['Alamat'] == 'Jl. Pulo Ayang Raya Blok OR-1, Jakarta Timur'
+
+@pytest.mark.parametrize('backend', ['lxml', 'soup'])
+def test_parse_abba(fixtures_dir, backend):
+    info = parse_profile(read_profile(fixtures_dir, 'ABBA'), 'ABBA', backend=backend)
+    assert info['Nama Perusahaan'] == 'Mahaka Media Tbk.'
+    assert info['Sektor'] == 'Barang Konsumen Non-Primer'
+    assert info['Website'] == 'www.mahakamedia.com'
+    assert info['Email'] == 'corsec@mahakamedia.com'
+    assert info['Telepon'] == '(021) 573-9203'
+
+@pytest.mark.parametrize('code', ['AALI', 'ABBA'])
+def test_backends_agree(fixtures_dir, code):
+    html = read_profile(fixtures_dir, code)
+    assert parse_profile(html, code, backend='lxml') == parse_profile(html, code, backend='soup')
+
+def test_page_without_table():
+    assert find_table_html('<html><body><p>Loading...</p></body></html>') is None
+    assert parse_profile('<html><body><p>Loading...</p></body></html>', 'AALI') is None
+
+def test_fingerprint_ignores_scripts_and_whitespace(fixtures_dir):
+    table_html = find_table_html(read_profile(fixtures_dir, 'AALI'))
+    noisy = table_html.replace('<td', '\n  <td') + '<script>var t = 1;</script>'
+    assert content_fingerprint(noisy) == content_fingerprint(table_html)
+    assert content_fingerprint(table_html.replace('Astra', 'Astro')) != content_fingerprint(table_html)
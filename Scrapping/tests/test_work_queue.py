@@ -0,0 +1,65 @@
+import pytest
+
+from work_queue import SqliteQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    with SqliteQueue(str(tmp_path / 'work_queue.db'), max_attempts=2) as backend:
+        yield backend
+
+def test_put_is_idempotent(queue):
+    assert queue.put('idx', [('AALI', ['AALI']), ('ABBA', ['ABBA'])]) == 2
+    assert queue.put('idx', [('AALI', ['AALI']), ('BBCA', ['BBCA'])]) == 1
+    assert queue.stats('idx') == {'pending': 3}
+
+def test_claim_leases_each_shard_once(queue):
+    queue.put('idx', [('AALI', ['AALI']), ('ABBA', ['ABBA'])])
+    first = queue.claim('idx', 'w1')
+    second = queue.claim('idx', 'w2')
+    assert [task.key for task in first] == ['AALI']
+    assert [task.key for task in second] == ['ABBA']
+    assert queue.claim('idx', 'w3') == []
+    assert first[0].payload == ['AALI']
+    assert first[0].attempts == 1
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.put('idx', [('AALI', ['AALI'])])
+    # Lease yang sudah lewat, seolah-olah worker w1 mati
+    [task] = queue.claim('idx', 'w1', lease_seconds=-1)
+    [again] = queue.claim('idx', 'w2')
+    assert again.id == task.id
+    assert again.attempts == 2
+
+    # w1 kehilangan lease-nya: heartbeat dan complete ditolak
+    assert queue.heartbeat([task.id], 'w1') == []
+    assert not queue.complete(task.id, 'w1', [{'Kode': 'AALI'}])
+    assert queue.heartbeat([again.id], 'w2') == [again.id]
+    assert queue.complete(again.id, 'w2', [{'Kode': 'AALI'}])
+    assert queue.results('idx') == [{'Kode': 'AALI'}]
+    assert queue.stats('idx') == {'done': 1}
+
+def test_heartbeat_keeps_lease(queue):
+    queue.put('idx', [('AALI', ['AALI'])])
+    [task] = queue.claim('idx', 'w1', lease_seconds=-1)
+    assert queue.heartbeat([task.id], 'w1', lease_seconds=60) == [task.id]
+    assert queue.claim('idx', 'w2') == []
+
+def test_expired_lease_fails_after_max_attempts(queue):
+    queue.put('idx', [('AALI', ['AALI'])])
+    queue.claim('idx', 'w1', lease_seconds=-1)
+    queue.claim('idx', 'w2', lease_seconds=-1)
+    assert queue.claim('idx', 'w3') == []
+    assert queue.stats('idx') == {'failed': 1}
+
+    assert queue.retry_failed('idx') == 1
+    [task] = queue.claim('idx', 'w3')
+    assert task.attempts == 1
+
+def test_fail_returns_shard_until_max_attempts(queue):
+    queue.put('idx', [('AALI', ['AALI'])])
+    [task] = queue.claim('idx', 'w1')
+    assert queue.fail(task.id, 'w1', 'timeout')
+    assert queue.stats('idx') == {'pending': 1}
+    [task] = queue.claim('idx', 'w1')
+    assert queue.fail(task.id, 'w1', 'timeout')
+    assert queue.stats('idx') == {'failed': 1}
@@ -0,0 +1,159 @@
+import math
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from google_maps_scraper import get_places, EXPORT_COLUMNS
+from place_cache import PlaceCache
+from result_sink import ResultSink, export_excel
+
+# Text Search memberi maksimal 3 halaman x 20 hasil
+SATURATION = 60
+
+METERS_PER_DEGREE = 111320
+
+# Batas kota kira-kira (south, west, north, east)
+CITY_BOUNDS = {
+    'bandung': (-6.97, 107.55, -6.84, 107.74),
+    'jakarta': (-6.37, 106.69, -6.08, 106.97),
+    'surabaya': (-7.35, 112.60, -7.19, 112.82),
+    'medan': (3.50, 98.60, 3.70, 98.75),
+    'yogyakarta': (-7.84, 110.33, -7.75, 110.42),
+}
+
+Tile = namedtuple('Tile', ['south', 'west', 'north', 'east', 'depth'])
+
+def tile_center(tile):
+    return (tile.south + tile.north) / 2, (tile.west + tile.east) / 2
+
+def tile_radius(tile):
+    """Radius in meters of the circle around the tile center that covers the tile"""
+    lat, _ = tile_center(tile)
+    height = (tile.north - tile.south) * METERS_PER_DEGREE
+    width = (tile.east - tile.west) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+    return int(math.ceil(math.hypot(height, width) / 2))
+
+def grid_tiles(bounds, tile_size=3000):
+    """Split a (south, west, north, east) box into tiles of about tile_size meters"""
+    south, west, north, east = bounds
+    lat = (south + north) / 2
+    lat_step = tile_size / METERS_PER_DEGREE
+    lng_step = tile_size / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+    rows = max(1, int(math.ceil((north - south) / lat_step)))
+    cols = max(1, int(math.ceil((east - west) / lng_step)))
+    lat_step = (north - south) / rows
+    lng_step = (east - west) / cols
+    return [
+        Tile(south + r * lat_step, west + c * lng_step, south + (r + 1) * lat_step, west + (c + 1) * lng_step, 0)
+        for r in range(rows) for c in range(cols)
+    ]
+
+def split_tile(tile):
+    """Split a saturated tile into four quadrants"""
+    lat, lng = tile_center(tile)
+    depth = tile.depth + 1
+    return [
+        Tile(tile.south, tile.west, lat, lng, depth),
+        Tile(tile.south, lng, lat, tile.east, depth),
+        Tile(lat, tile.west, tile.north, lng, depth),
+        Tile(lat, lng, tile.north, tile.east, depth),
+    ]
+
+def plan_summary(tiles, max_depth):
+    """Request estimate: 3 search pages per tile, x4 for every possible split level"""
+    return {
+        'tiles': len(tiles),
+        'min_search_requests': len(tiles),
+        'max_search_requests': len(tiles) * 3 * sum(4 ** d for d in range(max_depth + 1))
+    }
+
+class DedupSink:
+    """Passes each place_id only once to the inner sink, safe across tiles"""
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.places = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        key = record.get('place_id') or (record.get('nama'), record.get('alamat'))
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            self.places.append(record)
+        if self.sink:
+            self.sink.write(record)
+        return True
+
+def search_area(api_key, query, bounds, tile_size=3000, max_depth=2, tile_workers=4, sink=None, **kwargs):
+    """
+    Search a whole area tile by tile
+
+    Tiles that come back saturated (60 results) are split into four and
+    searched again, up to max_depth times. Places are deduplicated by
+    place_id and written to sink as they arrive. Extra kwargs go to
+    get_places (workers, base_url, limiter, cache).
+    """
+    # Tile yang bertumpuk tidak perlu minta details yang sama dua kali
+    if kwargs.get('cache') is None:
+        kwargs['cache'] = PlaceCache(':memory:')
+    tiles = grid_tiles(bounds, tile_size)
+    print(f"Plan: {plan_summary(tiles, max_depth)}")
+    dedup = DedupSink(sink)
+
+    def search_tile(tile):
+        lat, lng = tile_center(tile)
+        results = get_places(api_key, query, location=f"{lat:.7f},{lng:.7f}", radius=tile_radius(tile), sink=dedup, **kwargs)
+        return tile, len(results)
+
+    searched = 0
+    with ThreadPoolExecutor(max_workers=tile_workers) as executor:
+        running = {executor.submit(search_tile, tile) for tile in tiles}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                tile, count = future.result()
+                searched += 1
+                if count >= SATURATION and tile.depth < max_depth:
+                    running |= {executor.submit(search_tile, child) for child in split_tile(tile)}
+
+    print(f"Searched {searched} tiles, {len(dedup.places)} unique places")
+    return dedup.places
+
+def search_cities(api_key, query, cities, **kwargs):
+    """search_area over several cities from CITY_BOUNDS, deduplicated together"""
+    sink = kwargs.pop('sink', None)
+    dedup = DedupSink(sink)
+    for city in cities:
+        print(f"\nKota: {city}")
+        search_area(api_key, query, CITY_BOUNDS[city.lower()], sink=dedup, **kwargs)
+    return dedup.places
+
+def main():
+    # Replace with your API key
+    API_KEY = "YOUR_GOOGLE_PLACES_API_KEY"
+
+    search_query = input("Masukkan kata kunci pencarian (contoh: restoran): ")
+    cities = input(f"Kota, pisahkan dengan koma ({', '.join(CITY_BOUNDS)}): ")
+    cities = [city.strip() for city in cities.split(',') if city.strip().lower() in CITY_BOUNDS]
+    if not cities:
+        print("Kota tidak dikenal")
+        return
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sink_file = f"data_tempat_{timestamp}.jsonl"
+    cache = PlaceCache()
+    with ResultSink(sink_file, append=False) as sink:
+        places = search_cities(API_KEY, search_query, cities, sink=sink, cache=cache)
+    cache.close()
+
+    if places:
+        print(f"\nBerhasil mengumpulkan data {len(places)} tempat")
+        export_excel(sink_file, f"data_tempat_{timestamp}.xlsx", columns=EXPORT_COLUMNS)
+    else:
+        print("Tidak ada data yang ditemukan atau terjadi error")
+
+if __name__ == "__main__":
+    main()
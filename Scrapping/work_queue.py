@@ -0,0 +1,409 @@
+import hmac
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+from metrics import METRICS
+
+WORK_QUEUE_FILE = 'work_queue.db'
+
+# Token bersama untuk QueueServer, dikirim worker sebagai Authorization: Bearer <token>
+QUEUE_TOKEN_ENV = 'WORK_QUEUE_TOKEN'
+
+# Detik sebuah shard dipegang worker sebelum boleh diambil worker lain
+LEASE_SECONDS = 120
+
+Task = namedtuple('Task', ['id', 'queue', 'key', 'payload', 'attempts'])
+
+class SqliteQueue:
+    """
+    Work queue with leases in one SQLite file
+
+    Every shard is a row keyed by (queue, key), so enqueueing the same
+    shard twice is a no-op. claim() leases shards to a worker for
+    lease_seconds; a worker that stops sending heartbeat() loses the
+    lease and the shard becomes visible to other workers again. After
+    max_attempts claims a shard is marked failed. Results are stored
+    with the shard, so the queue is also the common sink of all nodes.
+
+    Safe for several processes on one host; other nodes reach it through
+    QueueServer/HttpQueue. Any object with the same methods can be used
+    as backend.
+    """
+
+    def __init__(self, path=WORK_QUEUE_FILE, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                queue TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (queue, key)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (queue, status, id)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, queue, items):
+        """Add (key, payload) shards, returns how many were new"""
+        now = time.time()
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO tasks (queue, key, payload, updated_at) VALUES (?, ?, ?, ?)',
+                    [(queue, key, json.dumps(payload, ensure_ascii=False), now) for key, payload in items]
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+            return self.conn.total_changes - before
+
+    def claim(self, queue, worker, limit=1, lease_seconds=LEASE_SECONDS):
+        """Lease up to limit pending shards (or shards whose lease expired)"""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE: hanya satu proses yang bisa claim pada saat yang sama
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'failed', error = 'lease expired', worker = NULL, updated_at = ? "
+                    "WHERE queue = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, queue, now, self.max_attempts)
+                )
+                rows = self.conn.execute(
+                    "SELECT id, queue, key, payload, attempts FROM tasks "
+                    "WHERE queue = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                    "ORDER BY id LIMIT ?",
+                    (queue, now, limit)
+                ).fetchall()
+                self.conn.executemany(
+                    "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(worker, now + lease_seconds, now, row[0]) for row in rows]
+                )
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return [Task(id, queue, key, json.loads(payload), attempts + 1) for id, queue, key, payload, attempts in rows]
+
+    def heartbeat(self, task_ids, worker, lease_seconds=LEASE_SECONDS):
+        """Extend the leases worker still holds, returns those task ids"""
+        if not task_ids:
+            return []
+        now = time.time()
+        marks = ','.join('?' * len(task_ids))
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self.conn.execute(
+                    f"UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id IN ({marks}) AND status = 'leased' AND worker = ?",
+                    [now + lease_seconds, now, *task_ids, worker]
+                )
+                rows = self.conn.execute(
+                    f"SELECT id FROM tasks WHERE id IN ({marks}) AND status = 'leased' AND worker = ?",
+                    [*task_ids, worker]
+                ).fetchall()
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+        return [row[0] for row in rows]
+
+    def complete(self, task_id, worker, results=None):
+        """Store the results of a shard; False when the lease was lost to another worker"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, worker = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND worker = ?",
+                (json.dumps(results or [], ensure_ascii=False, default=str), time.time(), task_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id, worker, error):
+        """Give the shard back for a retry, or mark it failed after max_attempts"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND worker = ?",
+                (self.max_attempts, str(error), time.time(), task_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def retry_failed(self, queue):
+        """Give failed shards a new set of attempts"""
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, updated_at = ? WHERE queue = ? AND status = 'failed'",
+                (time.time(), queue)
+            )
+            return cursor.rowcount
+
+    def stats(self, queue):
+        with self._lock:
+            rows = self.conn.execute('SELECT status, COUNT(*) FROM tasks WHERE queue = ? GROUP BY status', (queue,))
+            return dict(rows.fetchall())
+
+    def results(self, queue):
+        """Records of all finished shards, in enqueue order"""
+        with self._lock:
+            rows = self.conn.execute("SELECT result FROM tasks WHERE queue = ? AND status = 'done' ORDER BY id", (queue,)).fetchall()
+        return [record for row in rows for record in json.loads(row[0])]
+
+    def close(self):
+        self.conn.close()
+
+# Method backend yang boleh dipanggil lewat QueueServer
+QUEUE_METHODS = ['put', 'claim', 'heartbeat', 'complete', 'fail', 'retry_failed', 'stats', 'results']
+
+class QueueServer:
+    """
+    Serves a queue backend over HTTP so workers on other nodes can share it
+
+    Every method is a POST to /<method> with its keyword arguments as a
+    JSON object; the reply is {"result": ...}. Listens on localhost by
+    default. With a token every request must carry it as a bearer
+    token, otherwise it gets 401.
+    """
+
+    def __init__(self, backend, host='127.0.0.1', port=8765, token=None):
+        self.backend = backend
+        self.host = host
+        self.port = port
+        self.token = token
+        self.url = None
+        self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), QueueHandler)
+        self._server.daemon_threads = True
+        self._server.backend = self.backend
+        self._server.token = self.token
+        self.url = f"http://{self.host}:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class QueueHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        token = self.server.token
+        if not token:
+            return True
+        if hmac.compare_digest(self.headers.get('Authorization', ''), f"Bearer {token}"):
+            return True
+        self._reply(401, {'error': 'invalid or missing token'})
+        return False
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        method = urlparse(self.path).path.strip('/')
+        if method not in QUEUE_METHODS:
+            self._reply(404, {'error': f"unknown method {method}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            kwargs = json.loads(self.rfile.read(length) or b'{}')
+            self._reply(200, {'result': getattr(self.server.backend, method)(**kwargs)})
+        except Exception as e:
+            self._reply(500, {'error': f"{type(e).__name__}: {str(e)}"})
+
+    def do_GET(self):
+        # GET /stats?queue=idx untuk dilihat dari browser
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        if url.path.strip('/') != 'stats':
+            self._reply(404, {'error': 'not found'})
+            return
+        queue = parse_qs(url.query).get('queue', ['idx'])[0]
+        self._reply(200, {'result': self.server.backend.stats(queue)})
+
+class HttpQueue:
+    """Client for a QueueServer with the same methods as SqliteQueue"""
+
+    def __init__(self, url, timeout=30, token=None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _call(self, method, **kwargs):
+        response = self.session.post(f"{self.url}/{method}", json=kwargs, timeout=self.timeout)
+        body = response.json()
+        if response.status_code != 200:
+            raise RuntimeError(body.get('error', f"HTTP {response.status_code}"))
+        return body['result']
+
+    def put(self, queue, items):
+        return self._call('put', queue=queue, items=[list(item) for item in items])
+
+    def claim(self, queue, worker, limit=1, lease_seconds=LEASE_SECONDS):
+        return [Task(*row) for row in self._call('claim', queue=queue, worker=worker, limit=limit, lease_seconds=lease_seconds)]
+
+    def heartbeat(self, task_ids, worker, lease_seconds=LEASE_SECONDS):
+        return self._call('heartbeat', task_ids=list(task_ids), worker=worker, lease_seconds=lease_seconds)
+
+    def complete(self, task_id, worker, results=None):
+        return self._call('complete', task_id=task_id, worker=worker, results=results)
+
+    def fail(self, task_id, worker, error):
+        return self._call('fail', task_id=task_id, worker=worker, error=str(error))
+
+    def retry_failed(self, queue):
+        return self._call('retry_failed', queue=queue)
+
+    def stats(self, queue):
+        return self._call('stats', queue=queue)
+
+    def results(self, queue):
+        return self._call('results', queue=queue)
+
+    def close(self):
+        self.session.close()
+
+def open_queue(location=WORK_QUEUE_FILE, max_attempts=3, token=None):
+    """HttpQueue for an http:// URL, otherwise a SqliteQueue on that file"""
+    if location.startswith(('http://', 'https://')):
+        return HttpQueue(location, token=token)
+    return SqliteQueue(location, max_attempts)
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class LeaseKeeper:
+    """Background heartbeat for the shards a worker is holding"""
+
+    def __init__(self, queue, task_ids, worker, lease_seconds=LEASE_SECONDS):
+        self.queue = queue
+        self.task_ids = set(task_ids)
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def release(self, task_id):
+        with self._lock:
+            self.task_ids.discard(task_id)
+
+    def _beat(self):
+        # Perpanjang lease tiga kali per periode, jadi satu heartbeat yang gagal tidak apa-apa
+        while not self._stop.wait(self.lease_seconds / 3):
+            with self._lock:
+                task_ids = list(self.task_ids)
+            try:
+                held = set(self.queue.heartbeat(task_ids, self.worker, self.lease_seconds))
+            except Exception as e:
+                print(f"Heartbeat failed: {str(e)}")
+                continue
+            for task_id in set(task_ids) - held:
+                print(f"Lease on task {task_id} was lost")
+
+def run_worker(queue, name, handler, worker_id=None, batch_size=1, lease_seconds=LEASE_SECONDS, poll=5, wait_for_others=True, sink=None):
+    """
+    Claim shards of queue name and run handler(task, queue) on each until the queue is drained
+
+    handler returns the records of the shard and may put follow-up shards.
+    With wait_for_others, an idle worker keeps polling while other
+    workers hold leases, so it can take over shards whose lease expires.
+    """
+    worker_id = worker_id or default_worker_id()
+    counts = {'done': 0, 'failed': 0, 'lost': 0, 'records': 0}
+    while True:
+        tasks = queue.claim(name, worker_id, batch_size, lease_seconds)
+        if not tasks:
+            stats = queue.stats(name)
+            if not stats.get('pending') and not (wait_for_others and stats.get('leased')):
+                break
+            time.sleep(poll)
+            continue
+
+        with LeaseKeeper(queue, [task.id for task in tasks], worker_id, lease_seconds) as keeper:
+            for task in tasks:
+                try:
+                    with METRICS.span(f'queue.{name}'):
+                        records = handler(task, queue)
+                except Exception as e:
+                    print(f"Task {task.key} failed (attempt {task.attempts}): {str(e)}")
+                    queue.fail(task.id, worker_id, f"{type(e).__name__}: {str(e)}")
+                    keeper.release(task.id)
+                    counts['failed'] += 1
+                    continue
+
+                keeper.release(task.id)
+                if not queue.complete(task.id, worker_id, records):
+                    # Lease sudah diambil worker lain, hasil mereka yang dipakai
+                    counts['lost'] += 1
+                    continue
+                if sink:
+                    for record in records:
+                        sink.write(record)
+                counts['done'] += 1
+                counts['records'] += len(records)
+        print(f"{worker_id}: {counts}, queue {queue.stats(name)}")
+    return counts